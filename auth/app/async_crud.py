@@ -0,0 +1,86 @@
+"""
+Variantes asíncronas (AsyncSession) de las consultas de usuarios y roles,
+usadas por `async_routes` cuando el servicio corre con DB_ASYNC=true.
+
+En asyncio no hay carga perezosa: los roles que serializa `schemas.User` se
+cargan explícitamente. El alta de usuarios y el login siguen siendo
+síncronos porque el costo está en bcrypt, no en la base de datos.
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from common.pagination import paginate
+
+from . import models, schemas
+from .principals import principal_cache, principal_data
+
+
+def _select_users():
+    return select(models.User).options(selectinload(models.User.roles))
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """
+    Obtiene un usuario por su email.
+    """
+    return await db.scalar(_select_users().where(models.User.email == email))
+
+
+async def get_user_principal(db: AsyncSession, email: str) -> Optional[dict]:
+    """
+    Usuario y roles desde la caché en memoria, o con una sola consulta.
+    """
+    datos = principal_cache.get(email)
+    if datos is None:
+        consulta = (
+            select(models.User)
+            .options(joinedload(models.User.roles))
+            .where(models.User.email == email)
+        )
+        user = (await db.execute(consulta)).unique().scalar_one_or_none()
+        if user is None:
+            return None
+        datos = principal_data(user)
+        principal_cache.put(email, datos)
+    return datos
+
+
+async def get_users(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de usuarios.
+    """
+    consulta = paginate(_select_users(), models.User.id, after_id, skip, limit)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_role_by_name(db: AsyncSession, name: str):
+    """
+    Obtiene un rol por su nombre.
+    """
+    return await db.scalar(select(models.Role).where(models.Role.name == name))
+
+
+async def get_roles(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de roles.
+    """
+    consulta = paginate(select(models.Role), models.Role.id, after_id, skip, limit)
+    return (await db.scalars(consulta)).all()
+
+
+async def create_role(db: AsyncSession, role: schemas.RoleCreate):
+    """
+    Crea un nuevo rol.
+    """
+    db_role = models.Role(**role.dict())
+    db.add(db_role)
+    await db.commit()
+    return db_role
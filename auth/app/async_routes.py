@@ -0,0 +1,83 @@
+"""
+Endpoints de consulta de usuarios y roles sobre AsyncSession. Con
+DB_ASYNC=true se registran antes que los síncronos de `main` con la misma
+ruta y los reemplazan.
+
+No se publican en el esquema OpenAPI porque el contrato es el mismo que el
+de los endpoints síncronos.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import auth as common_auth
+from common.database import get_async_db
+from common.pagination import decode_cursor, set_next_cursor
+
+from . import async_crud, schemas
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.post("/roles/", response_model=schemas.Role)
+async def create_role(
+    role: schemas.RoleCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea un nuevo rol en el sistema.
+    """
+    if await async_crud.get_role_by_name(db, name=role.name):
+        raise HTTPException(status_code=400, detail="Role already exists")
+    return await async_crud.create_role(db=db, role=role)
+
+
+@router.get("/roles/", response_model=List[schemas.Role])
+async def read_roles(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene lista de roles disponibles.
+    """
+    roles = await async_crud.get_roles(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, roles, limit)
+    return roles
+
+
+@router.get("/users/me", response_model=schemas.User)
+async def read_users_me(
+    principal: common_auth.Principal = Depends(common_auth.require_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene información del usuario actual basada en el token JWT.
+    """
+    user = await async_crud.get_user_principal(db, email=principal.email)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.get("/users/", response_model=List[schemas.User])
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene lista de usuarios (requiere autenticación).
+    """
+    users = await async_crud.get_users(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, users, limit)
+    return users
@@ -1,14 +1,15 @@
-import os
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import HTTPException, status
-from jose import JWTError, jwt
+from jose import jwt
 
-# Configuración JWT
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Configuración JWT compartida con los demás servicios (clave HS256,
+# algoritmo y vigencia); con JWT_KEYS_DIR se firma con RS256, ver keys.py.
+from common.auth import ALGORITHM, SECRET_KEY, InvalidToken, decode_token
+from common.revocation import ACCESS_TOKEN_EXPIRE_MINUTES
+
+from . import keys
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -22,6 +23,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
+    if keys.signing_keys is not None:
+        return jwt.encode(
+            to_encode,
+            keys.signing_keys.current_private_key,
+            algorithm=keys.SIGNING_ALGORITHM,
+            headers={"kid": keys.signing_keys.current_kid},
+        )
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -30,20 +38,14 @@ def verify_token(token: str):
     """
     Verifica y decodifica un token JWT.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
-    except JWTError:
-        raise credentials_exception
+        return decode_token(token).email
+    except InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
 
 def get_user_roles_from_token(token: str):
@@ -51,8 +53,6 @@ def get_user_roles_from_token(token: str):
     Extrae los roles del usuario desde el token JWT.
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        roles: list = payload.get("roles", [])
-        return roles
-    except JWTError:
+        return list(decode_token(token).roles)
+    except InvalidToken:
         return []
@@ -1,32 +1,75 @@
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import List, Optional
 
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+
+from common.database import DB_MAX_CONCURRENT_REQUESTS
+from common.pagination import paginate
 
 from . import models, schemas
+from .hashing import PASSWORD_HASH_QUEUE, PASSWORD_HASH_WORKERS, PasswordHasher
+from .principals import principal_cache, principal_data
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
-# Contexto para el hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cada operación en cola conserva el lugar de su petición en get_db
+# (DB_MAX_CONCURRENT_REQUESTS): la mitad queda siempre para el resto de los
+# endpoints.
+hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS,
+    min(PASSWORD_HASH_QUEUE, max(DB_MAX_CONCURRENT_REQUESTS // 2, 1)),
+)
 
 
 def get_user(db: Session, user_id: int):
     """
-    Obtiene un usuario por su ID.
+    Obtiene un usuario por su ID, con sus roles en la misma consulta.
     """
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return (
+        db.query(models.User)
+        .options(joinedload(models.User.roles))
+        .filter(models.User.id == user_id)
+        .first()
+    )
 
 
 def get_user_by_email(db: Session, email: str):
     """
-    Obtiene un usuario por su email.
+    Obtiene un usuario por su email, con sus roles en la misma consulta.
+    """
+    return (
+        db.query(models.User)
+        .options(joinedload(models.User.roles))
+        .filter(models.User.email == email)
+        .first()
+    )
+
+
+def get_user_principal(db: Session, email: str) -> Optional[dict]:
+    """
+    Usuario y roles como diccionario (esquema `User`), desde la caché en
+    memoria si está; si no, con una sola consulta.
     """
-    return db.query(models.User).filter(models.User.email == email).first()
+    datos = principal_cache.get(email)
+    if datos is None:
+        user = get_user_by_email(db, email)
+        if user is None:
+            return None
+        datos = principal_data(user)
+        principal_cache.put(email, datos)
+    return datos
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+def get_users(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de usuarios.
     """
-    return db.query(models.User).offset(skip).limit(limit).all()
+    return paginate(db.query(models.User), models.User.id, after_id, skip, limit).all()
 
 
 def create_user(db: Session, user: schemas.UserCreate):
@@ -34,19 +77,19 @@ def create_user(db: Session, user: schemas.UserCreate):
     Crea un nuevo usuario en la base de datos.
     Hashea la contraseña antes de guardarla.
     """
-    hashed_password = pwd_context.hash(user.password)
+    if not (db.new or db.dirty or db.deleted):
+        # Lo leído hasta acá (p. ej. el chequeo del email) no cambia: se
+        # termina la transacción para devolver la conexión durante bcrypt.
+        db.commit()
+    hashed_password = hasher.hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
 
-    # Asignar roles al usuario
+    # Asignar roles al usuario (los nombres inexistentes se ignoran)
     if user.roles:
-        for role_name in user.roles:
-            role = get_role_by_name(db, role_name)
-            if role:
-                db_user.roles.append(role)
+        db_user.roles.extend(get_roles_by_names(db, user.roles))
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 
@@ -54,18 +97,27 @@ def verify_password(plain_password, hashed_password):
     """
     Verifica que la contraseña en texto plano coincida con el hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return hasher.verify_and_update(plain_password, hashed_password)[0]
 
 
 def authenticate_user(db: Session, email: str, password: str):
     """
     Autentica un usuario verificando email y contraseña.
+    Si el hash guardado usa un costo de bcrypt anterior, lo reemplaza por
+    uno con el actual (se guarda al confirmar la petición).
     """
     user = get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    hashed_password = user.hashed_password
+    # La transacción sólo leyó: se termina para devolver la conexión al pool
+    # durante bcrypt. El rehash y la sesión de login abren otra.
+    db.commit()
+    valida, nuevo_hash = hasher.verify_and_update(password, hashed_password)
+    if not valida:
         return False
+    if nuevo_hash is not None:
+        user.hashed_password = nuevo_hash
     return user
 
 
@@ -78,8 +130,7 @@ def create_role(db: Session, role: schemas.RoleCreate):
     """
     db_role = models.Role(name=role.name, description=role.description)
     db.add(db_role)
-    db.commit()
-    db.refresh(db_role)
+    db.flush()
     return db_role
 
 
@@ -97,8 +148,123 @@ def get_role_by_name(db: Session, name: str):
     return db.query(models.Role).filter(models.Role.name == name).first()
 
 
-def get_roles(db: Session, skip: int = 0, limit: int = 100):
+def get_roles_by_names(db: Session, names: List[str]):
+    """
+    Obtiene los roles con esos nombres en una sola consulta.
+    """
+    return (
+        db.query(models.Role)
+        .filter(models.Role.name.in_(set(names)))
+        .order_by(models.Role.id)
+        .all()
+    )
+
+
+def get_roles(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de roles.
     """
-    return db.query(models.Role).offset(skip).limit(limit).all()
+    return paginate(db.query(models.Role), models.Role.id, after_id, skip, limit).all()
+
+
+# --- CRUD para Sesiones (refresh tokens) ---
+
+
+class RefreshTokenReused(Exception):
+    """
+    Se presentó un refresh token ya rotado: su familia quedó revocada.
+    """
+
+    def __init__(self, family_id: str):
+        super().__init__(family_id)
+        self.family_id = family_id
+
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_session(db: Session, user_id: int, family_id: Optional[str] = None):
+    """
+    Emite un refresh token para el usuario; sin `family_id` inicia una
+    familia nueva (un login). Devuelve (token, sesión).
+    """
+    token = secrets.token_urlsafe(32)
+    db_session = models.UserSession(
+        user_id=user_id,
+        family_id=family_id or secrets.token_hex(16),
+        token_hash=_hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(db_session)
+    db.flush()
+    return token, db_session
+
+
+def get_session_by_token(db: Session, token: str):
+    """
+    Obtiene la sesión de un refresh token (búsqueda por índice único).
+    """
+    return (
+        db.query(models.UserSession)
+        .filter(models.UserSession.token_hash == _hash_refresh_token(token))
+        .first()
+    )
+
+
+def rotate_session(db: Session, token: str):
+    """
+    Canjea un refresh token por uno nuevo de la misma familia. Devuelve
+    (token nuevo, sesión nueva), o None si el token no existe, venció o su
+    familia está revocada. Si el token ya se había rotado revoca la familia
+    y lanza `RefreshTokenReused`.
+    """
+    actual = get_session_by_token(db, token)
+    ahora = datetime.utcnow()
+    if actual is None or actual.revoked_at is not None or actual.expires_at <= ahora:
+        return None
+    # Condicional: de dos canjes simultáneos del mismo token sólo uno lo marca.
+    marcadas = (
+        db.query(models.UserSession)
+        .filter(
+            models.UserSession.id == actual.id,
+            models.UserSession.used_at.is_(None),
+        )
+        .update({models.UserSession.used_at: ahora}, synchronize_session=False)
+    )
+    if not marcadas:
+        revoke_session_family(db, actual.family_id)
+        raise RefreshTokenReused(actual.family_id)
+    return create_session(db, actual.user_id, actual.family_id)
+
+
+def revoke_session_family(db: Session, family_id: str):
+    """
+    Revoca todos los refresh tokens de una familia.
+    """
+    return (
+        db.query(models.UserSession)
+        .filter(
+            models.UserSession.family_id == family_id,
+            models.UserSession.revoked_at.is_(None),
+        )
+        .update(
+            {models.UserSession.revoked_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+    )
+
+
+def get_revoked_families(db: Session, since: datetime) -> List[str]:
+    """
+    Familias revocadas desde `since` (sus access tokens pueden seguir
+    vigentes).
+    """
+    filas = (
+        db.query(models.UserSession.family_id)
+        .filter(models.UserSession.revoked_at >= since)
+        .distinct()
+    )
+    return [family_id for family_id, in filas]
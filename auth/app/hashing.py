@@ -0,0 +1,109 @@
+"""
+Hashing de contraseñas (bcrypt) fuera del proceso web.
+
+Cada hash o verificación cuesta 100-300 ms de CPU. Hecho en el threadpool,
+una ráfaga de logins retiene el GIL y deja sin CPU al resto de los
+endpoints. Por eso bcrypt corre en un pool de procesos acotado
+(PASSWORD_HASH_WORKERS): el hilo de la petición sólo espera el resultado.
+Si ya hay PASSWORD_HASH_QUEUE operaciones pendientes (y nunca más de la
+mitad de DB_MAX_CONCURRENT_REQUESTS, ver crud.hasher), la nueva se rechaza
+con `PasswordHashingBusy` (429 en la API) en lugar de encolarse sin límite.
+
+El costo se configura con BCRYPT_ROUNDS. Los hashes con un costo menor (o
+de un esquema obsoleto) se rehacen con el actual cuando el usuario inicia
+sesión.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Cada worker de gunicorn tiene su pool: por defecto los núcleos se reparten
+# entre los WEB_CONCURRENCY workers. 0 hashea en el mismo proceso (sin pool).
+PASSWORD_HASH_WORKERS = int(
+    os.getenv(
+        "PASSWORD_HASH_WORKERS",
+        str(max((os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1")), 1)),
+    )
+)
+PASSWORD_HASH_QUEUE = int(
+    os.getenv("PASSWORD_HASH_QUEUE", str(max(PASSWORD_HASH_WORKERS, 1) * 4))
+)
+
+# min_rounds marca como obsoletos los hashes con un costo menor al actual.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHashingBusy(Exception):
+    """
+    El pool de hashing tiene la cola llena.
+    """
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """
+    Pool de procesos para bcrypt con un máximo de operaciones pendientes.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._pendientes = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: los procesos no heredan los hilos ni las conexiones
+                # del servidor web.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _run(self, funcion, *args):
+        if not self._pendientes.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            if self.workers == 0:
+                return funcion(*args)
+            return self._get_executor().submit(funcion, *args).result()
+        finally:
+            self._pendientes.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify_and_update(
+        self, password: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        (coincide, hash nuevo); el hash nuevo es None salvo que el guardado
+        deba actualizarse.
+        """
+        return self._run(_verify_and_update, password, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
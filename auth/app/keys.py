@@ -0,0 +1,107 @@
+"""
+Claves RSA con que el servicio firma los tokens (RS256).
+
+Cada archivo `<kid>.pem` de JWT_KEYS_DIR es una clave privada; el nombre del
+archivo es su `kid`. Firma la última en orden alfabético (nombrarlas por
+fecha, p. ej. `2026-10-01.pem`) y todas se publican en
+`/.well-known/jwks.json`. Para rotar se agrega una clave nueva; la anterior
+se borra cuando vencieron los tokens firmados con ella
+(ACCESS_TOKEN_EXPIRE_MINUTES).
+
+Sin JWT_KEYS_DIR el servicio firma con HS256 y SECRET_KEY, como antes.
+
+`python -m app.keys <directorio>` genera la primera clave si el directorio no
+tiene ninguna (Docker Compose lo hace antes de levantar el auth).
+"""
+
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from jose import jwk
+
+logger = logging.getLogger(__name__)
+
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+# max-age del JWKS: cada cuánto lo renuevan los demás servicios
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
+
+SIGNING_ALGORITHM = "RS256"
+
+
+class SigningKeys:
+    """
+    Claves privadas por `kid` y la vigente para firmar.
+    """
+
+    def __init__(self, private_keys: Dict[str, str]):
+        if not private_keys:
+            raise ValueError("Se necesita al menos una clave de firma")
+        self._private = dict(private_keys)
+        self._public = {}
+        for kid, pem in self._private.items():
+            publica = jwk.construct(pem, SIGNING_ALGORITHM).public_key().to_dict()
+            publica.update(kid=kid, use="sig")
+            self._public[kid] = publica
+        self.current_kid = max(self._private)
+
+    @classmethod
+    def from_dir(cls, directorio: str) -> "SigningKeys":
+        return cls({p.stem: p.read_text() for p in Path(directorio).glob("*.pem")})
+
+    @property
+    def current_private_key(self) -> str:
+        return self._private[self.current_kid]
+
+    def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        """
+        JWK público de `kid` (fuente de claves de common.auth).
+        """
+        return self._public.get(kid)
+
+    def jwks(self) -> List[dict]:
+        return [self._public[kid] for kid in sorted(self._public)]
+
+
+def load_signing_keys() -> Optional[SigningKeys]:
+    if not JWT_KEYS_DIR:
+        return None
+    claves = SigningKeys.from_dir(JWT_KEYS_DIR)
+    logger.info("Firmando tokens con la clave %s", claves.current_kid)
+    return claves
+
+
+signing_keys = load_signing_keys()
+
+
+def ensure_signing_key(directorio: str) -> Optional[Path]:
+    """
+    Crea una clave RSA `<fecha>.pem` en `directorio` si no tiene ninguna.
+    Devuelve la ruta de la clave creada, o None si ya había.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    carpeta = Path(directorio)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    if any(carpeta.glob("*.pem")):
+        return None
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ruta = carpeta / f"{time.strftime('%Y-%m-%d-%H%M%S')}.pem"
+    ruta.write_bytes(
+        clave.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    ruta.chmod(0o600)
+    return ruta
+
+
+if __name__ == "__main__":
+    creada = ensure_signing_key(sys.argv[1] if len(sys.argv) > 1 else "keys")
+    print(f"Clave creada: {creada}" if creada else "Ya hay claves de firma")
@@ -1,37 +1,71 @@
-from datetime import timedelta
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import Depends, FastAPI, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from common.database import SessionLocal, engine
+from common import auth as common_auth
+from common import metrics
+from common.database import DB_ASYNC, SessionLocal, get_db
+from common.pagination import decode_cursor, set_next_cursor
+from common.revocation import RevocationList
 
-from . import auth_utils, crud, models, schemas
-
-# Crear las tablas en la base de datos (si no existen)
-models.Base.metadata.create_all(bind=engine)
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+from . import auth_utils, crud, keys, schemas
+from .hashing import PasswordHashingBusy
 
 app = FastAPI(
     title="Servicio de Autenticación",
     description="Microservicio para gestionar usuarios, roles y autenticación (JWT).",
     version="0.1.0",
 )
+app.include_router(metrics.router)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
+if keys.signing_keys is not None:
+    # Los tokens propios se verifican con las claves locales, sin el JWKS.
+    common_auth.use_key_source(keys.signing_keys)
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def _sesiones_revocadas():
+    desde = datetime.utcnow() - timedelta(
+        minutes=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+    with SessionLocal() as db:
+        return crud.get_revoked_families(db, desde)
+
+
+# Los access tokens propios (/users/me, /verify-token) se rechazan en cuanto
+# se revoca su sesión, también los que verificó otro worker.
+common_auth.use_revocation_list(
+    RevocationList(
+        _sesiones_revocadas,
+        retention_seconds=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+)
+
+if DB_ASYNC:
+    from . import async_routes
+
+    # Registradas primero, tienen precedencia sobre sus versiones síncronas.
+    app.include_router(async_routes.router)
+
+
+def _hashing_saturado():
+    """
+    El pool de bcrypt está lleno: el cliente debe reintentar en un momento.
+    """
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many concurrent password operations, retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def create_user(
+    user: schemas.UserCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo usuario.
     Los roles (veterinario, peluquero, admin, cliente) se asignarán aquí.
@@ -39,19 +73,26 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    try:
+        return crud.create_user(db=db, user=user)
+    except PasswordHashingBusy:
+        raise _hashing_saturado()
 
 
 @app.post("/token", response_model=schemas.Token)
 def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db, scope="function"),
 ):
     """
     Endpoint para el login de usuarios.
     Devuelve un token JWT que se usará para autenticar las peticiones
     a otros microservicios.
     """
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = crud.authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHashingBusy:
+        raise _hashing_saturado()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,12 +100,83 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    refresh_token, sesion = crud.create_session(db, user.id)
+    return _tokens(user, refresh_token, sesion)
+
+
+def _tokens(user, refresh_token: str, sesion):
     access_token_expires = timedelta(minutes=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_utils.create_access_token(
-        data={"sub": user.email, "roles": [role.name for role in user.roles]},
+        data={
+            "sub": user.email,
+            "roles": [role.name for role in user.roles],
+            "sid": sesion.family_id,
+        },
         expires_delta=access_token_expires,
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+def _refresh_invalido(detail: str = "Invalid refresh token"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+@app.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(
+    body: schemas.RefreshRequest, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Canjea un refresh token por un access token y un refresh token nuevos,
+    sin verificar la contraseña. Cada refresh token sirve una sola vez:
+    presentar uno ya canjeado revoca la sesión completa.
+    """
+    try:
+        rotado = crud.rotate_session(db, body.refresh_token)
+    except crud.RefreshTokenReused as e:
+        # La revocación se confirma aunque la petición falle.
+        db.commit()
+        common_auth.get_revocation_list().add(e.family_id)
+        raise _refresh_invalido("Refresh token reuse detected")
+    if rotado is None:
+        raise _refresh_invalido()
+    refresh_token, sesion = rotado
+    return _tokens(crud.get_user(db, sesion.user_id), refresh_token, sesion)
+
+
+@app.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: schemas.RefreshRequest, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Revoca la sesión del refresh token y sus access tokens.
+    """
+    sesion = crud.get_session_by_token(db, body.refresh_token)
+    if sesion is not None:
+        crud.revoke_session_family(db, sesion.family_id)
+        common_auth.get_revocation_list().add(sesion.family_id)
+
+
+@app.get("/sessions/revoked")
+def revoked_sessions(
+    response: Response, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Sesiones revocadas cuyos access tokens aún no vencieron, para que los
+    demás servicios los rechacen (REVOCATIONS_URL).
+    """
+    response.headers["Cache-Control"] = "no-cache"
+    desde = datetime.utcnow() - timedelta(
+        minutes=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+    return {"revoked": crud.get_revoked_families(db, desde)}
 
 
 @app.get("/")
@@ -73,7 +185,9 @@ def read_root():
 
 
 @app.post("/roles/", response_model=schemas.Role)
-def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
+def create_role(
+    role: schemas.RoleCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo rol en el sistema.
     """
@@ -84,38 +198,68 @@ def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/roles/", response_model=List[schemas.Role])
-def read_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_roles(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene lista de roles disponibles.
     """
-    return crud.get_roles(db, skip=skip, limit=limit)
+    roles = crud.get_roles(db, skip=skip, limit=limit, after_id=decode_cursor(cursor))
+    set_next_cursor(response, roles, limit)
+    return roles
 
 
 @app.get("/users/me", response_model=schemas.User)
-def read_users_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def read_users_me(
+    principal: common_auth.Principal = Depends(common_auth.require_principal),
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene información del usuario actual basada en el token JWT.
     """
-    email = auth_utils.verify_token(token)
-    user = crud.get_user_by_email(db, email=email)
+    user = crud.get_user_principal(db, email=principal.email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @app.get("/users/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene lista de usuarios (requiere autenticación).
     """
-    return crud.get_users(db, skip=skip, limit=limit)
+    users = crud.get_users(db, skip=skip, limit=limit, after_id=decode_cursor(cursor))
+    set_next_cursor(response, users, limit)
+    return users
+
+
+@app.get("/.well-known/jwks.json")
+def jwks(response: Response):
+    """
+    Claves públicas para verificar los tokens RS256 (vacío con HS256).
+    """
+    response.headers["Cache-Control"] = f"public, max-age={keys.JWKS_MAX_AGE_SECONDS}"
+    if keys.signing_keys is None:
+        return {"keys": []}
+    return {"keys": keys.signing_keys.jwks()}
 
 
 @app.get("/verify-token")
-def verify_token(token: str = Depends(oauth2_scheme)):
+def verify_token(
+    principal: common_auth.Principal = Depends(common_auth.require_principal),
+):
     """
-    Endpoint para que otros microservicios verifiquen tokens JWT.
+    Verifica un token JWT. Los demás servicios lo verifican localmente con
+    `common.auth`; el endpoint queda para clientes externos.
     """
-    email = auth_utils.verify_token(token)
-    roles = auth_utils.get_user_roles_from_token(token)
-    return {"email": email, "roles": roles, "valid": True}
+    return {"email": principal.email, "roles": list(principal.roles), "valid": True}
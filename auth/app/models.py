@@ -1,7 +1,17 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    Table,
+)
+from sqlalchemy.orm import declarative_base, relationship
 
-from common.database import Base
+# Base propia del servicio: su MetaData contiene sólo las tablas del esquema
+# `users`, que el search_path de DATABASE_URL selecciona.
+Base = declarative_base()
 
 # Tabla de asociación para la relación muchos a muchos entre Usuarios y Roles
 user_roles = Table(
@@ -35,3 +45,22 @@ class Role(Base):
 
     # Relación inversa para User
     users = relationship("User", secondary=user_roles, back_populates="roles")
+
+
+class UserSession(Base):
+    """
+    Un refresh token emitido. Los tokens que se rotan desde un mismo login
+    comparten `family_id`, que es el `sid` de sus access tokens.
+    """
+
+    __tablename__ = "sessions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    # SHA-256 del refresh token: el token no se guarda
+    token_hash = Column(String(64), nullable=False, unique=True)
+    expires_at = Column(DateTime, nullable=False)
+    # Rotado: presentarlo de nuevo es una reutilización
+    used_at = Column(DateTime)
+    revoked_at = Column(DateTime, index=True)
@@ -0,0 +1,129 @@
+"""
+Caché en memoria de usuario + roles (lo que devuelve `/users/me`).
+
+Cada entrada vale PRINCIPAL_CACHE_TTL segundos y se descarta antes si este
+proceso confirma un cambio del usuario; un cambio en los roles vacía la
+caché. Los demás workers la ven vencer a lo sumo tras el TTL, mucho menos
+que los 30 minutos durante los que un access token ya lleva sus roles.
+
+Las escrituras masivas (`update()`/`delete()`/`insert()` sobre usuarios,
+roles o `user_roles`) no pasan por el flush: al confirmarlas se vacía la
+caché entera.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import models
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+# Marca en session.info: emails a invalidar al confirmar ("*" = todos)
+_MODIFICADOS = "principales_modificados"
+
+
+class PrincipalCache:
+    """
+    LRU de usuarios por email con vencimiento.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> Optional[dict]:
+        with self._lock:
+            entrada = self._entries.get(email)
+            if entrada is None:
+                return None
+            vence, datos = entrada
+            if vence <= time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return datos
+
+    def put(self, email: str, datos: dict):
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl_seconds, datos)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email: str):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+def principal_data(user: models.User) -> dict:
+    """
+    Lo que se guarda en la caché: el usuario con sus roles ya cargados, con
+    la forma del esquema `User`.
+    """
+    return {
+        "id": user.id,
+        "email": user.email,
+        "is_active": user.is_active,
+        "roles": [
+            {"id": r.id, "name": r.name, "description": r.description}
+            for r in user.roles
+        ],
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_modificados(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, models.Role):
+            session.info.setdefault(_MODIFICADOS, set()).add("*")
+        elif isinstance(obj, models.User):
+            # También el email anterior, si cambió.
+            historia = inspect(obj).attrs.email.history
+            emails = {*historia.added, *historia.unchanged, *historia.deleted}
+            session.info.setdefault(_MODIFICADOS, set()).update(emails)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_escritura_masiva(state):
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    if getattr(state.statement, "table", None) is models.user_roles or any(
+        m.class_ in (models.User, models.Role) for m in state.all_mappers
+    ):
+        # No se sabe qué usuarios cambiaron.
+        state.session.info.setdefault(_MODIFICADOS, set()).add("*")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar(session):
+    modificados = session.info.pop(_MODIFICADOS, None)
+    if not modificados:
+        return
+    if "*" in modificados:
+        principal_cache.clear()
+        return
+    for email in modificados:
+        principal_cache.invalidate(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_MODIFICADOS, None)
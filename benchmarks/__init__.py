@@ -0,0 +1 @@
+# Este directorio contiene scripts de benchmark ejecutables con `python -m`.
@@ -0,0 +1,150 @@
+"""
+Comparación de throughput entre los endpoints síncronos (threadpool de
+FastAPI) y los asíncronos (AsyncSession, DB_ASYNC=true) de petshop con 500
+clientes concurrentes.
+
+Levanta el servicio con uvicorn una vez por modo y lanza `--peticiones`
+GET /productos/ repartidas entre `--clientes` conexiones simultáneas. Con los
+endpoints síncronos cada petición ocupa uno de los 40 hilos del threadpool;
+con los asíncronos la concurrencia queda acotada sólo por el pool de
+conexiones.
+
+En modo síncrono `get_db` admite sólo tantas peticiones como conexiones
+tiene el pool (DB_MAX_CONCURRENT_REQUESTS); sin ese límite, los hilos que
+esperan conexión pueden acaparar el threadpool y las peticiones terminan con
+DB_POOL_TIMEOUT. Las respuestas con error se cuentan aparte.
+
+Uso:
+    python -m benchmarks.bench_async --database-url postgresql://...
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_async.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from petshop.app import models  # noqa: E402
+
+
+def _cargar(engine, session_factory, filas: int):
+    """Siembra `filas` productos; reutiliza la base si ya tiene ese tamaño."""
+    models.Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        if db.scalar(select(func.count(models.Producto.id))) == filas:
+            return
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        db.execute(
+            insert(models.Producto),
+            [{"nombre": f"Producto {i}", "precio": 10.0} for i in range(filas)],
+        )
+        db.commit()
+
+
+def _levantar(database_url: str, puerto: int, asincrono: bool):
+    entorno = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        DB_ASYNC="true" if asincrono else "false",
+        CACHE_ENABLED="false",
+    )
+    proceso = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "petshop.app.main:app",
+            "--port",
+            str(puerto),
+            "--timeout-keep-alive",
+            "120",
+            "--log-level",
+            "warning",
+        ],
+        env=entorno,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/")
+            return proceso
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError("El servicio no arrancó")
+
+
+async def _carga(url: str, clientes: int, peticiones: int):
+    latencias = []
+    errores = 0
+    pendientes = iter(range(peticiones))
+    limites = httpx.Limits(max_connections=clientes)
+
+    async with httpx.AsyncClient(limits=limites, timeout=60) as cliente:
+
+        async def trabajador():
+            nonlocal errores
+            for _ in pendientes:
+                inicio = time.perf_counter()
+                try:
+                    response = await cliente.get(url, params={"limit": 20})
+                    errores += response.status_code != 200
+                except httpx.TransportError:
+                    errores += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(clientes)))
+        return time.perf_counter() - inicio, latencias, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--peticiones", type=int, default=10_000)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--modo", choices=["sync", "async", "ambos"], default="ambos")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    _cargar(engine, sessionmaker(bind=engine), args.filas)
+    engine.dispose()
+
+    print(f"clientes={args.clientes} peticiones={args.peticiones}")
+    print(f"{'modo':>8} {'pet/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    modos = {"sync": (False,), "async": (True,), "ambos": (False, True)}
+    for asincrono in modos[args.modo]:
+        proceso = _levantar(args.database_url, args.puerto, asincrono)
+        try:
+            url = f"http://127.0.0.1:{args.puerto}/productos/"
+            duracion, latencias, errores = asyncio.run(
+                _carga(url, args.clientes, args.peticiones)
+            )
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        latencias.sort()
+        print(
+            f"{'async' if asincrono else 'sync':>8} "
+            f"{args.peticiones / duracion:>8.0f} "
+            f"{statistics.median(latencias) * 1000:>8.2f} "
+            f"{latencias[int(len(latencias) * 0.99) - 1] * 1000:>8.2f} "
+            f"{errores:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Costo de autorizar una petición con un JWT: verificación local con
+common.auth (decode sin caché y con la caché de tokens verificados) frente a
+consultar `/verify-token` del servicio de autenticación.
+
+Sin `--url` la consulta remota se mide contra el servicio de autenticación
+en el mismo proceso (TestClient), una cota inferior del salto por red.
+
+Uso:
+    python -m benchmarks.bench_auth --iteraciones 20000 --url http://localhost:8001
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_auth.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from auth.app.auth_utils import create_access_token  # noqa: E402
+from common import auth  # noqa: E402
+
+
+def _medir(funcion, iteraciones: int) -> float:
+    """
+    Microsegundos por llamada.
+    """
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    return (time.perf_counter() - inicio) / iteraciones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iteraciones", type=int, default=20000)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench@example.com", "roles": ["admin"]})
+    auth.verify_token(token)
+    if args.url:
+        cliente = httpx.Client(base_url=args.url)
+    else:
+        from auth.app.main import app
+
+        cliente = TestClient(app)
+    cabecera = {"Authorization": f"Bearer {token}"}
+    remotas = max(args.iteraciones // 20, 1)
+
+    mediciones = [
+        ("decode local", _medir(lambda: auth.decode_token(token), args.iteraciones)),
+        ("caché local", _medir(lambda: auth.verify_token(token), args.iteraciones)),
+        (
+            "GET /verify-token",
+            _medir(lambda: cliente.get("/verify-token", headers=cabecera), remotas),
+        ),
+    ]
+    for nombre, microsegundos in mediciones:
+        print(f"{nombre:>20} {microsegundos:>10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Logins por segundo según la cantidad de procesos del pool de bcrypt
+(auth/app/hashing.py).
+
+Para 0 workers (bcrypt en el hilo de la petición, como antes del pool) y de
+1 a `--max-workers` procesos, `--clientes` hilos verifican contraseñas a la
+vez durante `--segundos`, como el threadpool de FastAPI ante una ráfaga de
+logins. Con el pool el throughput escala con los núcleos hasta saturarlos;
+las verificaciones rechazadas por cola llena (429 en la API) se informan
+aparte. La columna "ping ms" es la latencia de una operación trivial en otro
+hilo del mismo proceso mientras dura la ráfaga: lo que espera un endpoint
+que no hashea.
+
+El costo es el de BCRYPT_ROUNDS, que también leen los procesos del pool:
+
+    BCRYPT_ROUNDS=12 python -m benchmarks.bench_hashing --max-workers 4
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from auth.app.hashing import (
+    BCRYPT_ROUNDS,
+    PasswordHasher,
+    PasswordHashingBusy,
+    pwd_context,
+)
+
+
+def _rafaga(hasher: PasswordHasher, hashed: str, clientes: int, segundos: float):
+    verificados = []
+    rechazados = []
+    fin = time.perf_counter() + segundos
+
+    def cliente():
+        ok = rechazos = 0
+        while time.perf_counter() < fin:
+            try:
+                hasher.verify_and_update("clave", hashed)
+                ok += 1
+            except PasswordHashingBusy:
+                rechazos += 1
+                # Retry-After, acortado para la medición
+                time.sleep(0.1)
+        verificados.append(ok)
+        rechazados.append(rechazos)
+
+    hilos = [threading.Thread(target=cliente) for _ in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    pings = []
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        sum(range(1000))
+        pings.append(time.perf_counter() - inicio)
+        time.sleep(0.01)
+    for hilo in hilos:
+        hilo.join()
+    return sum(verificados), sum(rechazados), pings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--clientes", type=int, default=40)
+    parser.add_argument("--cola", type=int, default=None)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Con el costo actual: verify_and_update no lo rehace.
+    hashed = pwd_context.hash("clave")
+    print(
+        f"CPUs={os.cpu_count()} rounds={BCRYPT_ROUNDS} clientes={args.clientes} "
+        f"segundos={args.segundos}"
+    )
+    print(
+        f"{'workers':>8} {'cola':>6} {'logins/s':>9} {'rechazos':>9} " f"{'ping ms':>8}"
+    )
+    for workers in range(0, args.max_workers + 1):
+        cola = args.cola or max(workers, 1) * 4
+        hasher = PasswordHasher(workers, cola)
+        try:
+            # Arranca los procesos fuera de la medición.
+            hasher.verify_and_update("clave", hashed)
+            ok, rechazos, pings = _rafaga(hasher, hashed, args.clientes, args.segundos)
+        finally:
+            hasher.shutdown()
+        print(
+            f"{workers:>8} {cola:>6} {ok / args.segundos:>9.1f} {rechazos:>9} "
+            f"{statistics.median(pings) * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
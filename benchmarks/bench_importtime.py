@@ -0,0 +1,151 @@
+"""
+Perfil de importación de cada servicio: qué paquetes pesan en el arranque en
+frío y cuánta memoria ocupa el proceso con la aplicación cargada.
+
+Importa `<servicio>.app.main` en un proceso nuevo con `python -X importtime`
+y agrupa el tiempo propio de cada módulo por paquete raíz (fastapi, pydantic,
+sqlalchemy, ...). Sin `-X importtime`, que agrega su propio costo, mide el
+tiempo total de importación y el RSS máximo, y verifica que el proceso web no
+cargue bibliotecas del worker (`PAQUETES_DEL_WORKER`). Los presupuestos de
+`PRESUPUESTOS` se verifican en tests/test_startup.py.
+
+Uso:
+    python -m benchmarks.bench_importtime --servicio petshop --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter, namedtuple
+from typing import Dict, List, Tuple
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_importtime.db")
+
+SERVICIOS = ["auth", "veterinaria", "peluqueria", "petshop"]
+
+# Bibliotecas de procesamiento que sólo usa el worker de Celery
+PAQUETES_DEL_WORKER = (
+    "celery",
+    "kombu",
+    "pandas",
+    "numpy",
+    "openpyxl",
+    "PIL",
+    "pytesseract",
+    "easyocr",
+)
+
+Presupuesto = namedtuple("Presupuesto", ["segundos", "rss_mb"])
+
+# Holgados respecto de lo medido (~0.9 s y 60-75 MB en un CPU), para detectar
+# una dependencia pesada nueva y no el ruido de la máquina.
+PRESUPUESTOS: Dict[str, Presupuesto] = {
+    "auth": Presupuesto(segundos=2.5, rss_mb=110),
+    "veterinaria": Presupuesto(segundos=2.5, rss_mb=100),
+    "peluqueria": Presupuesto(segundos=2.5, rss_mb=100),
+    "petshop": Presupuesto(segundos=2.5, rss_mb=100),
+}
+
+PerfilImportacion = namedtuple(
+    "PerfilImportacion", ["segundos", "rss_mb", "modulos", "del_worker"]
+)
+
+_MEDICION = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - inicio
+# ru_maxrss hereda el máximo del proceso padre a través de fork/exec; VmHWM
+# es el del proceso nuevo.
+try:
+    with open("/proc/self/status") as status:
+        linea = next(l for l in status if l.startswith("VmHWM:"))
+    rss_mb = int(linea.split()[1]) / 1024
+except OSError:
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{
+    "segundos": segundos,
+    "rss_mb": rss_mb,
+    "modulos": sorted(sys.modules),
+}}))
+"""
+
+
+def _entorno() -> Dict[str, str]:
+    return dict(
+        os.environ,
+        DATABASE_URL=os.getenv("DATABASE_URL", f"sqlite:///{_DB_PATH}"),
+        PYTHONWARNINGS="ignore",
+    )
+
+
+def perfil_importacion(servicio: str) -> PerfilImportacion:
+    """
+    Tiempo de importación, RSS máximo y módulos cargados al importar la
+    aplicación del servicio en un proceso nuevo.
+    """
+    salida = subprocess.run(
+        [sys.executable, "-c", _MEDICION.format(modulo=f"{servicio}.app.main")],
+        env=_entorno(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    datos = json.loads(salida.stdout.strip().splitlines()[-1])
+    raices = {m.split(".")[0] for m in datos["modulos"]}
+    return PerfilImportacion(
+        segundos=datos["segundos"],
+        rss_mb=datos["rss_mb"],
+        modulos=len(datos["modulos"]),
+        del_worker=sorted(raices.intersection(PAQUETES_DEL_WORKER)),
+    )
+
+
+def tiempos_por_paquete(servicio: str) -> List[Tuple[str, float]]:
+    """
+    Segundos de importación por paquete raíz según `-X importtime`, de mayor
+    a menor.
+    """
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {servicio}.app.main"],
+        env=_entorno(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    por_paquete: Counter = Counter()
+    for linea in salida.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linea.startswith("import time:") or "imported package" in linea:
+            continue
+        propio, _, modulo = linea[len("import time:") :].split("|")
+        por_paquete[modulo.strip().split(".")[0]] += int(propio) / 1e6
+    return por_paquete.most_common()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--servicio", choices=SERVICIOS, action="append")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for servicio in args.servicio or SERVICIOS:
+        perfil = perfil_importacion(servicio)
+        presupuesto = PRESUPUESTOS[servicio]
+        print(
+            f"== {servicio}: {perfil.segundos:.2f} s "
+            f"(presupuesto {presupuesto.segundos} s), "
+            f"{perfil.rss_mb:.0f} MB (presupuesto {presupuesto.rss_mb} MB), "
+            f"{perfil.modulos} módulos"
+        )
+        if perfil.del_worker:
+            print(f"   bibliotecas del worker cargadas: {perfil.del_worker}")
+        for paquete, segundos in tiempos_por_paquete(servicio)[: args.top]:
+            print(f"   {paquete:>24} {segundos * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark de paginación: latencia de la página 1 contra la página 10.000 con
+OFFSET y con cursor (keyset) sobre una tabla de productos de 1M de filas.
+
+Uso:
+    python -m benchmarks.bench_pagination --filas 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_pagination.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from petshop.app import crud, models  # noqa: E402
+
+LOTE_CARGA = 50_000
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos de `repeticiones` ejecuciones."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def _cargar(engine, session_factory, filas: int):
+    """Siembra `filas` productos; reutiliza la base si ya tiene ese tamaño."""
+    models.Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        if db.scalar(select(func.count(models.Producto.id))) == filas:
+            return
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        for desde in range(0, filas, LOTE_CARGA):
+            db.execute(
+                insert(models.Producto),
+                [
+                    {"nombre": f"Producto {i}", "precio": 10.0, "stock": 1}
+                    for i in range(desde, min(desde + LOTE_CARGA, filas))
+                ],
+            )
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--limite", type=int, default=100)
+    parser.add_argument("--pagina", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    _cargar(engine, session_factory, args.filas)
+
+    saltear = (args.pagina - 1) * args.limite
+    with session_factory() as db:
+        # Id del último producto de la página anterior, como lo traería el cursor
+        ultimo_id = db.scalar(
+            select(models.Producto.id)
+            .order_by(models.Producto.id)
+            .offset(saltear - 1)
+            .limit(1)
+        )
+
+        casos = {
+            "offset p1": lambda: crud.get_productos(db, skip=0, limit=args.limite),
+            f"offset p{args.pagina}": lambda: crud.get_productos(
+                db, skip=saltear, limit=args.limite
+            ),
+            "cursor p1": lambda: crud.get_productos(db, limit=args.limite, after_id=0),
+            f"cursor p{args.pagina}": lambda: crud.get_productos(
+                db, limit=args.limite, after_id=ultimo_id
+            ),
+        }
+        print(f"{'caso':>14} {'ms (mediana)':>13}")
+        for nombre, funcion in casos.items():
+            print(f"{nombre:>14} {_medir(funcion, args.repeticiones):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
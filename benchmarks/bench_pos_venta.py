@@ -0,0 +1,101 @@
+"""
+Benchmark del Punto de Venta: compara el registro de ventas ítem por ítem
+(una consulta, un commit y un refresh por producto) contra el motor de ventas
+por lotes de `crud.registrar_venta`.
+
+Uso:
+    python -m benchmarks.bench_pos_venta --repeticiones 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_pos_venta.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from petshop.app import crud, models, schemas  # noqa: E402
+
+TAMANOS_CANASTA = (1, 10, 100)
+
+
+def _venta_item_por_item(db, items):
+    """
+    Camino original del TPV: SELECT + validación + commit + refresh por ítem.
+    """
+    for item in items:
+        producto = crud.get_producto(db, item.producto_id)
+        if producto.stock < item.cantidad:
+            raise ValueError("Stock insuficiente")
+        producto.stock -= item.cantidad
+        db.add(producto)
+        db.commit()
+        db.refresh(producto)
+    db.commit()
+
+
+def _medir(session_factory, contador, funcion, items, repeticiones):
+    db = session_factory()
+    try:
+        contador["sentencias"] = 0
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion(db, items)
+        duracion = time.perf_counter() - inicio
+    finally:
+        db.close()
+    return {
+        "ms_por_venta": duracion * 1000 / repeticiones,
+        "sentencias_por_venta": contador["sentencias"] / repeticiones,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    contador = {"sentencias": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        contador["sentencias"] += 1
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    max_items = max(TAMANOS_CANASTA)
+    stock_inicial = 10 * args.repeticiones * 2
+    with session_factory() as db:
+        db.add_all(
+            models.Producto(
+                nombre=f"Producto {i}", precio=10.0 + i, stock=stock_inicial
+            )
+            for i in range(max_items)
+        )
+        db.commit()
+        ids = [p.id for p in db.query(models.Producto.id).order_by(models.Producto.id)]
+
+    print(f"{'items':>6} {'camino':>12} {'ms/venta':>10} {'sentencias':>11}")
+    for tamano in TAMANOS_CANASTA:
+        items = [schemas.VentaItem(producto_id=pid, cantidad=1) for pid in ids[:tamano]]
+        for nombre, funcion in (
+            ("item_a_item", _venta_item_por_item),
+            ("lote", crud.registrar_venta),
+        ):
+            r = _medir(session_factory, contador, funcion, items, args.repeticiones)
+            print(
+                f"{tamano:>6} {nombre:>12} {r['ms_por_venta']:>10.2f} "
+                f"{r['sentencias_por_venta']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
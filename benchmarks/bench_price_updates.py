@@ -0,0 +1,63 @@
+"""
+Benchmark de la actualización masiva de precios: filas por segundo según el
+tamaño de lote (una transacción y un UPDATE masivo por lote).
+
+Uso:
+    python -m benchmarks.bench_price_updates --filas 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_price_updates.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from petshop.app import crud, models  # noqa: E402
+
+TAMANOS_LOTE = (100, 1000, 5000, 10000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with session_factory() as db:
+        db.execute(
+            insert(models.Producto),
+            [
+                {"sku": f"SKU{i:07d}", "nombre": f"Producto {i}", "precio": 10.0}
+                for i in range(args.filas)
+            ],
+        )
+        db.commit()
+
+    print(f"{'lote':>7} {'segundos':>9} {'filas/s':>10}")
+    for ronda, tamano in enumerate(TAMANOS_LOTE):
+        cambios = [
+            {"sku": f"SKU{i:07d}", "new_price": 10.0 + ronda + i % 100 / 100}
+            for i in range(args.filas)
+        ]
+        with session_factory() as db:
+            inicio = time.perf_counter()
+            resultado = crud.aplicar_actualizaciones_precio(
+                db, cambios, clave_base=f"bench-{ronda}", tamano_lote=tamano
+            )
+            duracion = time.perf_counter() - inicio
+        assert len(resultado["exitosas"]) == args.filas
+        print(f"{tamano:>7} {duracion:>9.2f} {args.filas / duracion:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
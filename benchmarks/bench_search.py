@@ -0,0 +1,100 @@
+"""
+Benchmark de la búsqueda de productos para autocompletado: latencia por
+consulta con 500k productos (objetivo: menos de 20 ms).
+
+Con SQLite mide el índice en memoria; con --database-url apuntando a
+PostgreSQL mide los índices GIN de trigramas y tsvector.
+
+Uso:
+    python -m benchmarks.bench_search --filas 500000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_search.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from petshop.app import crud, models  # noqa: E402
+
+TIPOS = ["Alimento", "Collar", "Juguete", "Cama", "Shampoo", "Arena", "Correa"]
+DETALLES = ["Premium", "Antipulgas", "Hipoalergénico", "Reforzado", "Natural"]
+MASCOTAS = ["Perros", "Gatos", "Cachorros", "Aves", "Peces", "Conejos"]
+TAMANOS = ["Pequeño", "Mediano", "Grande", "1kg", "3kg", "15kg"]
+
+CONSULTAS = ["al", "alim", "alimento perr", "collar antip", "jug gat", "cama gr"]
+
+
+def _cargar(engine, session_factory, filas: int):
+    """Siembra `filas` productos; reutiliza la base si ya tiene ese tamaño."""
+    models.Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        if db.scalar(select(func.count(models.Producto.id))) == filas:
+            return
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    azar = random.Random(42)
+    with session_factory() as db:
+        for desde in range(0, filas, 50_000):
+            db.execute(
+                insert(models.Producto),
+                [
+                    {
+                        "nombre": " ".join(
+                            [
+                                azar.choice(TIPOS),
+                                azar.choice(DETALLES),
+                                "para",
+                                azar.choice(MASCOTAS),
+                                azar.choice(TAMANOS),
+                                str(i),
+                            ]
+                        ),
+                        "precio": 10.0,
+                    }
+                    for i in range(desde, min(desde + 50_000, filas))
+                ],
+            )
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=500_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    _cargar(engine, session_factory, args.filas)
+
+    with session_factory() as db:
+        inicio = time.perf_counter()
+        crud.buscar_productos(db, "alimento")
+        print(
+            "primera búsqueda (construye el índice): "
+            f"{time.perf_counter() - inicio:.2f} s"
+        )
+
+        print(f"{'consulta':>16} {'p50 ms':>8} {'p95 ms':>8}")
+        for q in CONSULTAS:
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                crud.buscar_productos(db, q)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            tiempos.sort()
+            p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+            print(f"{q:>16} {statistics.median(tiempos):>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Arranque en frío de cada servicio: tiempo desde lanzar uvicorn hasta la
+primera respuesta 200 en "/".
+
+La base se migra una vez con Alembic antes de medir, como hace el servicio
+`migrate` de Docker Compose; los procesos web ya no ejecutan DDL al importar
+la aplicación. Se informa la mediana y el máximo de `--repeticiones`
+arranques por servicio.
+
+Uso:
+    python -m benchmarks.bench_startup --database-url postgresql://...
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_startup.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+
+SERVICIOS = ["auth", "veterinaria", "peluqueria", "petshop"]
+
+
+def _migrar(database_url: str):
+    for servicio in SERVICIOS:
+        os.environ[f"{servicio.upper()}_DATABASE_URL"] = database_url
+        config = Config("alembic.ini", ini_section=servicio)
+        config.attributes["configure_logger"] = False
+        command.upgrade(config, "head")
+
+
+def _arranque(servicio: str, database_url: str, puerto: int) -> float:
+    """Segundos hasta la primera respuesta 200 de un proceso nuevo."""
+    entorno = dict(os.environ, DATABASE_URL=database_url, CACHE_ENABLED="false")
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{servicio}.app.main:app",
+            "--port",
+            str(puerto),
+            "--log-level",
+            "warning",
+        ],
+        env=entorno,
+    )
+    try:
+        while time.perf_counter() - inicio < 60:
+            try:
+                if httpx.get(f"http://127.0.0.1:{puerto}/").status_code == 200:
+                    return time.perf_counter() - inicio
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"El servicio {servicio} no arrancó")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    _migrar(args.database_url)
+
+    print(f"{'servicio':>12} {'mediana s':>10} {'máximo s':>10}")
+    for servicio in SERVICIOS:
+        tiempos = [
+            _arranque(servicio, args.database_url, args.puerto)
+            for _ in range(args.repeticiones)
+        ]
+        print(
+            f"{servicio:>12} {statistics.median(tiempos):>10.2f} "
+            f"{max(tiempos):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Escalado del servidor de producción: throughput de petshop con gunicorn de 1
+a `--max-workers` workers de uvicorn (common/gunicorn_conf.py).
+
+Para cada cantidad de workers levanta gunicorn con el mismo presupuesto de
+conexiones (`--presupuesto`, repartido entre los workers) y lanza
+`--peticiones` GET /productos/ desde `--clientes` conexiones simultáneas.
+El throughput escala mientras haya CPUs libres; con más workers que CPUs se
+estanca, y cada worker recibe menos conexiones del presupuesto.
+
+Los workers se reciclan como en producción (GUNICORN_MAX_REQUESTS): al
+reiniciarse uno, cierra sus conexiones keep-alive ociosas y alguna petición
+que el cliente ya enviaba por ellas se cuenta como error (detrás de un proxy,
+éste la reintenta). Con GUNICORN_MAX_REQUESTS=0 no se recicla.
+
+Uso:
+    python -m benchmarks.bench_workers --max-workers 4 --database-url postgresql://...
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_workers.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from benchmarks.bench_async import _carga, _cargar  # noqa: E402
+from common.gunicorn_conf import pool_por_worker  # noqa: E402
+
+
+def _levantar(database_url: str, puerto: int, workers: int, presupuesto: int):
+    entorno = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        WEB_CONCURRENCY=str(workers),
+        DB_CONNECTION_BUDGET=str(presupuesto),
+        GUNICORN_BIND=f"127.0.0.1:{puerto}",
+        CACHE_ENABLED="false",
+    )
+    # El pool por worker lo deriva gunicorn_conf del presupuesto.
+    entorno.pop("DB_POOL_SIZE", None)
+    entorno.pop("DB_MAX_OVERFLOW", None)
+    proceso = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "python:common.gunicorn_conf",
+            "--keep-alive",
+            "120",
+            "--log-level",
+            "warning",
+            "petshop.app.main:app",
+        ],
+        env=entorno,
+    )
+    # Espera a que respondan todos los workers, no sólo el primero.
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/")
+            time.sleep(0.5 * workers)
+            return proceso
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError("gunicorn no arrancó")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() * 2)
+    parser.add_argument("--presupuesto", type=int, default=40)
+    parser.add_argument("--clientes", type=int, default=100)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--puerto", type=int, default=8766)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    _cargar(engine, sessionmaker(bind=engine), args.filas)
+    engine.dispose()
+
+    print(
+        f"CPUs={os.cpu_count()} presupuesto={args.presupuesto} "
+        f"clientes={args.clientes} peticiones={args.peticiones}"
+    )
+    print(
+        f"{'workers':>8} {'pool/worker':>12} {'pet/s':>8} {'p50 ms':>8} "
+        f"{'p99 ms':>8} {'errores':>8}"
+    )
+    workers = 1
+    while workers <= args.max_workers:
+        pool_size, max_overflow = pool_por_worker(args.presupuesto, workers)
+        proceso = _levantar(args.database_url, args.puerto, workers, args.presupuesto)
+        try:
+            url = f"http://127.0.0.1:{args.puerto}/productos/"
+            duracion, latencias, errores = asyncio.run(
+                _carga(url, args.clientes, args.peticiones)
+            )
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        latencias.sort()
+        print(
+            f"{workers:>8} {f'{pool_size}+{max_overflow}':>12} "
+            f"{args.peticiones / duracion:>8.0f} "
+            f"{statistics.median(latencias) * 1000:>8.2f} "
+            f"{latencias[int(len(latencias) * 0.99) - 1] * 1000:>8.2f} "
+            f"{errores:>8}"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
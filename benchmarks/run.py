@@ -0,0 +1,450 @@
+"""
+Suite de carga de los cuatro servicios: siembra volúmenes realistas y mide
+throughput y latencia de los endpoints más usados, con resultados en JSON
+comparables entre commits.
+
+Volúmenes (con `--escala 1`): 100k productos, 50k mascotas, 200k turnos y 20k
+usuarios. La base se migra con Alembic y se siembra una sola vez; si ya tiene
+esos volúmenes se reutiliza. Cada servicio se levanta con uvicorn contra la
+misma base (SQLite por defecto, o PostgreSQL con --database-url) y cada
+escenario corre `--segundos` segundos con `--clientes` conexiones
+simultáneas:
+
+    POST /pos/venta/          petshop      venta de 1 a 3 productos al azar
+    GET  /productos/          petshop      primera página del catálogo
+    POST /token               auth         login (bcrypt)
+    GET  /verify-token        auth         verificación del JWT
+    GET  /turnos/             peluqueria   primera página de turnos
+    GET  /mascotas/{id}       veterinaria  mascota al azar
+
+Uso:
+    python -m benchmarks.run --salida resultados.json
+    python -m benchmarks.run --escala 0.1 --comparar resultados.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_suite.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, delete, func, insert, select  # noqa: E402
+
+from auth.app import models as auth_models  # noqa: E402
+from auth.app.hashing import pwd_context  # noqa: E402
+from benchmarks.bench_startup import _migrar  # noqa: E402
+from peluqueria.app import models as peluqueria_models  # noqa: E402
+from petshop.app import models as petshop_models  # noqa: E402
+from veterinaria.app import models as veterinaria_models  # noqa: E402
+
+VOLUMENES = {
+    "productos": 100_000,
+    "mascotas": 50_000,
+    "turnos": 200_000,
+    "usuarios": 20_000,
+}
+PASSWORD = "benchmark"
+LOTE = 10_000
+
+Escenario = namedtuple("Escenario", ["nombre", "servicio", "peticion"])
+
+
+def _usuario(i: int) -> str:
+    return f"usuario{i}@bench.local"
+
+
+def _insertar(conexion, tabla, filas):
+    """Inserta `filas` (un generador) en lotes de LOTE."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == LOTE:
+            conexion.execute(insert(tabla), lote)
+            lote = []
+    if lote:
+        conexion.execute(insert(tabla), lote)
+
+
+def _vaciar(conexion, metadata):
+    for tabla in reversed(metadata.sorted_tables):
+        conexion.execute(delete(tabla))
+
+
+def _ajustar_secuencias(conexion, metadata):
+    """En PostgreSQL, lleva las secuencias de id más allá de los ids sembrados."""
+    if conexion.dialect.name != "postgresql":
+        return
+    for tabla in metadata.sorted_tables:
+        if "id" in tabla.c and tabla.c.id.autoincrement is not False:
+            conexion.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('{tabla.name}', 'id'), "
+                f"COALESCE((SELECT max(id) FROM {tabla.name}), 0) + 1, false)"
+            )
+
+
+def _sembrar(engine, volumenes):
+    """
+    Siembra cada servicio; reutiliza los datos si ya tienen el volumen pedido.
+    """
+    azar = random.Random(42)
+
+    with engine.begin() as conexion:
+        usuarios = auth_models.User.__table__
+        if conexion.scalar(select(func.count()).select_from(usuarios)) != (
+            volumenes["usuarios"]
+        ):
+            _vaciar(conexion, auth_models.Base.metadata)
+            conexion.execute(
+                insert(auth_models.Role.__table__), {"id": 1, "name": "cliente"}
+            )
+            # Un único hash para todos: calcular 20k hashes bcrypt lleva horas.
+            hashed = pwd_context.hash(PASSWORD)
+            _insertar(
+                conexion,
+                usuarios,
+                (
+                    {"id": i, "email": _usuario(i), "hashed_password": hashed}
+                    for i in range(1, volumenes["usuarios"] + 1)
+                ),
+            )
+            _insertar(
+                conexion,
+                auth_models.user_roles,
+                (
+                    {"user_id": i, "role_id": 1}
+                    for i in range(1, volumenes["usuarios"] + 1)
+                ),
+            )
+
+    with engine.begin() as conexion:
+        productos = petshop_models.Producto.__table__
+        if conexion.scalar(select(func.count()).select_from(productos)) != (
+            volumenes["productos"]
+        ):
+            _vaciar(conexion, petshop_models.Base.metadata)
+            _insertar(
+                conexion,
+                petshop_models.Categoria.__table__,
+                ({"id": i, "nombre": f"Categoría {i}"} for i in range(1, 21)),
+            )
+            _insertar(
+                conexion,
+                productos,
+                (
+                    {
+                        "id": i,
+                        "nombre": f"Producto {i}",
+                        "precio": round(azar.uniform(1, 500), 2),
+                        "stock": 10**9,
+                        "categoria_id": azar.randint(1, 20),
+                    }
+                    for i in range(1, volumenes["productos"] + 1)
+                ),
+            )
+
+    with engine.begin() as conexion:
+        mascotas = veterinaria_models.Mascota.__table__
+        if conexion.scalar(select(func.count()).select_from(mascotas)) != (
+            volumenes["mascotas"]
+        ):
+            _vaciar(conexion, veterinaria_models.Base.metadata)
+            _insertar(
+                conexion,
+                mascotas,
+                (
+                    {
+                        "id": i,
+                        "nombre": f"Mascota {i}",
+                        "raza": azar.choice(["Mestizo", "Caniche", "Siamés"]),
+                        "propietario_id": azar.randint(1, volumenes["usuarios"]),
+                    }
+                    for i in range(1, volumenes["mascotas"] + 1)
+                ),
+            )
+            _insertar(
+                conexion,
+                veterinaria_models.HistorialClinico.__table__,
+                (
+                    {"id": i, "mascota_id": i}
+                    for i in range(1, volumenes["mascotas"] + 1)
+                ),
+            )
+
+    with engine.begin() as conexion:
+        turnos = peluqueria_models.Turno.__table__
+        if conexion.scalar(select(func.count()).select_from(turnos)) != (
+            volumenes["turnos"]
+        ):
+            _vaciar(conexion, peluqueria_models.Base.metadata)
+            _insertar(
+                conexion,
+                peluqueria_models.Peluquero.__table__,
+                (
+                    {"id": i, "nombre": f"Peluquero {i}", "user_id": i}
+                    for i in range(1, 21)
+                ),
+            )
+            _insertar(
+                conexion,
+                peluqueria_models.Servicio.__table__,
+                (
+                    {
+                        "id": i,
+                        "nombre": f"Servicio {i}",
+                        "duracion_minutos": 30 * i,
+                        "precio": 1000 * i,
+                    }
+                    for i in range(1, 6)
+                ),
+            )
+            inicio = datetime(2024, 1, 1, 9)
+            _insertar(
+                conexion,
+                turnos,
+                (
+                    {
+                        "id": i,
+                        "fecha_hora": inicio + timedelta(minutes=30 * i),
+                        "mascota_id": azar.randint(1, volumenes["mascotas"]),
+                        "cliente_id": azar.randint(1, volumenes["usuarios"]),
+                        "peluquero_id": azar.randint(1, 20),
+                        "servicio_id": azar.randint(1, 5),
+                    }
+                    for i in range(1, volumenes["turnos"] + 1)
+                ),
+            )
+
+    with engine.begin() as conexion:
+        for modulo in (
+            auth_models,
+            petshop_models,
+            veterinaria_models,
+            peluqueria_models,
+        ):
+            _ajustar_secuencias(conexion, modulo.Base.metadata)
+
+
+def _escenarios(volumenes):
+    def venta(azar, _):
+        items = [
+            {"producto_id": azar.randint(1, volumenes["productos"]), "cantidad": 1}
+            for _ in range(azar.randint(1, 3))
+        ]
+        return "POST", "/pos/venta/", {"json": {"items": items}}
+
+    def login(azar, _):
+        datos = {
+            "username": _usuario(azar.randint(1, volumenes["usuarios"])),
+            "password": PASSWORD,
+        }
+        return "POST", "/token", {"data": datos}
+
+    def verificar(_, token):
+        return "GET", "/verify-token", {"headers": {"Authorization": f"Bearer {token}"}}
+
+    def mascota(azar, _):
+        return "GET", f"/mascotas/{azar.randint(1, volumenes['mascotas'])}", {}
+
+    return [
+        Escenario("POST /pos/venta/", "petshop", venta),
+        Escenario(
+            "GET /productos/",
+            "petshop",
+            lambda *_: ("GET", "/productos/", {"params": {"limit": 20}}),
+        ),
+        Escenario("POST /token", "auth", login),
+        Escenario("GET /verify-token", "auth", verificar),
+        Escenario(
+            "GET /turnos/",
+            "peluqueria",
+            lambda *_: ("GET", "/turnos/", {"params": {"limit": 20}}),
+        ),
+        Escenario("GET /mascotas/{id}", "veterinaria", mascota),
+    ]
+
+
+def _levantar(servicio: str, database_url: str, puerto: int):
+    entorno = dict(os.environ, DATABASE_URL=database_url, CACHE_ENABLED="false")
+    proceso = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{servicio}.app.main:app",
+            "--port",
+            str(puerto),
+            "--timeout-keep-alive",
+            "120",
+            "--log-level",
+            "warning",
+        ],
+        env=entorno,
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/")
+            return proceso
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError(f"El servicio {servicio} no arrancó")
+
+
+async def _carga(base_url: str, escenario, clientes: int, segundos: float, token):
+    latencias = []
+    errores = 0
+    limites = httpx.Limits(max_connections=clientes)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limites, timeout=60
+    ) as cliente:
+
+        async def trabajador(semilla):
+            nonlocal errores
+            azar = random.Random(semilla)
+            while time.perf_counter() < fin:
+                metodo, ruta, opciones = escenario.peticion(azar, token)
+                inicio = time.perf_counter()
+                try:
+                    response = await cliente.request(metodo, ruta, **opciones)
+                    errores += response.status_code != 200
+                except httpx.TransportError:
+                    errores += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        fin = inicio + segundos
+        await asyncio.gather(*(trabajador(i) for i in range(clientes)))
+        return time.perf_counter() - inicio, latencias, errores
+
+
+def _percentil(valores, p: float) -> float:
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def _comparar(resultados, archivo: str):
+    with open(archivo) as f:
+        base = json.load(f)
+    print(f"\ncomparado con {base['commit']} ({base['fecha']}):")
+    print(f"{'endpoint':>22} {'pet/s':>10} {'p95':>10}")
+    for nombre, actual in resultados.items():
+        anterior = base["resultados"].get(nombre)
+        if anterior is None:
+            continue
+        pet_s = (actual["pet_s"] / anterior["pet_s"] - 1) * 100
+        p95 = (actual["p95_ms"] / anterior["p95_ms"] - 1) * 100
+        print(f"{nombre:>22} {pet_s:>+9.1f}% {p95:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--database-url", default=f"sqlite:///{_DB_PATH}")
+    parser.add_argument("--escala", type=float, default=1.0)
+    parser.add_argument("--clientes", type=int, default=20)
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--puerto", type=int, default=8770)
+    parser.add_argument("--solo", action="append", help="Nombre de un escenario")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    volumenes = {k: max(int(v * args.escala), 1) for k, v in VOLUMENES.items()}
+    _migrar(args.database_url)
+    engine = create_engine(args.database_url)
+    inicio = time.perf_counter()
+    _sembrar(engine, volumenes)
+    engine.dispose()
+    print(f"volúmenes {volumenes} listos en {time.perf_counter() - inicio:.1f} s")
+
+    escenarios = [
+        e for e in _escenarios(volumenes) if not args.solo or e.nombre in args.solo
+    ]
+    resultados = {}
+    print(
+        f"{'endpoint':>22} {'pet/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errores':>8}"
+    )
+    for servicio in dict.fromkeys(e.servicio for e in escenarios):
+        proceso = _levantar(servicio, args.database_url, args.puerto)
+        base_url = f"http://127.0.0.1:{args.puerto}"
+        try:
+            token = None
+            if servicio == "auth":
+                token = httpx.post(
+                    f"{base_url}/token",
+                    data={"username": _usuario(1), "password": PASSWORD},
+                ).json()["access_token"]
+            for escenario in (e for e in escenarios if e.servicio == servicio):
+                duracion, latencias, errores = asyncio.run(
+                    _carga(base_url, escenario, args.clientes, args.segundos, token)
+                )
+                latencias.sort()
+                resultado = {
+                    "servicio": servicio,
+                    "peticiones": len(latencias),
+                    "errores": errores,
+                    "pet_s": round(len(latencias) / duracion, 1),
+                    "p50_ms": round(statistics.median(latencias) * 1000, 2),
+                    "p95_ms": round(_percentil(latencias, 0.95) * 1000, 2),
+                    "p99_ms": round(_percentil(latencias, 0.99) * 1000, 2),
+                }
+                resultados[escenario.nombre] = resultado
+                print(
+                    f"{escenario.nombre:>22} {resultado['pet_s']:>8.1f} "
+                    f"{resultado['p50_ms']:>8.2f} {resultado['p95_ms']:>8.2f} "
+                    f"{resultado['p99_ms']:>8.2f} {errores:>8}"
+                )
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(
+                {
+                    "commit": _commit(),
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "cpus": os.cpu_count(),
+                    "base": args.database_url.split(":", 1)[0],
+                    "volumenes": volumenes,
+                    "clientes": args.clientes,
+                    "segundos": args.segundos,
+                    "resultados": resultados,
+                },
+                f,
+                indent=2,
+            )
+        print(f"resultados en {args.salida}")
+    if args.comparar:
+        _comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
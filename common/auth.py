@@ -0,0 +1,285 @@
+"""
+Verificación local de los JWT emitidos por el servicio de autenticación.
+
+Los servicios validan la firma y la expiración del token en el mismo proceso,
+sin consultar `/verify-token`: un solo decode devuelve el email y los roles.
+Los tokens ya verificados se guardan en una caché LRU de AUTH_TOKEN_CACHE_SIZE
+entradas hasta su `exp`, así que las peticiones siguientes con el mismo token
+se autorizan sin volver a verificar la firma.
+
+Los tokens RS256 se verifican con la clave pública de su `kid`, que se
+obtiene del JWKS del servicio de autenticación (JWKS_URL, ver common.jwks)
+o de la fuente que instale `use_key_source` (el propio servicio de
+autenticación usa sus claves locales). Con una fuente de claves los tokens
+HS256 se rechazan, salvo que JWT_ACCEPT_HS256=true los acepte durante la
+migración (tokens emitidos antes de configurar las claves asimétricas); sólo
+entonces los servicios necesitan SECRET_KEY.
+
+Los access tokens emitidos por login llevan el id de su sesión (`sid`); si
+la sesión se revocó (common.revocation) el token se rechaza, aun desde la
+caché.
+
+Con AUTH_REQUIRED=true (`service_dependencies`) cada servicio exige un token
+válido en todas sus rutas salvo `PUBLIC_PATHS`. Sin esa variable los
+endpoints no cambian; `get_principal`, `require_principal` y `require_roles`
+se pueden usar como dependencias en rutas puntuales.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from common import jwks, revocation
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
+ALGORITHM = "HS256"
+# Sin definir: HS256 sólo se acepta mientras no haya claves asimétricas (ver
+# `_acepta_hs256`).
+_JWT_ACCEPT_HS256 = os.getenv("JWT_ACCEPT_HS256")
+JWT_ACCEPT_HS256 = (
+    None if _JWT_ACCEPT_HS256 is None else _JWT_ACCEPT_HS256.lower() == "true"
+)
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() == "true"
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# Rutas sin token aun con AUTH_REQUIRED (estado del servicio y métricas)
+PUBLIC_PATHS = frozenset({"/", "/metrics"})
+
+Principal = namedtuple(
+    "Principal", ["email", "roles", "expires_at", "session_id"], defaults=(None,)
+)
+
+# auto_error=False: la ausencia del token la decide cada dependencia.
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+class InvalidToken(Exception):
+    """
+    Token mal formado, con firma inválida, vencido o sin `sub`.
+    """
+
+
+class TokenCache:
+    """
+    LRU de tokens verificados; cada entrada vale hasta el `exp` del token.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            principal = self._entries.get(token)
+            if principal is None:
+                return None
+            if principal.expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = principal
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(AUTH_TOKEN_CACHE_SIZE)
+
+
+_key_source = None
+
+
+def use_key_source(source):
+    """
+    Instala la fuente de claves públicas de los tokens RS256: un objeto con
+    `get_key(kid) -> Optional[dict]` (un JWK).
+    """
+    global _key_source
+    _key_source = source
+
+
+def get_key_source():
+    """
+    Fuente de claves instalada o, en su defecto, la caché de JWKS_URL.
+    """
+    global _key_source
+    if _key_source is None and jwks.JWKS_URL:
+        _key_source = jwks.JWKSCache(jwks.JWKS_URL)
+    return _key_source
+
+
+_revocation_list = None
+# REVOCATIONS_URL se consulta una sola vez (sin ella, from_env avisa).
+_revocation_list_from_env = False
+
+
+def use_revocation_list(revocations):
+    """
+    Instala la lista de sesiones revocadas (ver common.revocation).
+    """
+    global _revocation_list
+    _revocation_list = revocations
+
+
+def get_revocation_list():
+    """
+    Lista instalada o, en su defecto, la de REVOCATIONS_URL.
+    """
+    global _revocation_list, _revocation_list_from_env
+    if _revocation_list is None and not _revocation_list_from_env:
+        _revocation_list = revocation.from_env()
+        _revocation_list_from_env = True
+    return _revocation_list
+
+
+def _acepta_hs256() -> bool:
+    """
+    Con una fuente de claves (JWKS_URL o `use_key_source`) los tokens HS256 se
+    rechazan salvo JWT_ACCEPT_HS256=true: de lo contrario bastaría conocer el
+    SECRET_KEY por defecto, que es público, para falsificar un token.
+    """
+    if JWT_ACCEPT_HS256 is not None:
+        return JWT_ACCEPT_HS256
+    return get_key_source() is None
+
+
+def _verification_key(token: str):
+    """
+    (clave, algoritmo) con que se verifica el token según su encabezado.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as e:
+        raise InvalidToken(str(e)) from e
+    algoritmo = header.get("alg")
+    if algoritmo == "RS256":
+        source = get_key_source()
+        key = source.get_key(header.get("kid")) if source is not None else None
+        if key is None:
+            raise InvalidToken(f"Clave desconocida: {header.get('kid')}")
+        return key, algoritmo
+    if algoritmo == ALGORITHM and _acepta_hs256():
+        return SECRET_KEY, algoritmo
+    raise InvalidToken(f"Algoritmo no admitido: {algoritmo}")
+
+
+def decode_token(token: str) -> Principal:
+    """
+    Verifica firma y expiración del token y devuelve su `Principal`, sin
+    pasar por la caché.
+    """
+    key, algoritmo = _verification_key(token)
+    try:
+        payload = jwt.decode(token, key, algorithms=[algoritmo])
+    except JWTError as e:
+        raise InvalidToken(str(e)) from e
+    email = payload.get("sub")
+    if email is None:
+        raise InvalidToken("Token sin sub")
+    # Sin exp el token no vence; igual se guarda sólo por un tiempo acotado.
+    expires_at = payload.get("exp", time.time() + 300)
+    return Principal(
+        email, tuple(payload.get("roles", [])), expires_at, payload.get("sid")
+    )
+
+
+def verify_token(token: str) -> Principal:
+    """
+    `decode_token` con la caché de tokens ya verificados, y rechazo de los
+    de sesiones revocadas.
+    """
+    principal = token_cache.get(token)
+    if principal is None:
+        principal = decode_token(token)
+        token_cache.put(token, principal)
+    if principal.session_id is not None:
+        revocadas = get_revocation_list()
+        if revocadas is not None and revocadas.is_revoked(principal.session_id):
+            raise InvalidToken("Sesión revocada")
+    return principal
+
+
+def _credentials_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_principal(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[Principal]:
+    """
+    Dependencia: el usuario del token, o None si la petición no trae uno.
+    Un token presente pero inválido responde 401.
+    """
+    if token is None:
+        return None
+    try:
+        return verify_token(token)
+    except InvalidToken:
+        raise _credentials_exception()
+
+
+def require_principal(
+    principal: Optional[Principal] = Depends(get_principal),
+) -> Principal:
+    """
+    Dependencia: exige un token válido.
+    """
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+def require_roles(*roles: str):
+    """
+    Dependencia que exige un token válido con al menos uno de `roles`.
+    """
+
+    def dependencia(principal: Principal = Depends(require_principal)) -> Principal:
+        if not set(roles).intersection(principal.roles):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        return principal
+
+    return dependencia
+
+
+def _authenticate_service_request(
+    request: Request, principal: Optional[Principal] = Depends(get_principal)
+):
+    if principal is None and request.url.path not in PUBLIC_PATHS:
+        raise _credentials_exception()
+    request.state.principal = principal
+
+
+def service_dependencies() -> List:
+    """
+    Dependencias globales de la aplicación de un servicio: con AUTH_REQUIRED,
+    toda ruta fuera de `PUBLIC_PATHS` exige un token válido.
+    """
+    if not AUTH_REQUIRED:
+        return []
+    return [Depends(_authenticate_service_request)]
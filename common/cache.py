@@ -0,0 +1,121 @@
+"""
+Caché compartida en Redis y versiones de datos por servicio.
+
+Si Redis no está disponible la caché se desactiva unos segundos y las
+operaciones devuelven el valor por defecto: el llamador calcula el resultado
+sin caché en lugar de fallar.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TIMEOUT_SECONDS = float(os.getenv("CACHE_TIMEOUT_SECONDS", "0.2"))
+# Tiempo sin intentar conectar a Redis después de un error
+CACHE_BACKOFF_SECONDS = float(os.getenv("CACHE_BACKOFF_SECONDS", "30"))
+
+_client = None
+_disabled_until = 0.0
+
+
+def get_redis():
+    """
+    Devuelve el cliente de Redis, creándolo en el primer uso.
+    """
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=CACHE_TIMEOUT_SECONDS,
+            socket_connect_timeout=CACHE_TIMEOUT_SECONDS,
+        )
+    return _client
+
+
+def _run(operation, default=None):
+    """
+    Ejecuta una operación contra Redis; ante un error desactiva la caché
+    durante CACHE_BACKOFF_SECONDS y devuelve `default`.
+    """
+    global _disabled_until
+    if not CACHE_ENABLED or time.monotonic() < _disabled_until:
+        return default
+    try:
+        return operation(get_redis())
+    except Exception as e:
+        logger.warning("Caché Redis no disponible: %s", e)
+        _disabled_until = time.monotonic() + CACHE_BACKOFF_SECONDS
+        return default
+
+
+def get_json(key: str) -> Optional[Any]:
+    """
+    Lee un valor JSON de la caché.
+    """
+    raw = _run(lambda r: r.get(key))
+    return json.loads(raw) if raw is not None else None
+
+
+def set_json(key: str, value: Any, ttl_seconds: int) -> None:
+    """
+    Guarda un valor JSON en la caché con vencimiento.
+    """
+    _run(lambda r: r.set(key, json.dumps(value, default=str), ex=ttl_seconds))
+
+
+def get_data_version(namespace: str) -> Optional[int]:
+    """
+    Versión actual de los datos de un servicio, o None si no hay caché.
+    """
+    return _run(lambda r: int(r.get(f"{namespace}:data_version") or 0))
+
+
+def bump_data_version(namespace: str) -> None:
+    """
+    Invalida todo lo cacheado con la versión anterior de los datos.
+    """
+    _run(lambda r: r.incr(f"{namespace}:data_version"))
+
+
+def track_data_version(namespace: str, tables: Iterable) -> None:
+    """
+    Incrementa la versión de datos de `namespace` cada vez que se confirma
+    una transacción que escribió en alguna de las `tables`, ya sea con
+    objetos ORM o con sentencias masivas (INSERT/UPDATE/DELETE).
+    """
+    tables = set(tables)
+    flag = f"data_changed:{namespace}"
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _mark_bulk_write(state):
+        if (state.is_insert or state.is_update or state.is_delete) and any(
+            mapper.local_table in tables for mapper in state.all_mappers
+        ):
+            state.session.info[flag] = True
+
+    @event.listens_for(Session, "after_flush")
+    def _mark_flush(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if inspect(obj).mapper.local_table in tables:
+                session.info[flag] = True
+                return
+
+    @event.listens_for(Session, "after_commit")
+    def _bump(session):
+        if session.info.pop(flag, False):
+            bump_data_version(namespace)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop(flag, None)
@@ -31,6 +31,13 @@ celery_app.conf.update(
         "veterinaria.app.tasks.*": {"queue": "veterinaria"},
         "petshop.app.tasks.*": {"queue": "petshop"},
     },
+    # Tareas periódicas (requiere `celery beat`)
+    beat_schedule={
+        "petshop-liberar-reservas-expiradas": {
+            "task": "petshop.app.tasks.liberar_reservas_expiradas",
+            "schedule": float(os.getenv("RESERVAS_LIMPIEZA_SEGUNDOS", "60")),
+        },
+    },
 )
 
 if __name__ == "__main__":
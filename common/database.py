@@ -1,8 +1,23 @@
+import asyncio
+import collections
+import logging
 import os
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from fastapi import Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # Leer la URL de la base de datos desde las variables de entorno.
 # La URL debe incluir el search_path para el esquema correcto.
@@ -13,13 +28,578 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if SQLALCHEMY_DATABASE_URL is None:
     raise Exception("DATABASE_URL environment variable is not set.")
 
+# Configuración del pool de conexiones (por proceso)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Segundos que una petición espera una conexión libre antes de fallar
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reciclar conexiones más viejas que esto (evita cortes por inactividad)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Tiempo máximo de una sentencia en PostgreSQL; 0 lo desactiva
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class PoolStats:
+    """
+    Contadores acumulados de la espera por conexiones del pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+class _FifoGate:
+    """
+    Semáforo que atiende a los hilos en orden de llegada: al liberar un
+    lugar se le entrega directamente al que más tiempo lleva esperando, en
+    vez de dejar que lo gane el primero que llegue.
+    """
+
+    def __init__(self, permits: int):
+        self._lock = threading.Lock()
+        self._available = permits
+        self._waiters = collections.deque()
+
+    def acquire(self, timeout: float) -> bool:
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return True
+            turno = threading.Event()
+            self._waiters.append(turno)
+        if turno.wait(timeout):
+            return True
+        with self._lock:
+            if turno.is_set():
+                return True
+            self._waiters.remove(turno)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._available += 1
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión libre.
+
+    Cuando todas las conexiones están en uso, las peticiones las reciben en
+    orden de llegada: el QueuePool estándar deja que las recién llegadas se
+    adelanten y algunas esperan muchísimo más que el resto (p99 alto).
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._restante = threading.local()
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        capacidad = self._pool.maxsize + self._max_overflow
+        self._gate = _FifoGate(capacidad) if self._max_overflow >= 0 else None
+
+    # QueuePool espera hasta `_timeout` por una conexión. Durante un checkout
+    # es lo que queda del pool_timeout tras la espera en la cola FIFO, para
+    # que ambas esperas juntas no lo superen.
+    @property
+    def _timeout(self) -> float:
+        return getattr(self._restante, "segundos", self._pool_timeout)
+
+    @_timeout.setter
+    def _timeout(self, segundos: float):
+        self._pool_timeout = segundos
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        if self._gate is not None and not self._gate.acquire(self._pool_timeout):
+            self.stats.record(time.perf_counter() - inicio, timed_out=True)
+            raise PoolTimeoutError(
+                f"QueuePool limit of size {self.size()} overflow "
+                f"{self._max_overflow} reached, connection timed out, "
+                f"timeout {self._pool_timeout:.2f}"
+            )
+        transcurrido = time.perf_counter() - inicio
+        self._restante.segundos = max(self._pool_timeout - transcurrido, 0.0)
+        try:
+            conexion = super()._do_get()
+        except BaseException:
+            if self._gate is not None:
+                self._gate.release()
+            raise
+        finally:
+            del self._restante.segundos
+        self.stats.record(time.perf_counter() - inicio)
+        return conexion
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            if self._gate is not None:
+                self._gate.release()
+
+
+def _set_statement_timeout(engine, timeout_ms: int):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        cursor.close()
+        # El SET es transaccional: se confirma para que sobreviva al rollback
+        # con el que el pool devuelve la conexión.
+        dbapi_connection.commit()
+
+
+def create_db_engine(url: Optional[str] = None, **kwargs):
+    """
+    Crea el motor de la base de datos con la configuración de pool leída del
+    entorno. Los `kwargs` reemplazan los valores del entorno.
+    """
+    url = make_url(url or SQLALCHEMY_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # SQLite en memoria usa un pool propio de una conexión por hilo.
+        return create_engine(url, **kwargs)
+
+    opciones = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    opciones.update(kwargs)
+    engine = create_engine(url, **opciones)
+    if DB_STATEMENT_TIMEOUT_MS > 0 and engine.dialect.name == "postgresql":
+        _set_statement_timeout(engine, DB_STATEMENT_TIMEOUT_MS)
+    return engine
+
+
 # Crear el motor de la base de datos
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+
+# --- Réplicas de lectura ---
+# URLs separadas por comas de las réplicas; vacío deja todo en el primario.
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Segundos entre verificaciones de salud de cada réplica
+DB_REPLICA_HEALTH_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "10"))
+# Después de una escritura, las lecturas del mismo cliente van al primario
+# durante esta ventana para que vea sus propios cambios pese al retraso de
+# replicación.
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+_METODOS_LECTURA = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaSet:
+    """
+    Réplicas de lectura elegidas por turno rotativo. Una réplica que no
+    responde a la verificación de salud queda fuera de la rotación hasta la
+    siguiente verificación.
+    """
+
+    def __init__(self, engines, health_interval: float = DB_REPLICA_HEALTH_INTERVAL):
+        self.engines = list(engines)
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._siguiente = 0
+        # engine -> (sana, instante de la próxima verificación)
+        self._salud = {engine: (True, 0.0) for engine in self.engines}
+
+    @classmethod
+    def from_urls(cls, urls, **kwargs):
+        return cls([create_db_engine(url) for url in urls], **kwargs)
+
+    def _sana(self, engine) -> bool:
+        sana, proxima = self._salud[engine]
+        ahora = time.monotonic()
+        if ahora < proxima:
+            return sana
+        try:
+            with engine.connect() as conexion:
+                conexion.exec_driver_sql("SELECT 1")
+            sana = True
+        except Exception:
+            sana = False
+        self._salud[engine] = (sana, ahora + self.health_interval)
+        return sana
+
+    def mark_down(self, engine):
+        """
+        Saca una réplica de la rotación hasta la próxima verificación.
+        """
+        self._salud[engine] = (False, time.monotonic() + self.health_interval)
+
+    def choose(self):
+        """
+        Siguiente réplica sana, o None si no hay ninguna disponible.
+        """
+        with self._lock:
+            inicio = self._siguiente
+            self._siguiente = (self._siguiente + 1) % max(len(self.engines), 1)
+        for i in range(len(self.engines)):
+            engine = self.engines[(inicio + i) % len(self.engines)]
+            if self._sana(engine):
+                return engine
+        return None
+
+
+replicas = ReplicaSet.from_urls(DATABASE_REPLICA_URLS)
+
+
+class RoutingSession(Session):
+    """
+    Sesión que envía las lecturas a una réplica cuando se crea con
+    `read_only=True`. Usa la misma réplica hasta cerrarse, y si llega a
+    escribir (flush o sentencia DML) pasa al primario para el resto de la
+    sesión.
+    """
+
+    def __init__(self, *args, read_only: bool = False, replica_set=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_only = read_only
+        self.replica_set = replicas if replica_set is None else replica_set
+        self._replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.read_only = False
+        if not self.read_only or not self.replica_set.engines:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._replica is None:
+            self._replica = self.replica_set.choose()
+            if self._replica is None:
+                self.read_only = False
+                return super().get_bind(mapper, clause=clause, **kwargs)
+        return self._replica
+
+
+def reads_from_replica(request: Request) -> bool:
+    """
+    Indica si la petición puede leerse de una réplica: es de lectura y el
+    cliente no escribió dentro de la ventana de read-your-writes.
+    """
+    if request.method not in _METODOS_LECTURA:
+        return False
+    try:
+        hasta = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        return True
+    return time.time() >= hasta
+
+
+def session_for_request(request: Request, response: Response):
+    """
+    Crea la sesión de una petición HTTP: réplica para las lecturas y
+    primario para las escrituras, que además abren la ventana de
+    read-your-writes del cliente.
+    """
+    read_only = reads_from_replica(request)
+    if request.method not in _METODOS_LECTURA and replicas.engines:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            f"{time.time() + DB_READ_YOUR_WRITES_SECONDS:.3f}",
+            max_age=int(DB_READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+        )
+    return SessionLocal(read_only=read_only)
+
 
 # Crear una clase de sesión
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+)
+
+
+# Peticiones que pueden tener una sesión abierta a la vez. Las demás esperan
+# en el event loop, sin ocupar un hilo del threadpool de FastAPI.
+DB_MAX_CONCURRENT_REQUESTS = int(
+    os.getenv("DB_MAX_CONCURRENT_REQUESTS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW))
+)
+
+# Un semáforo por event loop (los tests crean uno por TestClient)
+_admisiones: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _admision() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaforo = _admisiones.get(loop)
+    if semaforo is None:
+        semaforo = _admisiones[loop] = asyncio.Semaphore(DB_MAX_CONCURRENT_REQUESTS)
+    return semaforo
+
+
+def make_get_db(session_factory=None):
+    """
+    Crea la dependencia `get_db`: una sesión por petición que funciona como
+    unidad de trabajo. Los CRUD sólo hacen `flush()`; la transacción se
+    confirma una única vez al terminar el endpoint, antes de enviar la
+    respuesta, y se deshace si el endpoint falla.
+
+    Sin `session_factory` la sesión sale de `session_for_request` (réplicas
+    y read-your-writes); los tests pasan su propia fábrica.
+    """
+
+    def _sesion(request: Request, response: Response):
+        # Se cierra al final de la petición, después de enviar la respuesta.
+        if session_factory is None:
+            db = session_for_request(request, response)
+        else:
+            db = session_factory()
+        db.expire_on_commit = False
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_db(db: Session = Depends(_sesion)):
+        # FastAPI ejecuta el endpoint y serializa su respuesta en el
+        # threadpool (40 hilos), con la conexión tomada hasta el commit. Si
+        # entraran más peticiones que conexiones, las que esperan conexión
+        # podrían ocupar todos los hilos y las que la tienen no podrían
+        # terminar: se admiten sólo tantas como el pool puede atender.
+        async with _admision():
+            try:
+                yield db
+                await run_in_threadpool(db.commit)
+            except Exception:
+                await run_in_threadpool(db.rollback)
+                raise
+
+    return get_db
+
+
+# Los endpoints la declaran con `Depends(get_db, scope="function")`: así el
+# commit ocurre al salir del endpoint y no después de enviar la respuesta, y
+# un error al confirmar llega al cliente.
+get_db = make_get_db()
+
+
+class RoundTripCounter:
+    """
+    Idas y vueltas a la base de datos (sentencias y commits) dentro de un
+    bloque `count_round_trips()`, con el tiempo que llevaron las sentencias.
+    """
+
+    def __init__(self, route: Optional[str] = None):
+        self.total = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+        # Ruta de la petición, para el log de consultas lentas
+        self.route = route
+
+
+_round_trips: ContextVar[Optional[RoundTripCounter]] = ContextVar(
+    "db_round_trips", default=None
+)
+
+
+@contextmanager
+def count_round_trips(route: Optional[str] = None):
+    """
+    Cuenta las idas y vueltas a la base de datos del bloque, incluidas las
+    de los hilos del threadpool que lanza (heredan el contexto).
+    """
+    contador = RoundTripCounter(route)
+    token = _round_trips.set(contador)
+    try:
+        yield contador
+    finally:
+        _round_trips.reset(token)
+
+
+# Sentencias que tardan al menos esto se registran con su SQL y la ruta
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+slow_query_logger = logging.getLogger("common.database.slow_queries")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    contador = _round_trips.get()
+    if contador is not None:
+        contador.total += 1
+    if context is not None:
+        context._inicio_sentencia = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _medir_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_inicio_sentencia", None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    contador = _round_trips.get()
+    if contador is not None:
+        contador.queries += 1
+        contador.query_seconds += segundos
+    if segundos * 1000 >= DB_SLOW_QUERY_MS:
+        if contador is not None:
+            contador.slow_queries += 1
+        slow_query_logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s",
+            segundos * 1000,
+            contador.route if contador is not None else "-",
+            statement,
+        )
+
+
+@event.listens_for(Engine, "commit")
+def _contar_commit(conn):
+    contador = _round_trips.get()
+    if contador is not None:
+        contador.total += 1
+
+
+# --- Motor asíncrono ---
+# Cada servicio elige con DB_ASYNC si sus endpoints de lectura/alta usan
+# AsyncSession (asyncpg en producción, aiosqlite en los tests) en lugar de
+# ocupar un hilo del threadpool de FastAPI por petición.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+_DRIVERS_ASYNC = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url(url: str):
+    """
+    Traduce la URL síncrona a su driver asíncrono. asyncpg no acepta el
+    parámetro `options=-csearch_path=...` de libpq, así que los `-c` se
+    devuelven aparte como `server_settings`.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in _DRIVERS_ASYNC:
+        raise NotImplementedError(f"Sin driver asíncrono para {backend}")
+    url = url.set(drivername=_DRIVERS_ASYNC[backend])
+
+    server_settings = {}
+    options = url.query.get("options")
+    if options is not None and backend == "postgresql":
+        for opcion in options.split():
+            clave, _, valor = opcion.removeprefix("-c").partition("=")
+            server_settings[clave] = valor
+        url = url.difference_update_query(["options"])
+    return url, server_settings
+
+
+def create_async_db_engine(url: Optional[str] = None, **kwargs):
+    """
+    Crea el motor asíncrono con la misma configuración de pool del entorno
+    que `create_db_engine`.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url, server_settings = async_database_url(url or SQLALCHEMY_DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url, **kwargs)
+
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    opciones = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {"server_settings": server_settings},
+    }
+    opciones.update(kwargs)
+    return create_async_engine(url, **opciones)
+
+
+def get_async_engine():
+    """
+    Motor asíncrono del proceso, creado en el primer uso para que los
+    servicios que no lo usan no carguen el driver.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    """
+    Fábrica de AsyncSession. `expire_on_commit=False` evita recargas
+    implícitas (no permitidas en asyncio) al serializar tras un commit.
+    """
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_sessionmaker = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    """
+    Dependencia de FastAPI que entrega una AsyncSession por petición.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+# Política de reintentos ante conflictos de concurrencia (deadlocks, fallos de
+# serialización, bloqueos de SQLite).
+DB_CONFLICT_RETRIES = int(os.getenv("DB_CONFLICT_RETRIES", "3"))
+DB_CONFLICT_BACKOFF_MS = float(os.getenv("DB_CONFLICT_BACKOFF_MS", "20"))
+
+
+def retry_on_conflict(func, db, *args, retries=None, backoff_ms=None, **kwargs):
+    """
+    Ejecuta una operación transaccional y la reintenta si la base de datos
+    la aborta por un conflicto con otra transacción.
+
+    Entre intentos se hace rollback y se espera con backoff exponencial y
+    jitter para que los competidores no vuelvan a chocar al mismo tiempo.
+    """
+    retries = DB_CONFLICT_RETRIES if retries is None else retries
+    backoff_ms = DB_CONFLICT_BACKOFF_MS if backoff_ms is None else backoff_ms
+
+    for intento in range(retries + 1):
+        try:
+            return func(db, *args, **kwargs)
+        except OperationalError:
+            db.rollback()
+            if intento == retries:
+                raise
+            espera = backoff_ms * (2**intento) * random.uniform(0.5, 1.5)
+            time.sleep(espera / 1000)
+
 
-# Base para los modelos declarativos de SQLAlchemy.
-# Los modelos que hereden de esta Base usarán el esquema
-# definido en el search_path de la DATABASE_URL.
-Base = declarative_base()
+def insert_for(db, model):
+    """
+    Devuelve un INSERT del dialecto de la sesión con soporte para
+    `ON CONFLICT` (PostgreSQL en producción, SQLite en los tests).
+    """
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT no soportado para {dialecto}")
+    return insert(model)
@@ -0,0 +1,78 @@
+"""
+Configuración de gunicorn para producción, común a los cuatro servicios:
+
+    gunicorn -c python:common.gunicorn_conf app.main:app
+
+Levanta `WEB_CONCURRENCY` procesos con workers de uvicorn y recicla cada uno
+tras `GUNICORN_MAX_REQUESTS` peticiones (más un jitter aleatorio, para que no
+se reinicien todos a la vez). El reinicio es ordenado: el worker termina las
+peticiones en curso dentro de `graceful_timeout` mientras el resto atiende.
+
+Cada worker tiene su propio pool de conexiones. Con `DB_CONNECTION_BUDGET`
+(conexiones que el servicio puede abrir en PostgreSQL entre todos sus
+workers) se deriva DB_POOL_SIZE y DB_MAX_OVERFLOW por worker, salvo que se
+fijen explícitamente; si el presupuesto no alcanza para una conexión por
+worker, se levantan sólo tantos workers como conexiones haya.
+"""
+
+import logging
+import multiprocessing
+import os
+from typing import Tuple
+
+
+def pool_por_worker(presupuesto: int, workers: int) -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) de cada worker para no superar `presupuesto`
+    conexiones entre todos: la mitad permanentes y el resto de desborde.
+    """
+    if presupuesto < workers:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET={presupuesto} no alcanza para {workers} workers"
+        )
+    por_worker = presupuesto // workers
+    pool_size = max(por_worker // 2, 1)
+    return pool_size, por_worker - pool_size
+
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(
+    os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10))
+)
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# La aplicación se importa en cada worker, después del fork: así ningún
+# worker hereda conexiones abiertas por el proceso maestro.
+preload_app = False
+# Heartbeat de los workers en memoria (en Docker /tmp puede estar en disco).
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+_presupuesto = os.getenv("DB_CONNECTION_BUDGET")
+if _presupuesto:
+    if int(_presupuesto) < workers:
+        logging.getLogger("gunicorn.error").warning(
+            "DB_CONNECTION_BUDGET=%s: se levantan %s workers en vez de %s",
+            _presupuesto,
+            _presupuesto,
+            workers,
+        )
+        workers = int(_presupuesto)
+    _pool_size, _max_overflow = pool_por_worker(int(_presupuesto), workers)
+    # Los workers heredan el entorno del maestro y common.database lo lee al
+    # importarse.
+    os.environ.setdefault("DB_POOL_SIZE", str(_pool_size))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(_max_overflow))
+
+
+def post_fork(server, worker):
+    # Antes de importar la aplicación: cada worker sabe entre cuántos se
+    # reparten los recursos del host (p. ej. los procesos de bcrypt del
+    # servicio de autenticación).
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
@@ -0,0 +1,102 @@
+"""
+Caché del juego de claves públicas (JWKS) del servicio de autenticación.
+
+Las claves se descargan de JWKS_URL y se conservan el `max-age` que indique
+la respuesta (JWKS_CACHE_SECONDS si no lo indica). Vencido ese plazo se siguen
+usando mientras un hilo en segundo plano las renueva: ninguna petición espera
+la descarga salvo que traiga un `kid` desconocido, caso en que se renueva en
+el momento (una sola descarga para todas las peticiones que esperan, y no más
+de una cada JWKS_MIN_REFRESH_SECONDS) para aceptar una clave recién rotada.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JWKS_URL = os.getenv("JWKS_URL")
+JWKS_CACHE_SECONDS = float(os.getenv("JWKS_CACHE_SECONDS", "300"))
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "10"))
+JWKS_TIMEOUT_SECONDS = float(os.getenv("JWKS_TIMEOUT_SECONDS", "2"))
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class JWKSCache:
+    """
+    Claves públicas por `kid`, renovadas desde `url`.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._last_fetch = float("-inf")
+        self._refreshing: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+
+    def _fetch(self) -> Tuple[Dict[str, dict], float]:
+        """
+        Descarga el JWKS: (claves por kid, segundos de validez).
+        """
+        with urllib.request.urlopen(self.url, timeout=JWKS_TIMEOUT_SECONDS) as r:
+            coincidencia = _MAX_AGE.search(r.headers.get("Cache-Control", ""))
+            cuerpo = json.load(r)
+        keys = {k["kid"]: k for k in cuerpo.get("keys", []) if "kid" in k}
+        ttl = float(coincidencia.group(1)) if coincidencia else JWKS_CACHE_SECONDS
+        return keys, ttl
+
+    def _refresh(self, listo: threading.Event):
+        try:
+            keys, ttl = self._fetch()
+        except Exception as e:
+            # Se conservan las claves anteriores hasta el próximo intento.
+            logger.warning("No se pudo descargar el JWKS de %s: %s", self.url, e)
+        else:
+            with self._lock:
+                self._keys = keys
+                self._expires_at = time.monotonic() + ttl
+        finally:
+            with self._lock:
+                self._refreshing = None
+            listo.set()
+
+    def _start_refresh(self, forzar: bool) -> Optional[threading.Event]:
+        """
+        Lanza una renovación en segundo plano si no hay otra en curso y pasó
+        el intervalo mínimo desde la anterior.
+        Devuelve el evento de la renovación en curso, o None.
+        """
+        with self._lock:
+            if self._refreshing is not None:
+                return self._refreshing
+            ahora = time.monotonic()
+            if not forzar and ahora < self._expires_at:
+                return None
+            if ahora - self._last_fetch < JWKS_MIN_REFRESH_SECONDS:
+                return None
+            self._last_fetch = ahora
+            self._refreshing = listo = threading.Event()
+        threading.Thread(target=self._refresh, args=(listo,), daemon=True).start()
+        return listo
+
+    def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        """
+        JWK público con ese `kid`, o None si el servicio de autenticación no
+        lo publica.
+        """
+        key = self._keys.get(kid)
+        if key is not None:
+            # Vencido: se renueva sin hacer esperar a la petición.
+            self._start_refresh(forzar=False)
+            return key
+        listo = self._start_refresh(forzar=True)
+        if listo is not None:
+            listo.wait(JWKS_TIMEOUT_SECONDS)
+        return self._keys.get(kid)
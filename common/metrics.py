@@ -0,0 +1,254 @@
+"""
+Endpoint `/metrics` en formato de texto de Prometheus, compartido por los
+servicios.
+
+Expone el estado del pool de conexiones del motor de cada proceso
+(conexiones en uso, desborde y tiempo de espera por una conexión libre) y,
+por ruta, la latencia de las peticiones y las consultas a la base de datos
+que hicieron, medidas por `RequestMetricsMiddleware`. Las métricas son del
+proceso: con varios workers cada uno expone las suyas.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import MutableHeaders
+
+from common import database
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ROUND_TRIPS_HEADER = "X-DB-Round-Trips"
+
+# Límites (en segundos) de los buckets de latencia por ruta
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites de los buckets de consultas por petición
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Etiqueta de las peticiones que no coinciden con ninguna ruta (404)
+UNMATCHED_ROUTE = "(sin ruta)"
+
+router = APIRouter()
+
+
+def _metric(lines: List[str], name: str, kind: str, help_text: str, value) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines.append(f"{name} {value}")
+
+
+def pool_metrics(engine) -> List[str]:
+    """
+    Métricas del pool de conexiones de `engine`.
+    """
+    pool = engine.pool
+    lines: List[str] = []
+    if not hasattr(pool, "checkedout"):
+        return lines
+
+    _metric(lines, "db_pool_size", "gauge", "Tamaño base del pool.", pool.size())
+    _metric(
+        lines,
+        "db_pool_checked_out",
+        "gauge",
+        "Conexiones en uso.",
+        pool.checkedout(),
+    )
+    _metric(
+        lines,
+        "db_pool_checked_in",
+        "gauge",
+        "Conexiones libres en el pool.",
+        pool.checkedin(),
+    )
+    _metric(
+        lines,
+        "db_pool_overflow",
+        "gauge",
+        "Conexiones abiertas por encima del tamaño base (negativo si hay "
+        "lugar sin abrir).",
+        pool.overflow(),
+    )
+
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        name = "db_pool_checkout_wait_seconds"
+        lines.append(f"# HELP {name} Espera por una conexión libre del pool.")
+        lines.append(f"# TYPE {name} summary")
+        lines.append(f"{name}_sum {stats.wait_seconds_total:.6f}")
+        lines.append(f"{name}_count {stats.checkouts}")
+        _metric(
+            lines,
+            "db_pool_checkout_wait_seconds_max",
+            "gauge",
+            "Máxima espera por una conexión desde el arranque.",
+            f"{stats.wait_seconds_max:.6f}",
+        )
+        _metric(
+            lines,
+            "db_pool_checkout_timeouts_total",
+            "counter",
+            "Peticiones que agotaron DB_POOL_TIMEOUT sin conseguir conexión.",
+            stats.timeouts,
+        )
+    return lines
+
+
+class Histogram:
+    """
+    Histograma acumulativo al estilo Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        lines = []
+        acumulado = 0
+        for limite, cantidad in zip((*self.buckets, "+Inf"), self.counts):
+            acumulado += cantidad
+            lines.append(f'{name}_bucket{{{labels},le="{limite}"}} {acumulado}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RouteMetrics:
+    """
+    Latencia, consultas y tiempo en la base de datos de las peticiones a una
+    ruta.
+    """
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+
+
+# (método, plantilla de la ruta) -> métricas. Sólo se actualiza desde el event
+# loop, por lo que no necesita lock.
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+
+def record_request(method: str, route: str, seconds: float, counter) -> None:
+    """
+    Registra una petición terminada con las consultas contadas en `counter`
+    (un `database.RoundTripCounter`).
+    """
+    metricas = _routes.get((method, route))
+    if metricas is None:
+        metricas = _routes[(method, route)] = RouteMetrics()
+    metricas.latency.observe(seconds)
+    metricas.queries.observe(counter.queries)
+    metricas.db_seconds += counter.query_seconds
+    metricas.slow_queries += counter.slow_queries
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def request_metrics() -> List[str]:
+    """
+    Métricas por ruta de las peticiones atendidas por el proceso.
+    """
+    if not _routes:
+        return []
+    rutas = sorted(_routes.items())
+    etiquetas = {
+        clave: f'method="{_label(clave[0])}",route="{_label(clave[1])}"'
+        for clave, _ in rutas
+    }
+    lines: List[str] = []
+
+    name = "http_request_duration_seconds"
+    lines.append(f"# HELP {name} Latencia de las peticiones por ruta.")
+    lines.append(f"# TYPE {name} histogram")
+    for clave, metricas in rutas:
+        lines.extend(metricas.latency.lines(name, etiquetas[clave]))
+
+    name = "http_request_db_queries"
+    lines.append(f"# HELP {name} Consultas a la base de datos por petición.")
+    lines.append(f"# TYPE {name} histogram")
+    for clave, metricas in rutas:
+        lines.extend(metricas.queries.lines(name, etiquetas[clave]))
+
+    name = "http_request_db_seconds_total"
+    lines.append(f"# HELP {name} Tiempo total en consultas a la base de datos.")
+    lines.append(f"# TYPE {name} counter")
+    for clave, metricas in rutas:
+        lines.append(f"{name}{{{etiquetas[clave]}}} {metricas.db_seconds:.6f}")
+
+    name = "http_request_db_slow_queries_total"
+    lines.append(
+        f"# HELP {name} Consultas que superaron DB_SLOW_QUERY_MS "
+        "(se registran en el log con su SQL)."
+    )
+    lines.append(f"# TYPE {name} counter")
+    for clave, metricas in rutas:
+        lines.append(f"{name}{{{etiquetas[clave]}}} {metricas.slow_queries}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines = pool_metrics(database.engine) + request_metrics()
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Métricas del proceso en formato Prometheus.
+    """
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición HTTP: registra su latencia y sus consultas a la base
+    de datos por ruta (ver `record_request`) y agrega a la respuesta el
+    encabezado `X-DB-Round-Trips` con las idas y vueltas a la base de datos
+    que hizo hasta enviarla.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        with database.count_round_trips(
+            f"{scope['method']} {scope['path']}"
+        ) as contador:
+
+            async def enviar(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(ROUND_TRIPS_HEADER, str(contador.total))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                # El router deja en el scope la ruta que atendió la petición;
+                # se usa su plantilla para no crear una serie por cada id.
+                ruta = scope.get("route")
+                record_request(
+                    scope["method"],
+                    getattr(ruta, "path", UNMATCHED_ROUTE),
+                    time.perf_counter() - inicio,
+                    contador,
+                )
@@ -0,0 +1,107 @@
+"""
+Soporte compartido para las migraciones Alembic de cada servicio.
+
+Cada servicio tiene su directorio `<servicio>/migrations` y su sección en
+`alembic.ini`; las migraciones se aplican una vez, fuera de los procesos web:
+
+    alembic -n petshop upgrade head
+
+La URL sale de `<SERVICIO>_DATABASE_URL` (o `DATABASE_URL`), con el
+search_path del esquema del servicio (users, veterinary, grooming, petshop).
+La tabla de versiones se llama `alembic_version_<servicio>`, así los cuatro
+servicios pueden compartir una base SQLite en desarrollo.
+
+Las bases creadas antes de las migraciones (con `create_all` al importar los
+modelos) no tienen tabla de versiones pero sí las tablas: se adoptan
+marcándolas en la revisión de `baseline_revision`, equivalente a ese
+esquema, y `upgrade` aplica sólo lo posterior. Es lo mismo que hacer a mano
+`alembic -n <servicio> stamp <revisión>`.
+"""
+
+import logging
+import os
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, inspect, pool
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+def database_url(service: str) -> str:
+    """
+    URL de la base del servicio. También la deja en DATABASE_URL para que
+    `common.database` pueda importarse al cargar los modelos.
+    """
+    url = os.getenv(f"{service.upper()}_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if url is None:
+        raise Exception(
+            f"{service.upper()}_DATABASE_URL or DATABASE_URL environment "
+            "variable is not set."
+        )
+    os.environ.setdefault("DATABASE_URL", url)
+    return url
+
+
+def _creada_con_create_all(conexion, version_table: str, metadata) -> bool:
+    """
+    La base tiene tablas del servicio pero nunca se migró.
+    """
+    inspector = inspect(conexion)
+    if inspector.has_table(version_table):
+        return False
+    return any(inspector.has_table(tabla) for tabla in metadata.tables)
+
+
+def run_migrations(context, service: str, metadata, baseline_revision: str):
+    """
+    Ejecuta las migraciones del servicio desde su `env.py`, en modo online
+    (contra la base) u offline (genera el SQL con `--sql`).
+    `baseline_revision` es la revisión que equivale al esquema que creaba
+    `create_all` antes de las migraciones.
+    """
+    config = context.config
+    # Los tests invocan los comandos sin reconfigurar el logging del proceso.
+    if config.config_file_name and config.attributes.get("configure_logger", True):
+        fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+    url = database_url(service)
+    version_table = f"alembic_version_{service}"
+
+    dialecto = make_url(url).get_backend_name()
+
+    def include_object(obj, name, type_, reflected, compare_to):
+        # Índices exclusivos de otro motor (ej. GIN de PostgreSQL en SQLite)
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if ddl_if is not None and ddl_if.dialect not in (None, dialecto):
+            return False
+        # Con una base compartida (SQLite en desarrollo) se ignoran las tablas
+        # de los otros servicios, que no están en el MetaData de éste.
+        tabla = obj if type_ == "table" else getattr(obj, "table", None)
+        return tabla is None or tabla.name in metadata.tables
+
+    opciones = {
+        "target_metadata": metadata,
+        "version_table": version_table,
+        "include_object": include_object,
+    }
+    if context.is_offline_mode():
+        context.configure(url=url, literal_binds=True, **opciones)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(url, poolclass=pool.NullPool)
+    with engine.connect() as conexion:
+        context.configure(connection=conexion, **opciones)
+        if _creada_con_create_all(conexion, version_table, metadata):
+            logger.warning(
+                "%s: base sin migraciones, se adopta en la revisión %s",
+                service,
+                baseline_revision,
+            )
+            context.get_context().stamp(context.script, baseline_revision)
+            conexion.commit()
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
@@ -0,0 +1,151 @@
+"""
+Sesiones revocadas: los access tokens con un `sid` de esta lista se rechazan
+aunque su firma siga vigente.
+
+La lista sólo contiene las sesiones revocadas (logout o reutilización de un
+refresh token) en los últimos ACCESS_TOKEN_EXPIRE_MINUTES: pasado ese plazo
+sus access tokens ya vencieron. Es chica, así que cada proceso la guarda
+entera en memoria y verificar un token cuesta una búsqueda en un conjunto.
+Se renueva en segundo plano cada REVOCATIONS_REFRESH_SECONDS; los demás
+servicios la descargan de REVOCATIONS_URL y el de autenticación la lee de su
+base de datos.
+
+Si la lista no se renueva hace más de REVOCATIONS_MAX_STALE_SECONDS (p. ej.
+tras un rato sin peticiones) la petición espera la renovación hasta
+REVOCATIONS_TIMEOUT_SECONDS. Si aun así no se pudo cargar, no hay forma de
+saber qué sesiones se revocaron: todo token con sesión se rechaza hasta que
+vuelva a renovarse.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, FrozenSet, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Vigencia de los access tokens: el servicio de autenticación los emite con
+# ella y una sesión revocada deja de importar pasado ese plazo.
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+REVOCATIONS_URL = os.getenv("REVOCATIONS_URL")
+REVOCATIONS_REFRESH_SECONDS = float(os.getenv("REVOCATIONS_REFRESH_SECONDS", "5"))
+REVOCATIONS_TIMEOUT_SECONDS = float(os.getenv("REVOCATIONS_TIMEOUT_SECONDS", "2"))
+REVOCATIONS_MAX_STALE_SECONDS = float(os.getenv("REVOCATIONS_MAX_STALE_SECONDS", "60"))
+
+
+def fetch_from_url(url: str) -> Callable[[], Iterable[str]]:
+    """
+    Descarga la lista publicada por el servicio de autenticación.
+    """
+
+    def fetch():
+        with urllib.request.urlopen(url, timeout=REVOCATIONS_TIMEOUT_SECONDS) as r:
+            return json.load(r)["revoked"]
+
+    return fetch
+
+
+class RevocationList:
+    """
+    Conjunto de sesiones revocadas, renovado con `fetch`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Iterable[str]],
+        refresh_seconds: float = REVOCATIONS_REFRESH_SECONDS,
+        retention_seconds: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        max_stale_seconds: float = REVOCATIONS_MAX_STALE_SECONDS,
+    ):
+        self._fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.retention_seconds = retention_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._revoked: FrozenSet[str] = frozenset()
+        # Última descarga exitosa
+        self._fetched_at = float("-inf")
+        # Revocadas en este proceso: valen aunque la renovación siguiente aún
+        # no las vea (p. ej. antes del commit).
+        self._local: Dict[str, float] = {}
+        self._expires_at = 0.0
+        self._loaded = threading.Event()
+        self._refreshing: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, listo: Optional[threading.Event] = None):
+        try:
+            revocadas = frozenset(self._fetch())
+            fetched_at = time.monotonic()
+        except Exception as e:
+            revocadas, fetched_at = self._revoked, self._fetched_at
+            if self._vencida(time.monotonic() - fetched_at):
+                logger.error(
+                    "Lista de revocaciones no disponible, se rechazan los "
+                    "tokens con sesión: %s",
+                    e,
+                )
+            else:
+                logger.warning("No se pudo renovar la lista de revocaciones: %s", e)
+        ahora = time.monotonic()
+        with self._lock:
+            self._fetched_at = fetched_at
+            self._local = {
+                sid: t
+                for sid, t in self._local.items()
+                if ahora - t < self.retention_seconds
+            }
+            self._revoked = revocadas.union(self._local)
+            self._expires_at = ahora + self.refresh_seconds
+            if self._refreshing is listo:
+                self._refreshing = None
+        self._loaded.set()
+        if listo is not None:
+            listo.set()
+
+    def _start_refresh(self) -> Optional[threading.Event]:
+        """
+        Lanza una renovación en segundo plano si no hay otra en curso y pasó
+        REVOCATIONS_REFRESH_SECONDS desde la anterior.
+        Devuelve el evento de la renovación en curso, o None.
+        """
+        with self._lock:
+            if self._refreshing is not None:
+                return self._refreshing
+            if time.monotonic() < self._expires_at:
+                return None
+            self._refreshing = listo = threading.Event()
+        threading.Thread(target=self._refresh, args=(listo,), daemon=True).start()
+        return listo
+
+    def _vencida(self, antiguedad: float) -> bool:
+        return antiguedad > self.max_stale_seconds
+
+    def is_revoked(self, session_id: str) -> bool:
+        listo = self._start_refresh()
+        if listo is not None and self._vencida(time.monotonic() - self._fetched_at):
+            # Primera carga o lista vencida (p. ej. tras un rato sin
+            # peticiones): sin ella no se puede decidir, se espera la
+            # renovación antes de rechazar.
+            listo.wait(REVOCATIONS_TIMEOUT_SECONDS)
+        if self._vencida(time.monotonic() - self._fetched_at):
+            return True
+        return session_id in self._revoked
+
+    def add(self, session_id: str):
+        with self._lock:
+            self._local[session_id] = time.monotonic()
+            self._revoked = self._revoked.union((session_id,))
+
+
+def from_env() -> Optional[RevocationList]:
+    if not REVOCATIONS_URL:
+        logger.error(
+            "REVOCATIONS_URL sin definir: se aceptan los tokens de sesiones "
+            "revocadas hasta su vencimiento"
+        )
+        return None
+    return RevocationList(fetch_from_url(REVOCATIONS_URL))
@@ -0,0 +1,40 @@
+"""
+Cliente de Celery para los procesos web.
+
+Las APIs sólo encolan tareas y consultan su estado, así que no importan los
+módulos de tareas (que cargan openpyxl, OCR y los demás procesadores del
+worker): cada tarea se envía por nombre. La aplicación Celery se crea en el
+primer uso y no al importar el servicio, para no sumar Celery y kombu al
+arranque en frío.
+"""
+
+from typing import Any
+
+_client = None
+
+
+def get_celery():
+    """
+    Devuelve la aplicación Celery, creándola en el primer uso.
+    """
+    global _client
+    if _client is None:
+        from common.celery_app import celery_app
+
+        _client = celery_app
+    return _client
+
+
+def send_task(name: str, *args: Any, **kwargs: Any):
+    """
+    Encola la tarea `name` (ej. "petshop.app.tasks.process_inventory_file").
+    La cola sale de `task_routes` igual que con `.delay()`.
+    """
+    return get_celery().send_task(name, args=args, kwargs=kwargs)
+
+
+def task_result(task_id: str):
+    """
+    Estado y resultado de una tarea encolada.
+    """
+    return get_celery().AsyncResult(task_id)
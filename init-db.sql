@@ -9,6 +9,9 @@ CREATE SCHEMA IF NOT EXISTS veterinary;
 CREATE SCHEMA IF NOT EXISTS grooming;
 CREATE SCHEMA IF NOT EXISTS petshop;
 
+-- Índices de trigramas para la búsqueda de productos del Pet Shop.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Otorga privilegios al usuario 'user' sobre los nuevos esquemas.
 -- Esto es crucial para que los microservicios puedan crear y acceder a sus tablas.
 GRANT ALL PRIVILEGES ON SCHEMA users TO "user";
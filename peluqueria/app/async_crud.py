@@ -0,0 +1,104 @@
+"""
+Variantes asíncronas (AsyncSession) del CRUD de turnos, peluqueros y
+servicios, usadas por `async_routes` cuando el servicio corre con
+DB_ASYNC=true.
+
+En asyncio no hay carga perezosa: el peluquero y el servicio que serializa
+`schemas.Turno` se cargan en la misma consulta.
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from common.pagination import paginate
+
+from . import models, schemas
+
+
+def _select_turnos():
+    return select(models.Turno).options(
+        joinedload(models.Turno.peluquero), joinedload(models.Turno.servicio)
+    )
+
+
+async def get_turno(db: AsyncSession, turno_id: int):
+    """
+    Obtiene un turno por su ID.
+    """
+    return await db.scalar(_select_turnos().where(models.Turno.id == turno_id))
+
+
+async def get_turnos(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de todos los turnos.
+    """
+    consulta = paginate(_select_turnos(), models.Turno.id, after_id, skip, limit)
+    return (await db.scalars(consulta)).all()
+
+
+async def create_turno(db: AsyncSession, turno: schemas.TurnoCreate):
+    """
+    Crea un nuevo turno en la base de datos.
+    """
+    db_turno = models.Turno(**turno.dict())
+    db.add(db_turno)
+    await db.commit()
+    return await get_turno(db, db_turno.id)
+
+
+async def get_peluqueros(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de peluqueros.
+    """
+    consulta = paginate(
+        select(models.Peluquero), models.Peluquero.id, after_id, skip, limit
+    )
+    return (await db.scalars(consulta)).all()
+
+
+async def create_peluquero(db: AsyncSession, peluquero: schemas.PeluqueroCreate):
+    """
+    Crea un nuevo peluquero en la base de datos.
+    """
+    db_peluquero = models.Peluquero(**peluquero.dict())
+    db.add(db_peluquero)
+    await db.commit()
+    return db_peluquero
+
+
+async def get_servicios(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de servicios.
+    """
+    consulta = paginate(
+        select(models.Servicio), models.Servicio.id, after_id, skip, limit
+    )
+    return (await db.scalars(consulta)).all()
+
+
+async def get_servicio_by_name(db: AsyncSession, name: str):
+    """
+    Obtiene un servicio por su nombre.
+    """
+    return await db.scalar(
+        select(models.Servicio).where(models.Servicio.nombre == name)
+    )
+
+
+async def create_servicio(db: AsyncSession, servicio: schemas.ServicioCreate):
+    """
+    Crea un nuevo servicio en la base de datos.
+    """
+    db_servicio = models.Servicio(**servicio.dict())
+    db.add(db_servicio)
+    await db.commit()
+    return db_servicio
@@ -0,0 +1,118 @@
+"""
+Endpoints de turnos, peluqueros y servicios sobre AsyncSession. Con
+DB_ASYNC=true se registran antes que los síncronos de `main` con la misma
+ruta y los reemplazan.
+
+Los parámetros de ruta usan el conversor `:int` para no capturar rutas fijas
+de `main`. No se publican en el esquema OpenAPI porque el contrato es el
+mismo que el de los endpoints síncronos.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.database import get_async_db
+from common.pagination import decode_cursor, set_next_cursor
+
+from . import async_crud, schemas
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.post("/turnos/", response_model=schemas.Turno)
+async def create_turno(
+    turno: schemas.TurnoCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Agenda un nuevo turno para un servicio de peluquería.
+    """
+    return await async_crud.create_turno(db=db, turno=turno)
+
+
+@router.get("/turnos/", response_model=List[schemas.Turno])
+async def read_turnos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una lista de todos los turnos agendados.
+    """
+    turnos = await async_crud.get_turnos(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, turnos, limit)
+    return turnos
+
+
+@router.get("/turnos/{turno_id:int}", response_model=schemas.Turno)
+async def read_turno(turno_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Obtiene un turno específico por ID.
+    """
+    db_turno = await async_crud.get_turno(db, turno_id=turno_id)
+    if db_turno is None:
+        raise HTTPException(status_code=404, detail="Turno not found")
+    return db_turno
+
+
+@router.post("/peluqueros/", response_model=schemas.Peluquero)
+async def create_peluquero(
+    peluquero: schemas.PeluqueroCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea un nuevo peluquero en el sistema.
+    """
+    return await async_crud.create_peluquero(db=db, peluquero=peluquero)
+
+
+@router.get("/peluqueros/", response_model=List[schemas.Peluquero])
+async def read_peluqueros(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una lista de peluqueros disponibles.
+    """
+    peluqueros = await async_crud.get_peluqueros(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, peluqueros, limit)
+    return peluqueros
+
+
+@router.post("/servicios/", response_model=schemas.Servicio)
+async def create_servicio(
+    servicio: schemas.ServicioCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea un nuevo servicio de peluquería.
+    """
+    if await async_crud.get_servicio_by_name(db, name=servicio.nombre):
+        raise HTTPException(status_code=400, detail="Service already exists")
+    return await async_crud.create_servicio(db=db, servicio=servicio)
+
+
+@router.get("/servicios/", response_model=List[schemas.Servicio])
+async def read_servicios(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una lista de servicios disponibles.
+    """
+    servicios = await async_crud.get_servicios(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, servicios, limit)
+    return servicios
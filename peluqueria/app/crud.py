@@ -1,5 +1,9 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 
+from common.pagination import paginate
+
 from . import models, schemas
 
 
@@ -10,11 +14,15 @@ def get_turno(db: Session, turno_id: int):
     return db.query(models.Turno).filter(models.Turno.id == turno_id).first()
 
 
-def get_turnos(db: Session, skip: int = 0, limit: int = 100):
+def get_turnos(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de todos los turnos.
     """
-    return db.query(models.Turno).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Turno), models.Turno.id, after_id, skip, limit
+    ).all()
 
 
 def create_turno(db: Session, turno: schemas.TurnoCreate):
@@ -24,8 +32,7 @@ def create_turno(db: Session, turno: schemas.TurnoCreate):
     """
     db_turno = models.Turno(**turno.dict())
     db.add(db_turno)
-    db.commit()
-    db.refresh(db_turno)
+    db.flush()
     return db_turno
 
 
@@ -42,11 +49,15 @@ def get_peluquero(db: Session, peluquero_id: int):
     )
 
 
-def get_peluqueros(db: Session, skip: int = 0, limit: int = 100):
+def get_peluqueros(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de peluqueros.
     """
-    return db.query(models.Peluquero).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Peluquero), models.Peluquero.id, after_id, skip, limit
+    ).all()
 
 
 def create_peluquero(db: Session, peluquero: schemas.PeluqueroCreate):
@@ -55,8 +66,7 @@ def create_peluquero(db: Session, peluquero: schemas.PeluqueroCreate):
     """
     db_peluquero = models.Peluquero(**peluquero.dict())
     db.add(db_peluquero)
-    db.commit()
-    db.refresh(db_peluquero)
+    db.flush()
     return db_peluquero
 
 
@@ -68,11 +78,15 @@ def get_servicio(db: Session, servicio_id: int):
     return db.query(models.Servicio).filter(models.Servicio.id == servicio_id).first()
 
 
-def get_servicios(db: Session, skip: int = 0, limit: int = 100):
+def get_servicios(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de servicios.
     """
-    return db.query(models.Servicio).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Servicio), models.Servicio.id, after_id, skip, limit
+    ).all()
 
 
 def create_servicio(db: Session, servicio: schemas.ServicioCreate):
@@ -81,8 +95,7 @@ def create_servicio(db: Session, servicio: schemas.ServicioCreate):
     """
     db_servicio = models.Servicio(**servicio.dict())
     db.add(db_servicio)
-    db.commit()
-    db.refresh(db_servicio)
+    db.flush()
     return db_servicio
 
 
@@ -1,31 +1,34 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Response
 from sqlalchemy.orm import Session
 
-from common.database import SessionLocal, engine
+from common import auth, metrics
+from common.database import DB_ASYNC, get_db
+from common.pagination import decode_cursor, set_next_cursor
 
-from . import crud, models, schemas
-
-models.Base.metadata.create_all(bind=engine)
+from . import crud, schemas
 
 app = FastAPI(
     title="Servicio de Peluquería Canina",
     description="Microservicio para agendar y gestionar turnos de peluquería.",
     version="0.1.0",
+    dependencies=auth.service_dependencies(),
 )
+app.include_router(metrics.router)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
+if DB_ASYNC:
+    from . import async_routes
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Registradas primero, tienen precedencia sobre sus versiones síncronas.
+    app.include_router(async_routes.router)
 
 
 @app.post("/turnos/", response_model=schemas.Turno)
-def create_turno(turno: schemas.TurnoCreate, db: Session = Depends(get_db)):
+def create_turno(
+    turno: schemas.TurnoCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Agenda un nuevo turno para un servicio de peluquería.
     La lógica de disponibilidad de peluqueros y cabinas se implementaría aquí.
@@ -34,16 +37,23 @@ def create_turno(turno: schemas.TurnoCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/turnos/", response_model=List[schemas.Turno])
-def read_turnos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_turnos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene una lista de todos los turnos agendados.
     """
-    turnos = crud.get_turnos(db, skip=skip, limit=limit)
+    turnos = crud.get_turnos(db, skip=skip, limit=limit, after_id=decode_cursor(cursor))
+    set_next_cursor(response, turnos, limit)
     return turnos
 
 
 @app.get("/turnos/{turno_id}", response_model=schemas.Turno)
-def read_turno(turno_id: int, db: Session = Depends(get_db)):
+def read_turno(turno_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Obtiene un turno específico por ID.
     """
@@ -54,7 +64,9 @@ def read_turno(turno_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/peluqueros/", response_model=schemas.Peluquero)
-def create_peluquero(peluquero: schemas.PeluqueroCreate, db: Session = Depends(get_db)):
+def create_peluquero(
+    peluquero: schemas.PeluqueroCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo peluquero en el sistema.
     """
@@ -62,15 +74,27 @@ def create_peluquero(peluquero: schemas.PeluqueroCreate, db: Session = Depends(g
 
 
 @app.get("/peluqueros/", response_model=List[schemas.Peluquero])
-def read_peluqueros(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_peluqueros(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene una lista de peluqueros disponibles.
     """
-    return crud.get_peluqueros(db, skip=skip, limit=limit)
+    peluqueros = crud.get_peluqueros(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, peluqueros, limit)
+    return peluqueros
 
 
 @app.post("/servicios/", response_model=schemas.Servicio)
-def create_servicio(servicio: schemas.ServicioCreate, db: Session = Depends(get_db)):
+def create_servicio(
+    servicio: schemas.ServicioCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo servicio de peluquería.
     """
@@ -81,11 +105,21 @@ def create_servicio(servicio: schemas.ServicioCreate, db: Session = Depends(get_
 
 
 @app.get("/servicios/", response_model=List[schemas.Servicio])
-def read_servicios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_servicios(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene una lista de servicios disponibles.
     """
-    return crud.get_servicios(db, skip=skip, limit=limit)
+    servicios = crud.get_servicios(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, servicios, limit)
+    return servicios
 
 
 @app.get("/")
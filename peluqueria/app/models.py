@@ -1,7 +1,9 @@
 from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import declarative_base, relationship
 
-from common.database import Base
+# Base propia del servicio: su MetaData contiene sólo las tablas del esquema
+# `grooming`, que el search_path de DATABASE_URL selecciona.
+Base = declarative_base()
 
 
 class Turno(Base):
@@ -0,0 +1,138 @@
+"""
+Variantes asíncronas (AsyncSession) del CRUD de catálogo, usadas por los
+endpoints de `async_routes` cuando el servicio corre con DB_ASYNC=true.
+
+En asyncio no hay carga perezosa de relaciones: toda relación que serialice
+la respuesta se carga explícitamente en la consulta.
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.pagination import paginate
+
+from . import crud, models, schemas
+
+
+def _select_productos():
+    opciones = crud._ESTRATEGIAS_CARGA.get(crud.PRODUCTO_CARGA_RELACIONES)
+    if opciones is None:
+        # Sin carga perezosa posible, "lazy" se resuelve como "selectin".
+        opciones = crud._ESTRATEGIAS_CARGA["selectin"]
+    return select(models.Producto).options(
+        opciones(models.Producto.proveedor), opciones(models.Producto.categoria)
+    )
+
+
+async def get_producto(db: AsyncSession, producto_id: int):
+    """
+    Obtiene un producto por su ID.
+    """
+    return await db.scalar(_select_productos().where(models.Producto.id == producto_id))
+
+
+async def get_productos(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de productos.
+    """
+    consulta = paginate(_select_productos(), models.Producto.id, after_id, skip, limit)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_producto_by_sku(db: AsyncSession, sku: str):
+    """
+    Obtiene un producto por su SKU.
+    """
+    return await db.scalar(select(models.Producto).where(models.Producto.sku == sku))
+
+
+async def create_producto(db: AsyncSession, producto: schemas.ProductoCreate):
+    """
+    Crea un nuevo producto.
+    """
+    db_producto = models.Producto(**producto.dict())
+    db.add(db_producto)
+    await db.commit()
+    return await get_producto(db, db_producto.id)
+
+
+async def get_productos_by_categoria(db: AsyncSession, categoria_id: int):
+    """
+    Obtiene productos por categoría.
+    """
+    consulta = _select_productos().where(models.Producto.categoria_id == categoria_id)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_productos_by_proveedor(db: AsyncSession, proveedor_id: int):
+    """
+    Obtiene productos por proveedor.
+    """
+    consulta = _select_productos().where(models.Producto.proveedor_id == proveedor_id)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_proveedores(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de proveedores.
+    """
+    consulta = paginate(
+        select(models.Proveedor), models.Proveedor.id, after_id, skip, limit
+    )
+    return (await db.scalars(consulta)).all()
+
+
+async def get_proveedor_by_name(db: AsyncSession, name: str):
+    """
+    Obtiene un proveedor por su nombre.
+    """
+    return await db.scalar(
+        select(models.Proveedor).where(models.Proveedor.nombre == name)
+    )
+
+
+async def create_proveedor(db: AsyncSession, proveedor: schemas.ProveedorCreate):
+    """
+    Crea un nuevo proveedor.
+    """
+    db_proveedor = models.Proveedor(**proveedor.dict())
+    db.add(db_proveedor)
+    await db.commit()
+    return db_proveedor
+
+
+async def get_categorias(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de categorías.
+    """
+    consulta = paginate(
+        select(models.Categoria), models.Categoria.id, after_id, skip, limit
+    )
+    return (await db.scalars(consulta)).all()
+
+
+async def get_categoria_by_name(db: AsyncSession, name: str):
+    """
+    Obtiene una categoría por su nombre.
+    """
+    return await db.scalar(
+        select(models.Categoria).where(models.Categoria.nombre == name)
+    )
+
+
+async def create_categoria(db: AsyncSession, categoria: schemas.CategoriaCreate):
+    """
+    Crea una nueva categoría.
+    """
+    db_categoria = models.Categoria(**categoria.dict())
+    db.add(db_categoria)
+    await db.commit()
+    return db_categoria
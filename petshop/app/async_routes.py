@@ -0,0 +1,146 @@
+"""
+Endpoints de catálogo sobre AsyncSession. Con DB_ASYNC=true se registran
+antes que los síncronos de `main` con la misma ruta y los reemplazan; el resto
+de los endpoints (TPV, reservas, cargas masivas) sigue siendo síncrono.
+
+Los parámetros de ruta usan el conversor `:int` para no capturar rutas fijas
+de `main` como `/productos/search`. No se publican en el esquema OpenAPI
+porque el contrato es el mismo que el de los endpoints síncronos.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.database import get_async_db
+from common.pagination import decode_cursor, set_next_cursor
+
+from . import async_crud, schemas
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/productos/", response_model=List[schemas.Producto])
+async def read_productos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una lista de productos con su stock actual.
+    """
+    productos = await async_crud.get_productos(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, productos, limit)
+    return productos
+
+
+@router.post("/productos/", response_model=schemas.Producto)
+async def create_producto(
+    producto: schemas.ProductoCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea un nuevo producto en el inventario.
+    """
+    if producto.sku and await async_crud.get_producto_by_sku(db, sku=producto.sku):
+        raise HTTPException(status_code=400, detail="SKU already exists")
+    return await async_crud.create_producto(db=db, producto=producto)
+
+
+@router.get("/productos/{producto_id:int}", response_model=schemas.Producto)
+async def read_producto(producto_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Obtiene un producto específico por ID.
+    """
+    db_producto = await async_crud.get_producto(db, producto_id=producto_id)
+    if db_producto is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return db_producto
+
+
+@router.post("/proveedores/", response_model=schemas.Proveedor)
+async def create_proveedor(
+    proveedor: schemas.ProveedorCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea un nuevo proveedor.
+    """
+    if await async_crud.get_proveedor_by_name(db, name=proveedor.nombre):
+        raise HTTPException(status_code=400, detail="Proveedor already exists")
+    return await async_crud.create_proveedor(db=db, proveedor=proveedor)
+
+
+@router.get("/proveedores/", response_model=List[schemas.Proveedor])
+async def read_proveedores(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene lista de proveedores.
+    """
+    proveedores = await async_crud.get_proveedores(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, proveedores, limit)
+    return proveedores
+
+
+@router.get(
+    "/proveedores/{proveedor_id:int}/productos/", response_model=List[schemas.Producto]
+)
+async def read_productos_by_proveedor(
+    proveedor_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene productos por proveedor.
+    """
+    return await async_crud.get_productos_by_proveedor(db, proveedor_id=proveedor_id)
+
+
+@router.post("/categorias/", response_model=schemas.Categoria)
+async def create_categoria(
+    categoria: schemas.CategoriaCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea una nueva categoría.
+    """
+    if await async_crud.get_categoria_by_name(db, name=categoria.nombre):
+        raise HTTPException(status_code=400, detail="Categoria already exists")
+    return await async_crud.create_categoria(db=db, categoria=categoria)
+
+
+@router.get("/categorias/", response_model=List[schemas.Categoria])
+async def read_categorias(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene lista de categorías.
+    """
+    categorias = await async_crud.get_categorias(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, categorias, limit)
+    return categorias
+
+
+@router.get(
+    "/categorias/{categoria_id:int}/productos/", response_model=List[schemas.Producto]
+)
+async def read_productos_by_categoria(
+    categoria_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene productos por categoría.
+    """
+    return await async_crud.get_productos_by_categoria(db, categoria_id=categoria_id)
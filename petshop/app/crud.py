@@ -1,20 +1,123 @@
-from sqlalchemy.orm import Session
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
 
-from . import models, schemas
+from sqlalchemy import (
+    Float,
+    Integer,
+    and_,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from common.database import insert_for
+from common.pagination import paginate
+
+from . import models, schemas, search
+
+# Duración por defecto de una reserva de stock para un carrito
+RESERVA_TTL_SEGUNDOS = int(os.getenv("RESERVA_TTL_SEGUNDOS", "900"))
+
+# Filas por sentencia en los upserts masivos de productos
+BULK_UPSERT_LOTE = int(os.getenv("BULK_UPSERT_LOTE", "1000"))
+
+# Cambios de precio por transacción en las actualizaciones masivas
+PRECIOS_LOTE = int(os.getenv("PRECIOS_LOTE", "1000"))
+
+# Estrategia de carga de proveedor y categoría en los listados de productos:
+# "joined" (un JOIN en la misma consulta), "selectin" (una consulta IN por
+# relación) o "lazy" (una consulta por producto, sólo para depurar).
+PRODUCTO_CARGA_RELACIONES = os.getenv("PRODUCTO_CARGA_RELACIONES", "joined")
+
+_ESTRATEGIAS_CARGA = {"joined": joinedload, "selectin": selectinload}
+
+
+class StockInsuficienteError(ValueError):
+    """
+    Error de venta que agrupa todos los ítems que no pueden despacharse.
+    """
+
+    def __init__(self, faltantes: List[dict]):
+        self.faltantes = faltantes
+        detalle = "; ".join(
+            f"producto {f['producto_id']}: {f['motivo']} "
+            f"(stock actual: {f['stock_actual']}, "
+            f"cantidad solicitada: {f['cantidad_solicitada']})"
+            for f in faltantes
+        )
+        super().__init__(f"Stock insuficiente. {detalle}")
+
+
+class ProductoNoEncontradoError(LookupError):
+    """
+    La operación refiere productos que no existen.
+    """
+
+    def __init__(self, producto_ids: List[int]):
+        self.producto_ids = producto_ids
+        super().__init__(f"Productos no encontrados: {producto_ids}")
+
+
+def _query_productos(db: Session, estrategia: Optional[str] = None):
+    """
+    Consulta de productos que trae proveedor y categoría con la estrategia
+    configurada, para que serializar `schemas.Producto` no dispare una
+    consulta por cada producto.
+    """
+    cargar = _ESTRATEGIAS_CARGA.get(estrategia or PRODUCTO_CARGA_RELACIONES)
+    query = db.query(models.Producto)
+    if cargar is not None:
+        query = query.options(
+            cargar(models.Producto.proveedor), cargar(models.Producto.categoria)
+        )
+    return query
 
 
 def get_producto(db: Session, producto_id: int):
     """
     Obtiene un producto por su ID.
     """
-    return db.query(models.Producto).filter(models.Producto.id == producto_id).first()
+    return _query_productos(db).filter(models.Producto.id == producto_id).first()
+
+
+def get_producto_by_sku(db: Session, sku: str):
+    """
+    Obtiene un producto por su SKU.
+    """
+    return db.query(models.Producto).filter(models.Producto.sku == sku).first()
 
 
-def get_productos(db: Session, skip: int = 0, limit: int = 100):
+def get_productos(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de todos los productos.
     """
-    return db.query(models.Producto).offset(skip).limit(limit).all()
+    return paginate(
+        _query_productos(db), models.Producto.id, after_id, skip, limit
+    ).all()
+
+
+def buscar_productos(db: Session, q: str, limit: int = 20):
+    """
+    Busca productos por nombre (palabras completas o prefijos), los más
+    relevantes primero.
+    """
+    ids = search.buscar_ids(db, q, limit)
+    if not ids:
+        return []
+    productos = {
+        p.id: p for p in _query_productos(db).filter(models.Producto.id.in_(ids))
+    }
+    return [productos[i] for i in ids if i in productos]
 
 
 def create_producto(db: Session, producto: schemas.ProductoCreate):
@@ -23,29 +126,834 @@ def create_producto(db: Session, producto: schemas.ProductoCreate):
     """
     db_producto = models.Producto(**producto.dict())
     db.add(db_producto)
-    db.commit()
-    db.refresh(db_producto)
+    db.flush()
     return db_producto
 
 
-def update_stock_producto(db: Session, producto_id: int, cantidad_vendida: int):
+def _agrupar_items_venta(items: Iterable[schemas.VentaItem]) -> Dict[int, int]:
     """
-    Actualiza el stock de un producto.
-    Esta función es clave para el TPV.
+    Suma las cantidades por producto (un mismo producto puede repetirse
+    en la canasta).
     """
-    db_producto = get_producto(db, producto_id)
-    if db_producto:
-        if db_producto.stock < cantidad_vendida:
+    cantidades: Dict[int, int] = {}
+    for item in items:
+        if item.cantidad <= 0:
             raise ValueError(
-                f"Stock insuficiente. Stock actual: {db_producto.stock}, "
-                f"cantidad solicitada: {cantidad_vendida}"
+                f"La cantidad del producto {item.producto_id} debe ser positiva"
+            )
+        cantidades[item.producto_id] = (
+            cantidades.get(item.producto_id, 0) + item.cantidad
+        )
+    return cantidades
+
+
+def _buscar_faltantes(stock_actual: Dict[int, int], cantidades: Dict[int, int]):
+    """
+    Devuelve los ítems que no existen o no tienen stock suficiente.
+    """
+    faltantes = []
+    for producto_id, cantidad in cantidades.items():
+        if producto_id not in stock_actual:
+            motivo = "producto no encontrado"
+        elif (stock_actual[producto_id] or 0) < cantidad:
+            motivo = "stock insuficiente"
+        else:
+            continue
+        faltantes.append(
+            {
+                "producto_id": producto_id,
+                "motivo": motivo,
+                "stock_actual": stock_actual.get(producto_id),
+                "cantidad_solicitada": cantidad,
+            }
+        )
+    return faltantes
+
+
+def _leer_productos(db: Session, ids: List[int], bloquear: bool = False):
+    """
+    Lee stock, precio y categoría de varios productos en una sola consulta.
+    Con `bloquear` toma los bloqueos de fila en orden de ID para evitar
+    deadlocks entre cajas.
+    """
+    consulta = (
+        select(
+            models.Producto.id,
+            models.Producto.stock,
+            models.Producto.precio,
+            models.Producto.categoria_id,
+        )
+        .where(models.Producto.id.in_(ids))
+        .order_by(models.Producto.id)
+    )
+    if bloquear:
+        consulta = consulta.with_for_update()
+    return {fila.id: fila for fila in db.execute(consulta)}
+
+
+def _descontar_stock(db: Session, cantidades: Dict[int, int], productos=None):
+    """
+    Descuenta todas las cantidades con un único UPDATE condicional
+    (`stock >= cantidad`). Si no se pasan los `productos` ya bloqueados por el
+    llamador, se bloquean aquí. No confirma la transacción.
+    """
+    if not cantidades:
+        return
+    ids = sorted(cantidades)
+    if productos is None:
+        productos = _leer_productos(db, ids, bloquear=True)
+    stock_actual = {pid: p.stock for pid, p in productos.items()}
+    faltantes = _buscar_faltantes(stock_actual, cantidades)
+    if faltantes:
+        raise StockInsuficienteError(faltantes)
+
+    cantidad_por_id = case(cantidades, value=models.Producto.id)
+    resultado = db.execute(
+        update(models.Producto)
+        .where(
+            models.Producto.id.in_(ids),
+            models.Producto.stock >= cantidad_por_id,
+        )
+        .values(stock=models.Producto.stock - cantidad_por_id)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != len(ids):
+        # Sólo ocurre en motores sin bloqueo de filas (ej. SQLite) si otra
+        # transacción modificó el stock entre el SELECT y el UPDATE.
+        releidos = _leer_productos(db, ids)
+        stock_actual = {pid: p.stock for pid, p in releidos.items()}
+        raise StockInsuficienteError(_buscar_faltantes(stock_actual, cantidades))
+
+
+def _reponer_stock(db: Session, cantidades: Dict[int, int]):
+    """
+    Devuelve unidades al stock de varios productos con un único UPDATE.
+    """
+    if not cantidades:
+        return
+    cantidad_por_id = case(cantidades, value=models.Producto.id)
+    db.execute(
+        update(models.Producto)
+        .where(models.Producto.id.in_(list(cantidades)))
+        .values(stock=models.Producto.stock + cantidad_por_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _tomar_reservas(db: Session, condicion) -> Dict[int, int]:
+    """
+    Elimina las reservas que cumplen la condición y devuelve las unidades
+    retenidas por producto. Las filas se bloquean antes de borrarse para que
+    una venta y la limpieza de reservas vencidas no consuman la misma reserva.
+    """
+    filas = db.execute(
+        select(
+            models.ReservaStock.id,
+            models.ReservaStock.producto_id,
+            models.ReservaStock.cantidad,
+        )
+        .where(condicion)
+        .order_by(models.ReservaStock.id)
+        .with_for_update()
+    ).all()
+    if not filas:
+        return {}
+
+    retenidas: Dict[int, int] = {}
+    for _, producto_id, cantidad in filas:
+        retenidas[producto_id] = retenidas.get(producto_id, 0) + cantidad
+    db.execute(
+        delete(models.ReservaStock)
+        .where(models.ReservaStock.id.in_([fila.id for fila in filas]))
+        .execution_options(synchronize_session=False)
+    )
+    return retenidas
+
+
+def _acumular_resumenes(db: Session, fecha: date, total: float, lineas: List[dict]):
+    """
+    Suma la venta a los resúmenes diarios (total, por producto y por
+    categoría) con upserts incrementales en la misma transacción.
+    """
+    por_producto: Dict[int, dict] = {}
+    por_categoria: Dict[int, dict] = {}
+    for linea in lineas:
+        for acumulado, clave, valor in (
+            (por_producto, "producto_id", linea["producto_id"]),
+            (por_categoria, "categoria_id", linea["categoria_id"]),
+        ):
+            fila = acumulado.setdefault(
+                valor, {"fecha": fecha, clave: valor, "unidades": 0, "total": 0.0}
+            )
+            fila["unidades"] += linea["cantidad"]
+            fila["total"] += linea["subtotal"]
+
+    resumenes = (
+        (
+            models.VentaResumenDiario,
+            ["fecha"],
+            [
+                {
+                    "fecha": fecha,
+                    "cantidad_ventas": 1,
+                    "unidades": sum(linea["cantidad"] for linea in lineas),
+                    "total": total,
+                }
+            ],
+        ),
+        (
+            models.VentaResumenProducto,
+            ["fecha", "producto_id"],
+            list(por_producto.values()),
+        ),
+        (
+            models.VentaResumenCategoria,
+            ["fecha", "categoria_id"],
+            list(por_categoria.values()),
+        ),
+    )
+    for modelo, claves, filas in resumenes:
+        sentencia = insert_for(db, modelo).values(filas)
+        acumulables = [c for c in filas[0] if c not in claves]
+        db.execute(
+            sentencia.on_conflict_do_update(
+                index_elements=claves,
+                set_={
+                    c: getattr(modelo, c) + getattr(sentencia.excluded, c)
+                    for c in acumulables
+                },
+            )
+        )
+
+
+def _registrar_en_libro(
+    db: Session,
+    cantidades: Dict[int, int],
+    productos,
+    cliente_id: Optional[int] = None,
+) -> models.Venta:
+    """
+    Persiste la venta y sus líneas al precio vigente, y actualiza los
+    resúmenes precalculados para reportes.
+    """
+    lineas = []
+    for producto_id in sorted(cantidades):
+        producto = productos[producto_id]
+        cantidad = cantidades[producto_id]
+        lineas.append(
+            {
+                "producto_id": producto_id,
+                # Sin categoría se agrupa bajo la categoría 0.
+                "categoria_id": producto.categoria_id or 0,
+                "cantidad": cantidad,
+                "precio_unitario": producto.precio,
+                "subtotal": producto.precio * cantidad,
+            }
+        )
+
+    fecha = datetime.utcnow()
+    venta = models.Venta(
+        fecha=fecha,
+        cliente_id=cliente_id,
+        total=sum(linea["subtotal"] for linea in lineas),
+    )
+    db.add(venta)
+    db.flush()
+    # Las líneas se insertan en un solo executemany, sin cargar objetos ORM.
+    db.execute(
+        insert(models.VentaLinea), [dict(linea, venta_id=venta.id) for linea in lineas]
+    )
+    _acumular_resumenes(db, fecha.date(), venta.total, lineas)
+    return venta
+
+
+def registrar_venta(
+    db: Session,
+    items: Iterable[schemas.VentaItem],
+    carrito_id: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+) -> models.Venta:
+    """
+    Descuenta el stock de todos los ítems de una venta en una sola transacción
+    y la asienta en el libro de ventas junto con sus resúmenes diarios.
+
+    Si la venta viene de un carrito con reservas, las unidades reservadas ya
+    fueron descontadas: sólo se descuenta la diferencia y, si se reservó de
+    más, el sobrante vuelve al stock. Si algún ítem falla no se descuenta nada
+    y se informan todos los ítems con problemas a la vez.
+    """
+    cantidades = _agrupar_items_venta(items)
+    if not cantidades:
+        raise ValueError("La venta no contiene ítems")
+
+    try:
+        retenidas = {}
+        if carrito_id:
+            retenidas = _tomar_reservas(
+                db, models.ReservaStock.carrito_id == carrito_id
             )
 
-        db_producto.stock -= cantidad_vendida
-        db.add(db_producto)
+        a_descontar = {}
+        a_reponer = {}
+        for producto_id in set(cantidades) | set(retenidas):
+            diferencia = cantidades.get(producto_id, 0) - retenidas.get(producto_id, 0)
+            if diferencia > 0:
+                a_descontar[producto_id] = diferencia
+            elif diferencia < 0:
+                a_reponer[producto_id] = -diferencia
+
+        productos = _leer_productos(db, sorted(cantidades), bloquear=True)
+        # Un producto reservado y eliminado después no pasa por el descuento
+        # pero tampoco puede asentarse: se informa junto con los faltantes.
+        eliminados = {
+            pid: cantidad
+            for pid, cantidad in cantidades.items()
+            if pid not in productos and pid not in a_descontar
+        }
+        if eliminados:
+            stock_actual = {pid: p.stock for pid, p in productos.items()}
+            raise StockInsuficienteError(
+                _buscar_faltantes(stock_actual, {**a_descontar, **eliminados})
+            )
+        _descontar_stock(db, a_descontar, productos)
+        _reponer_stock(db, a_reponer)
+        venta = _registrar_en_libro(db, cantidades, productos, cliente_id)
         db.commit()
-        db.refresh(db_producto)
-    return db_producto
+    except Exception:
+        db.rollback()
+        raise
+    return venta
+
+
+def get_resumen_ventas(db: Session, desde: date, hasta: date, top: int = 5):
+    """
+    Resume las ventas entre dos fechas (inclusive) leyendo sólo los resúmenes
+    diarios precalculados: el costo depende de la cantidad de días, no de la
+    cantidad de líneas vendidas.
+    """
+    diario = models.VentaResumenDiario
+    por_producto = models.VentaResumenProducto
+    por_categoria = models.VentaResumenCategoria
+
+    dias = (
+        db.query(diario)
+        .filter(diario.fecha.between(desde, hasta))
+        .order_by(diario.fecha)
+        .all()
+    )
+
+    unidades = func.sum(por_producto.unidades).label("unidades")
+    top_productos = (
+        db.query(
+            por_producto.producto_id,
+            models.Producto.sku,
+            models.Producto.nombre,
+            unidades,
+            func.sum(por_producto.total).label("total"),
+        )
+        .join(models.Producto, models.Producto.id == por_producto.producto_id)
+        .filter(por_producto.fecha.between(desde, hasta))
+        .group_by(por_producto.producto_id, models.Producto.sku, models.Producto.nombre)
+        .order_by(unidades.desc())
+        .limit(top)
+        .all()
+    )
+
+    categorias = (
+        db.query(
+            por_categoria.categoria_id,
+            models.Categoria.nombre,
+            func.sum(por_categoria.unidades).label("unidades"),
+            func.sum(por_categoria.total).label("total"),
+        )
+        .outerjoin(models.Categoria, models.Categoria.id == por_categoria.categoria_id)
+        .filter(por_categoria.fecha.between(desde, hasta))
+        .group_by(por_categoria.categoria_id, models.Categoria.nombre)
+        .all()
+    )
+
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "total_sales": round(sum(d.total for d in dias), 2),
+        "products_sold": sum(d.unidades for d in dias),
+        "sales_count": sum(d.cantidad_ventas for d in dias),
+        "daily": [
+            {
+                "fecha": d.fecha.isoformat(),
+                "ventas": d.cantidad_ventas,
+                "unidades": d.unidades,
+                "total": round(d.total, 2),
+            }
+            for d in dias
+        ],
+        "top_products": [
+            {
+                "producto_id": p.producto_id,
+                "sku": p.sku,
+                "name": p.nombre,
+                "quantity_sold": p.unidades,
+                "total": round(p.total, 2),
+            }
+            for p in top_productos
+        ],
+        "categories": {
+            (c.nombre or "Sin categoría"): round(c.total, 2) for c in categorias
+        },
+    }
+
+
+# --- Reservas de stock para carritos ---
+def reservar_stock(
+    db: Session,
+    carrito_id: str,
+    items: Iterable[schemas.VentaItem],
+    ttl_segundos: int = RESERVA_TTL_SEGUNDOS,
+):
+    """
+    Retiene stock para un carrito durante `ttl_segundos`.
+
+    Las unidades se descuentan en el momento (el stock publicado es siempre
+    el disponible para la venta) y vuelven al inventario cuando la reserva
+    vence o se libera. Si falta stock, se liberan primero las reservas
+    vencidas de esos productos y se reintenta una vez. Si algún producto no
+    existe lanza `ProductoNoEncontradoError`.
+    """
+    cantidades = _agrupar_items_venta(items)
+    if not cantidades:
+        raise ValueError("La reserva no contiene ítems")
+    expira_en = datetime.utcnow() + timedelta(seconds=ttl_segundos)
+
+    try:
+        productos = _leer_productos(db, sorted(cantidades), bloquear=True)
+        inexistentes = sorted(set(cantidades) - set(productos))
+        if inexistentes:
+            raise ProductoNoEncontradoError(inexistentes)
+        try:
+            _descontar_stock(db, cantidades, productos)
+        except StockInsuficienteError as e:
+            # Se descarta cualquier descuento parcial antes de reintentar.
+            db.rollback()
+            vencidas = _tomar_reservas(
+                db,
+                and_(
+                    models.ReservaStock.expira_en <= datetime.utcnow(),
+                    models.ReservaStock.producto_id.in_(
+                        [f["producto_id"] for f in e.faltantes]
+                    ),
+                ),
+            )
+            if not vencidas:
+                raise
+            _reponer_stock(db, vencidas)
+            _descontar_stock(db, cantidades)
+
+        reservas = [
+            models.ReservaStock(
+                carrito_id=carrito_id,
+                producto_id=producto_id,
+                cantidad=cantidad,
+                expira_en=expira_en,
+            )
+            for producto_id, cantidad in cantidades.items()
+        ]
+        db.add_all(reservas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return reservas
+
+
+def liberar_reserva(db: Session, carrito_id: str) -> int:
+    """
+    Libera todas las reservas de un carrito y devuelve las unidades al stock.
+    """
+    retenidas = _tomar_reservas(db, models.ReservaStock.carrito_id == carrito_id)
+    _reponer_stock(db, retenidas)
+    db.commit()
+    return sum(retenidas.values())
+
+
+def liberar_reservas_expiradas(db: Session) -> int:
+    """
+    Devuelve al stock las unidades de todas las reservas vencidas.
+    """
+    retenidas = _tomar_reservas(db, models.ReservaStock.expira_en <= datetime.utcnow())
+    _reponer_stock(db, retenidas)
+    db.commit()
+    return sum(retenidas.values())
+
+
+def _resolver_categorias(db: Session, nombres, cache: Dict[str, int]):
+    """
+    Traduce nombres de categoría a IDs, creando en bloque las que no existen.
+    El `cache` se comparte entre lotes para no repetir consultas.
+    """
+    pendientes = {n for n in nombres if n and n not in cache}
+    if not pendientes:
+        return
+    consulta = select(models.Categoria.nombre, models.Categoria.id).where(
+        models.Categoria.nombre.in_(pendientes)
+    )
+    cache.update(dict(db.execute(consulta).all()))
+    nuevas = [n for n in pendientes if n not in cache]
+    if nuevas:
+        db.execute(insert(models.Categoria), [{"nombre": n} for n in nuevas])
+        consulta = select(models.Categoria.nombre, models.Categoria.id).where(
+            models.Categoria.nombre.in_(nuevas)
+        )
+        cache.update(dict(db.execute(consulta).all()))
+
+
+def _agrupar_por_columnas(filas: Iterable[dict]) -> Dict[tuple, List[dict]]:
+    """
+    Agrupa filas por conjunto de columnas: cada sentencia masiva necesita
+    que todas sus filas tengan las mismas claves.
+    """
+    grupos: Dict[tuple, List[dict]] = {}
+    for fila in filas:
+        grupos.setdefault(tuple(sorted(fila)), []).append(fila)
+    return grupos
+
+
+def _upsert_por_sku(db: Session, filas: List[dict]) -> List[dict]:
+    """
+    Inserta o actualiza productos identificados por SKU con
+    `INSERT ... ON CONFLICT (sku) DO UPDATE` en sentencias de hasta
+    BULK_UPSERT_LOTE filas. Sólo se actualizan las columnas presentes.
+    No confirma la transacción.
+    """
+    resultados = []
+    for inicio in range(0, len(filas), BULK_UPSERT_LOTE):
+        lote = filas[inicio : inicio + BULK_UPSERT_LOTE]
+        skus = [fila["sku"] for fila in lote]
+        existentes = set(
+            db.scalars(select(models.Producto.sku).where(models.Producto.sku.in_(skus)))
+        )
+        ids = {}
+        for columnas, grupo in _agrupar_por_columnas(lote).items():
+            sentencia = insert_for(db, models.Producto).values(grupo)
+            sentencia = sentencia.on_conflict_do_update(
+                index_elements=["sku"],
+                set_={c: sentencia.excluded[c] for c in columnas if c != "sku"},
+            ).returning(models.Producto.sku, models.Producto.id)
+            ids.update(dict(db.execute(sentencia).all()))
+        resultados.extend(
+            {
+                "sku": sku,
+                "id": ids[sku],
+                "resultado": "actualizado" if sku in existentes else "creado",
+            }
+            for sku in skus
+        )
+    return resultados
+
+
+def bulk_upsert_productos(db: Session, productos: List[dict]) -> List[dict]:
+    """
+    Crea o actualiza miles de productos por SKU en una sola transacción.
+    Devuelve un resultado por fila recibida, en el mismo orden; si un SKU se
+    repite, gana la última fila y las anteriores se informan como duplicadas.
+    """
+    ultima_fila = {producto["sku"]: i for i, producto in enumerate(productos)}
+    try:
+        por_sku = {
+            r["sku"]: r
+            for r in _upsert_por_sku(db, [productos[i] for i in ultima_fila.values()])
+        }
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    resultados = []
+    for i, producto in enumerate(productos):
+        resultado = dict(por_sku[producto["sku"]], fila=i)
+        if ultima_fila[producto["sku"]] != i:
+            resultado["resultado"] = "duplicado"
+        resultados.append(resultado)
+    return resultados
+
+
+def _upsert_por_nombre(db: Session, filas: List[dict]) -> Dict[str, int]:
+    """
+    Inserta o actualiza productos sin SKU identificándolos por nombre, con un
+    INSERT y un UPDATE masivos. No confirma la transacción.
+    """
+    por_nombre = {fila["nombre"]: fila for fila in filas}
+    existentes = dict(
+        db.execute(
+            select(models.Producto.nombre, models.Producto.id).where(
+                models.Producto.nombre.in_(list(por_nombre))
+            )
+        ).all()
+    )
+    nuevos = [f for n, f in por_nombre.items() if n not in existentes]
+    cambios = [
+        dict(f, id=existentes[n]) for n, f in por_nombre.items() if n in existentes
+    ]
+    for grupo in _agrupar_por_columnas(nuevos).values():
+        db.execute(insert(models.Producto), grupo)
+    for grupo in _agrupar_por_columnas(cambios).values():
+        db.execute(update(models.Producto), grupo)
+    return {"creados": len(nuevos), "actualizados": len(cambios)}
+
+
+def upsert_inventario(
+    db: Session, filas: List[dict], categorias: Optional[Dict[str, int]] = None
+):
+    """
+    Crea o actualiza un lote de productos de un archivo de inventario y
+    confirma el lote como una sola transacción. Las filas con SKU se
+    identifican por SKU; las que no lo tienen, por nombre.
+    """
+    categorias = {} if categorias is None else categorias
+    _resolver_categorias(db, (f.get("categoria") for f in filas), categorias)
+
+    con_sku: Dict[str, dict] = {}
+    sin_sku: List[dict] = []
+    for fila in filas:
+        valores = {"nombre": fila["nombre"], "precio": fila["precio"]}
+        valores["stock"] = fila["stock"]
+        # Las columnas opcionales sólo se escriben si vienen en el archivo.
+        if fila.get("descripcion") is not None:
+            valores["descripcion"] = fila["descripcion"]
+        if fila.get("categoria"):
+            valores["categoria_id"] = categorias[fila["categoria"]]
+        if fila.get("sku"):
+            # Si un SKU se repite en el lote, gana la última fila.
+            con_sku[fila["sku"]] = dict(valores, sku=fila["sku"])
+        else:
+            sin_sku.append(valores)
+
+    resumen = _upsert_por_nombre(db, sin_sku) if sin_sku else {}
+    resultados = _upsert_por_sku(db, list(con_sku.values()))
+    db.commit()
+    creados = sum(1 for r in resultados if r["resultado"] == "creado")
+    return {
+        "creados": resumen.get("creados", 0) + creados,
+        "actualizados": resumen.get("actualizados", 0) + len(resultados) - creados,
+    }
+
+
+def _actualizar_precios(db: Session, precios: Dict[int, float]):
+    """
+    Aplica nuevos precios a varios productos con un único UPDATE. En
+    PostgreSQL usa `UPDATE ... FROM (VALUES ...)`; en otros motores, un CASE.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        nuevos = values(
+            column("id", Integer), column("precio", Float), name="nuevos"
+        ).data(list(precios.items()))
+        sentencia = (
+            update(models.Producto)
+            .where(models.Producto.id == nuevos.c.id)
+            .values(precio=nuevos.c.precio)
+        )
+    else:
+        sentencia = (
+            update(models.Producto)
+            .where(models.Producto.id.in_(list(precios)))
+            .values(precio=case(precios, value=models.Producto.id))
+        )
+    db.execute(sentencia.execution_options(synchronize_session=False))
+
+
+def _aplicar_lote_precios(db: Session, lote: List[dict]):
+    """
+    Aplica un lote de cambios de precio ya normalizados y registra el
+    historial. Los cambios cuya clave de idempotencia ya figura en el
+    historial se omiten. No confirma la transacción.
+    """
+    claves = [cambio["clave"] for cambio in lote]
+    aplicadas = set(
+        db.scalars(
+            select(models.PrecioHistorial.clave_idempotencia).where(
+                models.PrecioHistorial.clave_idempotencia.in_(claves)
+            )
+        )
+    )
+    pendientes = [c for c in lote if c["clave"] not in aplicadas]
+    omitidas = [c for c in lote if c["clave"] in aplicadas]
+
+    productos = {}
+    if pendientes:
+        productos = {
+            fila.sku: fila
+            for fila in db.execute(
+                select(models.Producto.id, models.Producto.sku, models.Producto.precio)
+                .where(models.Producto.sku.in_([c["sku"] for c in pendientes]))
+                .order_by(models.Producto.id)
+                .with_for_update()
+            )
+        }
+    exitosas = [c for c in pendientes if c["sku"] in productos]
+    fallidas = [
+        dict(c, error="SKU no encontrado")
+        for c in pendientes
+        if c["sku"] not in productos
+    ]
+    if not exitosas:
+        return exitosas, fallidas, omitidas
+
+    fecha = datetime.utcnow()
+    for cambio in exitosas:
+        producto = productos[cambio["sku"]]
+        cambio.update(
+            producto_id=producto.id, precio_anterior=producto.precio, fecha=fecha
+        )
+    _actualizar_precios(db, {c["producto_id"]: c["precio"] for c in exitosas})
+    db.execute(
+        insert(models.PrecioHistorial),
+        [
+            {
+                "producto_id": c["producto_id"],
+                "precio_anterior": c["precio_anterior"],
+                "precio_nuevo": c["precio"],
+                "clave_idempotencia": c["clave"],
+                "fecha": fecha,
+            }
+            for c in exitosas
+        ],
+    )
+    return exitosas, fallidas, omitidas
+
+
+def aplicar_actualizaciones_precio(
+    db: Session,
+    actualizaciones: List[dict],
+    clave_base: str,
+    tamano_lote: int = PRECIOS_LOTE,
+):
+    """
+    Actualiza precios por SKU en transacciones de `tamano_lote` cambios.
+
+    Cada cambio lleva una clave de idempotencia: la indicada en
+    `idempotency_key` o, si no, `clave_base` más su posición en la lista.
+    Repetir la misma llamada (ej. un reintento de Celery con el mismo ID de
+    tarea) no vuelve a aplicar los lotes ya confirmados.
+    """
+    exitosas: List[dict] = []
+    fallidas: List[dict] = []
+    omitidas: List[dict] = []
+
+    normalizadas = []
+    for posicion, actualizacion in enumerate(actualizaciones):
+        sku = actualizacion.get("sku")
+        try:
+            precio = float(actualizacion["new_price"])
+            if not sku or precio < 0:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            fallidas.append({"sku": sku or "unknown", "error": "Datos inválidos"})
+            continue
+        normalizadas.append(
+            {
+                "sku": sku,
+                "precio": precio,
+                "clave": actualizacion.get("idempotency_key")
+                or f"{clave_base}:{posicion}",
+            }
+        )
+
+    # Un mismo SKU dos veces haría que el resultado dependa de en qué lote
+    # cae cada cambio, y una clave repetida chocaría consigo misma.
+    lote_unico = []
+    skus, claves = set(), set()
+    for cambio in normalizadas:
+        if cambio["sku"] in skus:
+            fallidas.append(dict(cambio, error="SKU repetido en la actualización"))
+            continue
+        if cambio["clave"] in claves:
+            fallidas.append(dict(cambio, error="Clave de idempotencia repetida"))
+            continue
+        skus.add(cambio["sku"])
+        claves.add(cambio["clave"])
+        lote_unico.append(cambio)
+
+    for inicio in range(0, len(lote_unico), tamano_lote):
+        lote = lote_unico[inicio : inicio + tamano_lote]
+        for intento in range(2):
+            try:
+                resultado = _aplicar_lote_precios(db, lote)
+                db.commit()
+                break
+            except IntegrityError:
+                # Una ejecución concurrente con alguna de estas claves confirmó
+                # primero: al repetir el lote esas claves ya figuran en el
+                # historial y se omiten, y el resto se aplica.
+                db.rollback()
+                if intento == 1:
+                    raise
+            except Exception:
+                db.rollback()
+                raise
+        exitosas.extend(resultado[0])
+        fallidas.extend(resultado[1])
+        omitidas.extend(resultado[2])
+
+    return {"exitosas": exitosas, "fallidas": fallidas, "omitidas": omitidas}
+
+
+# --- Reportes de inventario ---
+def reporte_stock_bajo(db: Session, limite: int = 1000):
+    """
+    Productos con stock igual o menor a su mínimo, del más crítico al menos.
+    Se resuelve con el índice parcial `ix_productos_stock_bajo` y se lee por
+    tandas, devolviendo como máximo `limite` productos pero el total real.
+    """
+    consulta = (
+        select(
+            models.Producto.sku,
+            models.Producto.nombre,
+            models.Producto.stock,
+            models.Producto.min_stock,
+        )
+        .where(models.Producto.stock <= models.Producto.min_stock)
+        .order_by(models.Producto.stock, models.Producto.id)
+        .execution_options(yield_per=1000)
+    )
+    productos = []
+    total = 0
+    for fila in db.execute(consulta):
+        total += 1
+        if len(productos) < limite:
+            productos.append(
+                {
+                    "sku": fila.sku,
+                    "name": fila.nombre,
+                    "current_stock": fila.stock,
+                    "min_stock": fila.min_stock,
+                }
+            )
+    return {"low_stock_products": productos, "total_low_stock": total}
+
+
+def reporte_valor_inventario(db: Session):
+    """
+    Valor del inventario (precio * stock) por categoría en una sola consulta
+    agregada.
+    """
+    filas = db.execute(
+        select(
+            models.Categoria.nombre,
+            func.coalesce(
+                func.sum(models.Producto.precio * models.Producto.stock), 0
+            ).label("valor"),
+            func.count(models.Producto.id).label("productos"),
+        )
+        .select_from(models.Producto)
+        .outerjoin(
+            models.Categoria, models.Categoria.id == models.Producto.categoria_id
+        )
+        .group_by(models.Producto.categoria_id, models.Categoria.nombre)
+    ).all()
+    return {
+        "total_inventory_value": round(sum(f.valor for f in filas), 2),
+        "total_products": sum(f.productos for f in filas),
+        "categories": {(f.nombre or "Sin categoría"): round(f.valor, 2) for f in filas},
+    }
 
 
 # --- CRUD para Proveedores ---
@@ -58,11 +966,15 @@ def get_proveedor(db: Session, proveedor_id: int):
     )
 
 
-def get_proveedores(db: Session, skip: int = 0, limit: int = 100):
+def get_proveedores(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de proveedores.
     """
-    return db.query(models.Proveedor).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Proveedor), models.Proveedor.id, after_id, skip, limit
+    ).all()
 
 
 def create_proveedor(db: Session, proveedor: schemas.ProveedorCreate):
@@ -71,8 +983,7 @@ def create_proveedor(db: Session, proveedor: schemas.ProveedorCreate):
     """
     db_proveedor = models.Proveedor(**proveedor.dict())
     db.add(db_proveedor)
-    db.commit()
-    db.refresh(db_proveedor)
+    db.flush()
     return db_proveedor
 
 
@@ -93,11 +1004,15 @@ def get_categoria(db: Session, categoria_id: int):
     )
 
 
-def get_categorias(db: Session, skip: int = 0, limit: int = 100):
+def get_categorias(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de categorías.
     """
-    return db.query(models.Categoria).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Categoria), models.Categoria.id, after_id, skip, limit
+    ).all()
 
 
 def create_categoria(db: Session, categoria: schemas.CategoriaCreate):
@@ -106,8 +1021,7 @@ def create_categoria(db: Session, categoria: schemas.CategoriaCreate):
     """
     db_categoria = models.Categoria(**categoria.dict())
     db.add(db_categoria)
-    db.commit()
-    db.refresh(db_categoria)
+    db.flush()
     return db_categoria
 
 
@@ -123,9 +1037,7 @@ def get_productos_by_categoria(db: Session, categoria_id: int):
     Obtiene productos por categoría.
     """
     return (
-        db.query(models.Producto)
-        .filter(models.Producto.categoria_id == categoria_id)
-        .all()
+        _query_productos(db).filter(models.Producto.categoria_id == categoria_id).all()
     )
 
 
@@ -134,7 +1046,5 @@ def get_productos_by_proveedor(db: Session, proveedor_id: int):
     Obtiene productos por proveedor.
     """
     return (
-        db.query(models.Producto)
-        .filter(models.Producto.proveedor_id == proveedor_id)
-        .all()
+        _query_productos(db).filter(models.Producto.proveedor_id == proveedor_id).all()
     )
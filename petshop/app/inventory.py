@@ -0,0 +1,174 @@
+"""
+Ingesta de archivos de inventario (CSV/Excel) por streaming.
+
+Los archivos de proveedores pueden tener cientos de miles de filas, así que
+nunca se cargan completos en memoria: se leen fila a fila y se escriben en la
+base de datos en lotes de tamaño fijo.
+"""
+
+import csv
+import math
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import crud
+
+INVENTARIO_BATCH_SIZE = int(os.getenv("INVENTARIO_BATCH_SIZE", "1000"))
+
+# Máximo de errores de fila que se incluyen en el resultado de la tarea
+MAX_ERRORES_REPORTADOS = 100
+
+# Encabezados aceptados (en español o inglés) y el campo al que corresponden
+ALIAS_COLUMNAS = {
+    "sku": "sku",
+    "codigo": "sku",
+    "nombre": "nombre",
+    "name": "nombre",
+    "descripcion": "descripcion",
+    "description": "descripcion",
+    "precio": "precio",
+    "price": "precio",
+    "stock": "stock",
+    "cantidad": "stock",
+    "categoria": "categoria",
+    "category": "categoria",
+}
+
+
+class _LectorConProgreso:
+    """
+    Iterador de líneas que lleva la cuenta de los caracteres leídos para
+    estimar el avance sobre el tamaño total del archivo.
+    """
+
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self.leidos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        linea = next(self._archivo)
+        self.leidos += len(linea)
+        return linea
+
+
+def _leer_csv(file_path: str) -> Iterator[Tuple[Dict[str, Any], float]]:
+    """
+    Genera las filas de un CSV como diccionarios junto con la fracción del
+    archivo ya leída.
+    """
+    tamano = os.path.getsize(file_path) or 1
+    with open(file_path, newline="", encoding="utf-8-sig") as archivo:
+        lector = _LectorConProgreso(archivo)
+        for fila in csv.DictReader(lector):
+            yield fila, min(lector.leidos / tamano, 1.0)
+
+
+def _leer_excel(file_path: str) -> Iterator[Tuple[Dict[str, Any], float]]:
+    """
+    Genera las filas de la primera hoja de un Excel en modo sólo lectura,
+    que no materializa la hoja completa en memoria.
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        total = hoja.max_row or 0
+        filas = hoja.iter_rows(values_only=True)
+        encabezados = [str(c) if c is not None else "" for c in next(filas, ())]
+        for numero, valores in enumerate(filas, start=2):
+            if valores is None or all(v is None for v in valores):
+                continue
+            avance = min(numero / total, 1.0) if total else 0.0
+            yield dict(zip(encabezados, valores)), avance
+    finally:
+        libro.close()
+
+
+def _normalizar_fila(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Traduce los encabezados a los campos de Producto y convierte los tipos.
+    Lanza ValueError si la fila no es válida.
+    """
+    datos: Dict[str, Any] = {}
+    for columna, valor in fila.items():
+        campo = ALIAS_COLUMNAS.get(str(columna or "").strip().lower())
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+        datos[campo] = valor if valor != "" else None
+
+    if not datos.get("nombre"):
+        raise ValueError("nombre requerido")
+    try:
+        datos["precio"] = float(datos["precio"])
+        if not math.isfinite(datos["precio"]):
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("precio inválido")
+    try:
+        # "inf" y "nan" se leen como float pero no como cantidad.
+        datos["stock"] = int(float(datos.get("stock") or 0))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("stock inválido")
+    if datos["precio"] < 0 or datos["stock"] < 0:
+        raise ValueError("precio y stock no pueden ser negativos")
+    datos["nombre"] = str(datos["nombre"])
+    if datos.get("sku") is not None:
+        datos["sku"] = str(datos["sku"])
+    return datos
+
+
+def procesar_inventario(
+    db: Session,
+    file_path: str,
+    file_type: str,
+    batch_size: int = INVENTARIO_BATCH_SIZE,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Procesa un archivo de inventario completo escribiendo en lotes de
+    `batch_size` filas. Cada lote es una transacción independiente, por lo
+    que la memoria usada no depende del tamaño del archivo.
+    """
+    lector = _leer_excel if file_type == "excel" else _leer_csv
+    resumen = {"total": 0, "creados": 0, "actualizados": 0, "fallidos": 0}
+    errores: List[Dict[str, Any]] = []
+    lote: List[Dict[str, Any]] = []
+    categorias: Dict[str, int] = {}
+    avance = 0.0
+
+    def escribir_lote():
+        resultado = crud.upsert_inventario(db, lote, categorias)
+        resumen["creados"] += resultado["creados"]
+        resumen["actualizados"] += resultado["actualizados"]
+        lote.clear()
+        if on_progress:
+            on_progress(dict(resumen, avance=round(avance * 100, 1)))
+
+    # La fila 1 es el encabezado.
+    for numero, (fila, avance) in enumerate(lector(file_path), start=2):
+        resumen["total"] += 1
+        try:
+            lote.append(_normalizar_fila(fila))
+        except ValueError as e:
+            resumen["fallidos"] += 1
+            if len(errores) < MAX_ERRORES_REPORTADOS:
+                errores.append({"fila": numero, "error": str(e)})
+            continue
+        if len(lote) >= batch_size:
+            escribir_lote()
+
+    avance = 1.0
+    if lote:
+        escribir_lote()
+
+    resumen["exitosos"] = resumen["creados"] + resumen["actualizados"]
+    resumen["errores"] = errores
+    return resumen
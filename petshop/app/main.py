@@ -1,13 +1,25 @@
-from typing import List
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Response, UploadFile
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from common.database import SessionLocal, engine
+from common import auth, metrics, task_queue
+from common.database import DB_ASYNC, get_db, retry_on_conflict
+from common.pagination import decode_cursor, set_next_cursor
 
-from . import crud, models, schemas
+from . import crud, reports, schemas
 
-models.Base.metadata.create_all(bind=engine)
+# Directorio compartido con el worker de Celery para los archivos subidos
+INVENTARIO_UPLOAD_DIR = os.getenv("INVENTARIO_UPLOAD_DIR", "/tmp/inventario")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Límite de productos por petición de carga masiva
+BULK_MAX_PRODUCTOS = int(os.getenv("BULK_MAX_PRODUCTOS", "10000"))
 
 app = FastAPI(
     title="Servicio de Tienda (Pet Shop)",
@@ -16,36 +28,92 @@ app = FastAPI(
         "proveedores y punto de venta."
     ),
     version="0.1.0",
+    dependencies=auth.service_dependencies(),
 )
+app.include_router(metrics.router)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
+if DB_ASYNC:
+    from . import async_routes
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Registradas primero, tienen precedencia sobre sus versiones síncronas.
+    app.include_router(async_routes.router)
 
 
 @app.get("/productos/", response_model=List[schemas.Producto])
-def read_productos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_productos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene una lista de productos con su stock actual.
     """
-    productos = crud.get_productos(db, skip=skip, limit=limit)
+    productos = crud.get_productos(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, productos, limit)
     return productos
 
 
 @app.post("/productos/", response_model=schemas.Producto)
-def create_producto(producto: schemas.ProductoCreate, db: Session = Depends(get_db)):
+def create_producto(
+    producto: schemas.ProductoCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo producto en el inventario.
     """
+    if producto.sku and crud.get_producto_by_sku(db, sku=producto.sku):
+        raise HTTPException(status_code=400, detail="SKU already exists")
     return crud.create_producto(db=db, producto=producto)
 
 
+@app.post("/productos/bulk", response_model=schemas.ProductoBulkRespuesta)
+def bulk_upsert_productos(
+    productos: List[schemas.ProductoUpsert],
+    db: Session = Depends(get_db, scope="function"),
+):
+    """
+    Crea o actualiza productos en bloque usando el SKU como clave.
+    Pensado para sincronizar catálogos de proveedores de miles de productos
+    en una sola petición. Sólo se actualizan los campos enviados.
+    """
+    if len(productos) > BULK_MAX_PRODUCTOS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {BULK_MAX_PRODUCTOS} productos por petición",
+        )
+    try:
+        resultados = crud.bulk_upsert_productos(
+            db, [p.dict(exclude_unset=True) for p in productos]
+        )
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=str(e.orig))
+    return {
+        "total": len(resultados),
+        "creados": sum(1 for r in resultados if r["resultado"] == "creado"),
+        "actualizados": sum(1 for r in resultados if r["resultado"] == "actualizado"),
+        "resultados": resultados,
+    }
+
+
+@app.get("/productos/search", response_model=List[schemas.Producto])
+def search_productos(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db, scope="function"),
+):
+    """
+    Búsqueda de productos por nombre para el autocompletado del TPV.
+    Acepta palabras incompletas: "alim perr" encuentra "Alimento para Perros".
+    """
+    return crud.buscar_productos(db, q=q, limit=limit)
+
+
 @app.get("/productos/{producto_id}", response_model=schemas.Producto)
-def read_producto(producto_id: int, db: Session = Depends(get_db)):
+def read_producto(producto_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Obtiene un producto específico por ID.
     """
@@ -56,7 +124,9 @@ def read_producto(producto_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/proveedores/", response_model=schemas.Proveedor)
-def create_proveedor(proveedor: schemas.ProveedorCreate, db: Session = Depends(get_db)):
+def create_proveedor(
+    proveedor: schemas.ProveedorCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea un nuevo proveedor.
     """
@@ -67,15 +137,39 @@ def create_proveedor(proveedor: schemas.ProveedorCreate, db: Session = Depends(g
 
 
 @app.get("/proveedores/", response_model=List[schemas.Proveedor])
-def read_proveedores(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_proveedores(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene lista de proveedores.
     """
-    return crud.get_proveedores(db, skip=skip, limit=limit)
+    proveedores = crud.get_proveedores(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, proveedores, limit)
+    return proveedores
+
+
+@app.get(
+    "/proveedores/{proveedor_id}/productos/", response_model=List[schemas.Producto]
+)
+def read_productos_by_proveedor(
+    proveedor_id: int, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Obtiene productos por proveedor.
+    """
+    return crud.get_productos_by_proveedor(db, proveedor_id=proveedor_id)
 
 
 @app.post("/categorias/", response_model=schemas.Categoria)
-def create_categoria(categoria: schemas.CategoriaCreate, db: Session = Depends(get_db)):
+def create_categoria(
+    categoria: schemas.CategoriaCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea una nueva categoría.
     """
@@ -86,37 +180,72 @@ def create_categoria(categoria: schemas.CategoriaCreate, db: Session = Depends(g
 
 
 @app.get("/categorias/", response_model=List[schemas.Categoria])
-def read_categorias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_categorias(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene lista de categorías.
     """
-    return crud.get_categorias(db, skip=skip, limit=limit)
+    categorias = crud.get_categorias(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, categorias, limit)
+    return categorias
 
 
 @app.get("/categorias/{categoria_id}/productos/", response_model=List[schemas.Producto])
-def read_productos_by_categoria(categoria_id: int, db: Session = Depends(get_db)):
+def read_productos_by_categoria(
+    categoria_id: int, db: Session = Depends(get_db, scope="function")
+):
     """
     Obtiene productos por categoría.
     """
     return crud.get_productos_by_categoria(db, categoria_id=categoria_id)
 
 
+async def _guardar_archivo(file: UploadFile) -> str:
+    """
+    Copia el archivo subido al directorio de inventario en bloques de tamaño
+    fijo, sin cargarlo completo en memoria.
+    """
+    os.makedirs(INVENTARIO_UPLOAD_DIR, exist_ok=True)
+    nombre = f"{uuid.uuid4().hex}_{os.path.basename(file.filename or 'inventario')}"
+    file_path = os.path.join(INVENTARIO_UPLOAD_DIR, nombre)
+    with open(file_path, "wb") as destino:
+        while True:
+            bloque = await file.read(UPLOAD_CHUNK_SIZE)
+            if not bloque:
+                break
+            await run_in_threadpool(destino.write, bloque)
+    return file_path
+
+
 @app.post("/upload-inventario/")
 async def upload_inventario(file: UploadFile = File(...)):
     """
     Endpoint para cargar y procesar un archivo (ej. Excel) para actualizar
     el inventario. Usa Celery + Redis para procesamiento asíncrono.
     """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension == ".xls":
+        # openpyxl sólo lee .xlsx: la tarea fallaría en el worker.
+        raise HTTPException(
+            status_code=400,
+            detail="Legacy .xls files are not supported; upload .xlsx or .csv",
+        )
+    file_path = None
     try:
-        # Importar la tarea de Celery
-        from .tasks import process_inventory_file
-
-        # Simular guardado del archivo
-        file_path = f"/tmp/{file.filename}"
-        file_type = "excel" if file.filename.endswith((".xlsx", ".xls")) else "csv"
+        file_type = "excel" if extension == ".xlsx" else "csv"
+        file_path = await _guardar_archivo(file)
 
         # Encolar la tarea de procesamiento
-        task = process_inventory_file.delay(file_path, file_type)
+        task = task_queue.send_task(
+            "petshop.app.tasks.process_inventory_file", file_path, file_type
+        )
 
         return {
             "filename": file.filename,
@@ -125,6 +254,12 @@ async def upload_inventario(file: UploadFile = File(...)):
             "file_type": file_type,
         }
     except Exception as e:
+        if file_path is not None:
+            # Sin tarea encolada nadie lo procesará ni lo borrará.
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
         return {
             "filename": file.filename,
             "status": "Error al procesar archivo",
@@ -138,11 +273,11 @@ async def get_inventory_task_status(task_id: str):
     Obtiene el estado de una tarea de procesamiento de inventario.
     """
     try:
-        from common.celery_app import celery_app
-
         # Obtener el resultado de la tarea
-        result = celery_app.AsyncResult(task_id)
+        result = task_queue.task_result(task_id)
 
+        if result.state == "PROGRESS":
+            return {"task_id": task_id, "status": "processing", "progress": result.info}
         if result.ready():
             if result.successful():
                 return {
@@ -170,10 +305,10 @@ async def generate_inventory_report_endpoint(
     Genera reportes de inventario de forma asíncrona.
     """
     try:
-        from .tasks import generate_inventory_report
-
         # Encolar la tarea de generación de reporte
-        task = generate_inventory_report.delay(store_id, report_type)
+        task = task_queue.send_task(
+            "petshop.app.tasks.generate_inventory_report", store_id, report_type
+        )
 
         return {
             "message": "Generación de reporte iniciada",
@@ -190,22 +325,64 @@ async def generate_inventory_report_endpoint(
         }
 
 
+@app.get("/reportes/inventario/")
+def read_reporte_inventario(
+    store_id: int = 1,
+    report_type: str = "stock_low",
+    dias: int = 30,
+    db: Session = Depends(get_db, scope="function"),
+):
+    """
+    Devuelve un reporte de inventario en el momento. Se sirve desde la caché
+    mientras los datos no cambien, por lo que es apto para sondeos frecuentes.
+    """
+    datos = reports.generar_reporte(db, store_id, report_type, dias)
+    if datos is None:
+        raise HTTPException(status_code=404, detail="Report type not found")
+    return {"store_id": store_id, "report_type": report_type, "data": datos}
+
+
+@app.get("/reportes/ventas/")
+def read_resumen_ventas(
+    dias: int = 30, top: int = 5, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Resumen de ventas de los últimos `dias` días (total, unidades, productos
+    más vendidos y ventas por categoría), calculado sobre los resúmenes diarios.
+    """
+    hasta = datetime.utcnow().date()
+    desde = hasta - timedelta(days=max(dias, 1) - 1)
+    return crud.get_resumen_ventas(db, desde=desde, hasta=hasta, top=top)
+
+
 @app.post("/pos/venta/")
-def registrar_venta(venta: schemas.Venta, db: Session = Depends(get_db)):
+def registrar_venta(
+    venta: schemas.Venta, db: Session = Depends(get_db, scope="function")
+):
     """
     Endpoint de Punto de Venta (TPV).
-    Recibe una lista de productos y cantidades, y actualiza el stock.
+    Recibe una lista de productos y cantidades, y actualiza el stock de todos
+    los ítems en una única transacción: o se descuenta todo o nada.
+    Si se indica `carrito_id`, se confirman las reservas de ese carrito.
     """
     try:
-        # Procesar cada item de la venta
-        for item in venta.items:
-            crud.update_stock_producto(
-                db, producto_id=item.producto_id, cantidad_vendida=item.cantidad
-            )
-
-        db.commit()
-        return {"status": "Venta registrada y stock actualizado exitosamente."}
+        db_venta = retry_on_conflict(
+            crud.registrar_venta,
+            db,
+            venta.items,
+            carrito_id=venta.carrito_id,
+            cliente_id=venta.cliente_id,
+        )
+        return {
+            "status": "Venta registrada y stock actualizado exitosamente.",
+            "venta_id": db_venta.id,
+            "total": db_venta.total,
+        }
 
+    except crud.StockInsuficienteError as e:
+        raise HTTPException(
+            status_code=400, detail={"message": str(e), "items": e.faltantes}
+        )
     except ValueError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -216,6 +393,49 @@ def registrar_venta(venta: schemas.Venta, db: Session = Depends(get_db)):
         )
 
 
+@app.post("/pos/reservas/", response_model=List[schemas.Reserva])
+def reservar_stock(
+    reserva: schemas.ReservaCreate, db: Session = Depends(get_db, scope="function")
+):
+    """
+    Retiene stock para un carrito mientras el cliente termina la compra.
+    Las reservas vencen solas y el stock vuelve al inventario.
+    """
+    ttl = (
+        crud.RESERVA_TTL_SEGUNDOS
+        if reserva.ttl_segundos is None
+        else reserva.ttl_segundos
+    )
+    try:
+        return retry_on_conflict(
+            crud.reservar_stock,
+            db,
+            reserva.carrito_id,
+            reserva.items,
+            ttl_segundos=ttl,
+        )
+    except crud.StockInsuficienteError as e:
+        raise HTTPException(
+            status_code=409, detail={"message": str(e), "items": e.faltantes}
+        )
+    except crud.ProductoNoEncontradoError as e:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Product not found", "producto_ids": e.producto_ids},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/pos/reservas/{carrito_id}")
+def liberar_reserva(carrito_id: str, db: Session = Depends(get_db, scope="function")):
+    """
+    Libera las reservas de un carrito (compra cancelada o abandonada).
+    """
+    liberadas = retry_on_conflict(crud.liberar_reserva, db, carrito_id)
+    return {"carrito_id": carrito_id, "unidades_liberadas": liberadas}
+
+
 @app.get("/")
 def read_root():
     return {"service": "Petshop Service"}
@@ -1,7 +1,19 @@
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.orm import declarative_base, relationship
 
-from common.database import Base
+# Base propia del servicio: su MetaData contiene sólo las tablas del esquema
+# `petshop`, que el search_path de DATABASE_URL selecciona.
+Base = declarative_base()
 
 
 class Categoria(Base):
@@ -14,10 +26,14 @@ class Producto(Base):
     __tablename__ = "productos"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Código del proveedor/catálogo; clave de las sincronizaciones masivas.
+    sku = Column(String, unique=True, index=True)
     nombre = Column(String, index=True, nullable=False)
     descripcion = Column(String)
     precio = Column(Float, nullable=False)
     stock = Column(Integer, default=0)
+    # Umbral por producto para el reporte de stock bajo
+    min_stock = Column(Integer, nullable=False, default=5, server_default="5")
 
     categoria_id = Column(Integer, ForeignKey("categorias.id"))
     categoria = relationship("Categoria")
@@ -25,6 +41,31 @@ class Producto(Base):
     proveedor_id = Column(Integer, ForeignKey("proveedores.id"))
     proveedor = relationship("Proveedor")
 
+    __table_args__ = (
+        # Índice parcial: sólo contiene los productos con stock bajo, que
+        # suelen ser pocos, así el reporte no recorre todo el catálogo.
+        Index(
+            "ix_productos_stock_bajo",
+            "stock",
+            postgresql_where=text("stock <= min_stock"),
+            sqlite_where=text("stock <= min_stock"),
+        ),
+        # Búsqueda de productos (sólo PostgreSQL): trigramas para prefijos y
+        # errores de tipeo, tsvector en español para palabras con plural o
+        # flexiones ("Alimento para Perros" coincide con "perro").
+        Index(
+            "ix_productos_nombre_trgm",
+            "nombre",
+            postgresql_using="gin",
+            postgresql_ops={"nombre": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_productos_nombre_fts",
+            text("to_tsvector('spanish', nombre)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class Proveedor(Base):
     __tablename__ = "proveedores"
@@ -34,3 +75,89 @@ class Proveedor(Base):
     contacto = Column(String)
     telefono = Column(String)
     email = Column(String)
+
+
+class ReservaStock(Base):
+    __tablename__ = "reservas_stock"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Identificador del carrito (o caja) que retiene las unidades.
+    carrito_id = Column(String, index=True, nullable=False)
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False)
+    cantidad = Column(Integer, nullable=False)
+    # Vencida la reserva, las unidades vuelven al stock.
+    expira_en = Column(DateTime, index=True, nullable=False)
+
+
+# --- Libro de ventas ---
+class Venta(Base):
+    __tablename__ = "ventas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(DateTime, index=True, nullable=False)
+    # El cliente_id se refiere a un usuario del servicio de autenticación.
+    cliente_id = Column(Integer, index=True)
+    total = Column(Float, nullable=False)
+
+    lineas = relationship("VentaLinea", back_populates="venta")
+
+
+class VentaLinea(Base):
+    __tablename__ = "venta_lineas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    venta_id = Column(Integer, ForeignKey("ventas.id"), index=True, nullable=False)
+    producto_id = Column(
+        Integer, ForeignKey("productos.id"), index=True, nullable=False
+    )
+    # Categoría del producto al momento de la venta (0 = sin categoría).
+    categoria_id = Column(Integer, nullable=False)
+    cantidad = Column(Integer, nullable=False)
+    precio_unitario = Column(Float, nullable=False)
+    subtotal = Column(Float, nullable=False)
+
+    venta = relationship("Venta", back_populates="lineas")
+
+
+# Resúmenes precalculados que se actualizan en la misma transacción que la
+# venta, para que los reportes lean una fila por día y no cada línea vendida.
+class VentaResumenDiario(Base):
+    __tablename__ = "ventas_resumen_diario"
+
+    fecha = Column(Date, primary_key=True)
+    cantidad_ventas = Column(Integer, nullable=False)
+    unidades = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+
+
+class VentaResumenProducto(Base):
+    __tablename__ = "ventas_resumen_producto"
+
+    fecha = Column(Date, primary_key=True)
+    producto_id = Column(Integer, primary_key=True)
+    unidades = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+
+
+class VentaResumenCategoria(Base):
+    __tablename__ = "ventas_resumen_categoria"
+
+    fecha = Column(Date, primary_key=True)
+    # 0 agrupa los productos sin categoría.
+    categoria_id = Column(Integer, primary_key=True)
+    unidades = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+
+
+class PrecioHistorial(Base):
+    __tablename__ = "precios_historial"
+
+    id = Column(Integer, primary_key=True, index=True)
+    producto_id = Column(
+        Integer, ForeignKey("productos.id"), index=True, nullable=False
+    )
+    precio_anterior = Column(Float, nullable=False)
+    precio_nuevo = Column(Float, nullable=False)
+    # Evita aplicar dos veces la misma actualización (ej. reintentos de Celery).
+    clave_idempotencia = Column(String, unique=True, index=True, nullable=False)
+    fecha = Column(DateTime, nullable=False)
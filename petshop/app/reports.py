@@ -0,0 +1,70 @@
+"""
+Motor de reportes de inventario.
+
+Cada reporte es una única consulta agregada. El resultado se guarda en Redis
+con la versión de datos del servicio en la clave: mientras nadie escriba
+productos o ventas, los sondeos del dashboard no vuelven a ejecutar la consulta.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from common import cache
+
+from . import crud, models
+
+CACHE_NAMESPACE = "petshop"
+REPORTE_CACHE_TTL = int(os.getenv("REPORTE_CACHE_TTL", "300"))
+REPORTE_MAX_FILAS = int(os.getenv("REPORTE_MAX_FILAS", "1000"))
+
+REPORTES_DISPONIBLES = ("stock_low", "sales_summary", "inventory_value")
+
+cache.track_data_version(
+    CACHE_NAMESPACE,
+    [
+        models.Producto.__table__,
+        models.Categoria.__table__,
+        models.VentaResumenDiario.__table__,
+        models.VentaResumenProducto.__table__,
+        models.VentaResumenCategoria.__table__,
+    ],
+)
+
+
+def _calcular(db: Session, report_type: str, dias: int) -> Dict[str, Any]:
+    if report_type == "stock_low":
+        return crud.reporte_stock_bajo(db, limite=REPORTE_MAX_FILAS)
+    if report_type == "inventory_value":
+        return crud.reporte_valor_inventario(db)
+    hasta = datetime.utcnow().date()
+    desde = hasta - timedelta(days=max(dias, 1) - 1)
+    return crud.get_resumen_ventas(db, desde=desde, hasta=hasta)
+
+
+def generar_reporte(
+    db: Session, store_id: int, report_type: str, dias: int = 30
+) -> Optional[Dict[str, Any]]:
+    """
+    Devuelve los datos del reporte pedido, desde la caché si los datos no
+    cambiaron desde el último cálculo. None si el tipo de reporte no existe.
+    """
+    if report_type not in REPORTES_DISPONIBLES:
+        return None
+
+    version = cache.get_data_version(CACHE_NAMESPACE)
+    if version is None:
+        return _calcular(db, report_type, dias)
+
+    # El resumen de ventas depende también del día actual.
+    hoy = datetime.utcnow().date().isoformat()
+    clave = (
+        f"{CACHE_NAMESPACE}:reporte:{store_id}:{report_type}:{dias}:{hoy}:v{version}"
+    )
+    datos = cache.get_json(clave)
+    if datos is None:
+        datos = _calcular(db, report_type, dias)
+        cache.set_json(clave, datos, REPORTE_CACHE_TTL)
+    return datos
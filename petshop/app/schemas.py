@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # --- Esquemas para Categoria ---
@@ -40,10 +41,12 @@ class Proveedor(ProveedorBase):
 
 # --- Esquemas para Producto ---
 class ProductoBase(BaseModel):
+    sku: Optional[str] = None
     nombre: str
     descripcion: Optional[str] = None
     precio: float
     stock: int = 0
+    min_stock: int = 5
     proveedor_id: Optional[int] = None
     categoria_id: Optional[int] = None
 
@@ -61,6 +64,25 @@ class Producto(ProductoBase):
         orm_mode = True
 
 
+# --- Esquemas para la carga masiva de productos ---
+class ProductoUpsert(ProductoBase):
+    sku: str
+
+
+class ProductoBulkResultado(BaseModel):
+    fila: int
+    sku: str
+    id: int
+    resultado: str  # "creado", "actualizado" o "duplicado"
+
+
+class ProductoBulkRespuesta(BaseModel):
+    total: int
+    creados: int
+    actualizados: int
+    resultados: List[ProductoBulkResultado]
+
+
 # --- Esquemas para Punto de Venta (TPV) ---
 class VentaItem(BaseModel):
     producto_id: int
@@ -69,4 +91,24 @@ class VentaItem(BaseModel):
 
 class Venta(BaseModel):
     items: List[VentaItem]
-    # Aquí se podrían añadir otros detalles de la venta como cliente_id, total, etc.
+    # Carrito cuyas reservas de stock se confirman con esta venta
+    carrito_id: Optional[str] = None
+    # Usuario del servicio de autenticación que realiza la compra
+    cliente_id: Optional[int] = None
+
+
+# --- Esquemas para Reservas de stock ---
+class ReservaCreate(BaseModel):
+    carrito_id: str
+    items: List[VentaItem]
+    ttl_segundos: Optional[int] = Field(None, gt=0)
+
+
+class Reserva(BaseModel):
+    carrito_id: str
+    producto_id: int
+    cantidad: int
+    expira_en: datetime
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,221 @@
+"""
+Búsqueda de productos por nombre para el autocompletado del TPV.
+
+En PostgreSQL la búsqueda la resuelven los índices GIN de `productos`
+(tsvector en español y trigramas). En otros motores (SQLite en los tests y en
+desarrollo) se usa un índice invertido en memoria: la lista ordenada de
+palabras normalizadas permite buscar prefijos con bisección, sin recorrer el
+catálogo en cada tecla.
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, inspect, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+BUSQUEDA_LIMITE = 20
+
+_PALABRA = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=100_000)
+def normalizar(palabra: str) -> str:
+    """
+    Minúsculas, sin acentos y sin la "s" final del plural, de modo que
+    "Alimentos", "alimento" y "ALIMÉNTOS" sean la misma palabra.
+    """
+    palabra = unicodedata.normalize("NFKD", palabra.lower())
+    palabra = "".join(c for c in palabra if not unicodedata.combining(c))
+    if len(palabra) > 3 and palabra.endswith("s"):
+        palabra = palabra[:-1]
+    return palabra
+
+
+def palabras(texto: str) -> List[str]:
+    """
+    Palabras normalizadas de un texto.
+    """
+    return [normalizar(p) for p in _PALABRA.findall(texto or "")]
+
+
+class _Contenido:
+    """
+    Un estado del índice. No cambia una vez construido (salvo la caché de
+    conjuntos, que sólo agrega entradas), así que una búsqueda puede usarlo
+    entero mientras otra reconstruye el índice.
+    """
+
+    __slots__ = ("palabras", "productos", "conjuntos")
+
+    def __init__(self, productos: Dict[str, array]):
+        self.palabras: List[str] = sorted(productos)
+        # Ids (en orden creciente) de los productos que contienen cada palabra
+        self.productos = productos
+        # Conjuntos de ids por palabra, creados en la primera búsqueda que los
+        # necesita para filtrar
+        self.conjuntos: Dict[str, frozenset] = {}
+
+    def con_prefijo(self, prefijo: str) -> List[str]:
+        """
+        Palabras del índice que empiezan con `prefijo`.
+        """
+        desde = bisect_left(self.palabras, prefijo)
+        hasta = bisect_left(self.palabras, prefijo + "\uffff", lo=desde)
+        return self.palabras[desde:hasta]
+
+    def conjunto(self, palabras_termino: List[str]):
+        if len(palabras_termino) == 1:
+            palabra = palabras_termino[0]
+            conjunto = self.conjuntos.get(palabra)
+            if conjunto is None:
+                conjunto = self.conjuntos[palabra] = frozenset(self.productos[palabra])
+            return conjunto
+        return set().union(*(self.productos[p] for p in palabras_termino))
+
+
+class IndiceProductos:
+    """
+    Índice invertido de nombres de productos, reconstruido cuando cambia el
+    catálogo (alta, baja o cambio de nombre de un producto).
+    """
+
+    def __init__(self):
+        self._contenido = _Contenido({})
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _construir(self, db: Session) -> _Contenido:
+        productos: Dict[str, array] = {}
+        filas = db.execute(
+            select(models.Producto.id, models.Producto.nombre)
+            .order_by(models.Producto.id)
+            .execution_options(yield_per=10000)
+        )
+        for producto_id, nombre in filas:
+            for palabra in set(palabras(nombre)):
+                productos.setdefault(palabra, array("l")).append(producto_id)
+        return _Contenido(productos)
+
+    def buscar(self, db: Session, q: str, limit: int) -> List[int]:
+        """
+        Ids de los productos cuyo nombre contiene todas las palabras de `q`
+        (la última puede estar incompleta), en orden de id.
+        """
+        with self._lock:
+            if self._version != _version_catalogo:
+                version = _version_catalogo
+                self._contenido = self._construir(db)
+                self._version = version
+            contenido = self._contenido
+
+        terminos = [contenido.con_prefijo(t) for t in set(palabras(q))]
+        if not terminos or not all(terminos):
+            return []
+        # Se recorren en orden los ids del término más selectivo y se filtran
+        # con los demás, deteniéndose al completar `limit` resultados.
+        terminos.sort(key=lambda t: sum(len(contenido.productos[p]) for p in t))
+        candidatos = heapq.merge(*(contenido.productos[p] for p in terminos[0]))
+        filtros = [contenido.conjunto(t) for t in terminos[1:]]
+        ids: List[int] = []
+        for producto_id in candidatos:
+            if ids and ids[-1] == producto_id:
+                continue
+            if all(producto_id in f for f in filtros):
+                ids.append(producto_id)
+                if len(ids) == limit:
+                    break
+        return ids
+
+
+indice = IndiceProductos()
+
+# Versión local del catálogo: cambia al confirmar altas, bajas o cambios de
+# nombre de productos, no con los movimientos de stock o precio.
+_version_catalogo = 0
+_CAMBIO_CATALOGO = "catalogo_productos_modificado"
+
+
+def _toca_nombres(sentencia) -> bool:
+    valores = getattr(sentencia, "_values", None)
+    if not valores:
+        return True
+    return any(getattr(c, "key", c) == "nombre" for c in valores)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_escritura_masiva(state):
+    if not any(m.class_ is models.Producto for m in state.all_mappers):
+        return
+    if (
+        state.is_insert
+        or state.is_delete
+        or (state.is_update and _toca_nombres(state.statement))
+    ):
+        state.session.info[_CAMBIO_CATALOGO] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_flush(session, flush_context):
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, models.Producto):
+            session.info[_CAMBIO_CATALOGO] = True
+            return
+    for obj in session.dirty:
+        if (
+            isinstance(obj, models.Producto)
+            and inspect(obj).attrs.nombre.history.has_changes()
+        ):
+            session.info[_CAMBIO_CATALOGO] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _nueva_version(session):
+    global _version_catalogo
+    if session.info.pop(_CAMBIO_CATALOGO, False):
+        _version_catalogo += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CAMBIO_CATALOGO, None)
+
+
+def _consulta_postgresql(q: str, limit: int):
+    """
+    Coincidencia por palabras (tsvector en español, con prefijo en cada
+    término) o por similitud de trigramas, ordenada por relevancia.
+    """
+    condiciones = [models.Producto.nombre.op("%")(q)]
+    terminos = _PALABRA.findall(q)
+    if terminos:
+        # La expresión debe coincidir con la de `ix_productos_nombre_fts`
+        # para que el planificador use el índice.
+        espanol = literal_column("'spanish'")
+        vector = func.to_tsvector(espanol, models.Producto.nombre)
+        consulta_ts = func.to_tsquery(espanol, " & ".join(f"{t}:*" for t in terminos))
+        condiciones.append(vector.op("@@")(consulta_ts))
+    return (
+        select(models.Producto.id)
+        .where(or_(*condiciones))
+        .order_by(func.similarity(models.Producto.nombre, q).desc())
+        .limit(limit)
+    )
+
+
+def buscar_ids(db: Session, q: str, limit: int = BUSQUEDA_LIMITE) -> List[int]:
+    """
+    Ids de los productos que coinciden con `q`, los más relevantes primero.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return list(db.scalars(_consulta_postgresql(q, limit)))
+    return indice.buscar(db, q, limit)
@@ -3,40 +3,71 @@ Tareas asíncronas para el servicio de petshop.
 Incluye procesamiento de archivos Excel para actualización de inventario.
 """
 
+import os
+import time
 import uuid
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from common.celery_app import celery_app
+from common.database import SessionLocal
+
+from . import crud, reports
+from .inventory import INVENTARIO_BATCH_SIZE, procesar_inventario
 
 
 @celery_app.task(bind=True)
-def process_inventory_file(self, file_path: str, file_type: str) -> Dict[str, Any]:
+def process_inventory_file(
+    self, file_path: str, file_type: str, batch_size: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Procesa un archivo de inventario (Excel/CSV) para actualizar productos.
 
+    El archivo se lee por streaming y se escribe en lotes, informando el
+    avance con el estado PROGRESS de Celery.
+
     Args:
         file_path: Ruta al archivo del inventario
         file_type: Tipo de archivo (excel, csv)
+        batch_size: Filas por lote (por defecto INVENTARIO_BATCH_SIZE)
 
     Returns:
         Diccionario con el resultado del procesamiento
     """
     try:
         task_id = self.request.id
-
-        # Simular procesamiento del archivo
-        processed_data = _mock_excel_processing(file_path, file_type)
+        inicio = time.perf_counter()
+
+        def informar_avance(avance: Dict[str, Any]):
+            self.update_state(state="PROGRESS", meta=avance)
+
+        db = SessionLocal()
+        try:
+            processed = procesar_inventario(
+                db,
+                file_path,
+                file_type,
+                batch_size=batch_size or INVENTARIO_BATCH_SIZE,
+                on_progress=informar_avance,
+            )
+        finally:
+            db.close()
+
+        # El archivo sólo se borra si se procesó: los reintentos lo necesitan.
+        os.remove(file_path)
 
         result = {
             "task_id": task_id,
             "file_path": file_path,
             "file_type": file_type,
-            "processed_products": processed_data["products"],
-            "total_processed": processed_data["total"],
-            "successful_updates": processed_data["successful"],
-            "failed_updates": processed_data["failed"],
+            "total_processed": processed["total"],
+            "successful_updates": processed["exitosos"],
+            "failed_updates": processed["fallidos"],
+            "created_products": processed["creados"],
+            "updated_products": processed["actualizados"],
+            "errors": processed["errores"],
             "status": "completed",
-            "processing_time": 5.2,  # Simulado
+            "processing_time": round(time.perf_counter() - inicio, 2),
         }
 
         return result
@@ -46,154 +77,109 @@ def process_inventory_file(self, file_path: str, file_type: str) -> Dict[str, An
         self.retry(countdown=60, max_retries=3, exc=exc)
 
 
-def _mock_excel_processing(file_path: str, file_type: str) -> Dict[str, Any]:
-    """
-    Simulación de procesamiento de archivo Excel/CSV.
-    En una implementación real, aquí se usaría pandas para leer el archivo.
-    """
-    # Simulación de datos procesados
-    mock_products = [
-        {
-            "sku": "PET001",
-            "name": "Alimento para Perros Premium",
-            "stock": 50,
-            "price": 29.99,
-            "category": "Alimentos",
-        },
-        {
-            "sku": "PET002",
-            "name": "Juguete Pelota",
-            "stock": 25,
-            "price": 8.50,
-            "category": "Juguetes",
-        },
-        {
-            "sku": "PET003",
-            "name": "Collar Ajustable",
-            "stock": 15,
-            "price": 12.00,
-            "category": "Accesorios",
-        },
-    ]
-
-    return {
-        "products": mock_products,
-        "total": len(mock_products),
-        "successful": len(mock_products),
-        "failed": 0,
-    }
-
-
-@celery_app.task
-def update_product_prices(price_updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+@celery_app.task(bind=True)
+def update_product_prices(
+    self, price_updates: List[Dict[str, Any]], chunk_size: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Actualiza precios de productos en lote.
 
+    Los cambios se aplican en transacciones de `chunk_size` productos con un
+    UPDATE masivo por transacción y quedan registrados en el historial de
+    precios. Las claves de idempotencia derivan del ID de la tarea, así que
+    un reintento no aplica dos veces los lotes ya confirmados.
+
     Args:
         price_updates: Lista de actualizaciones de precios
+            ({"sku", "new_price", "idempotency_key" opcional})
+        chunk_size: Cambios por transacción (por defecto PRECIOS_LOTE)
 
     Returns:
         Diccionario con el resultado de las actualizaciones
     """
+    db = SessionLocal()
     try:
-        successful_updates = []
-        failed_updates = []
-
-        for update in price_updates:
-            try:
-                # Simulación de actualización de precio
-                successful_updates.append(
-                    {
-                        "sku": update["sku"],
-                        "old_price": update.get("old_price", 0),
-                        "new_price": update["new_price"],
-                        "updated_at": "2024-01-15T10:30:00Z",
-                    }
-                )
-            except Exception as e:
-                failed_updates.append(
-                    {"sku": update.get("sku", "unknown"), "error": str(e)}
-                )
+        resultado = crud.aplicar_actualizaciones_precio(
+            db,
+            price_updates,
+            clave_base=self.request.id or str(uuid.uuid4()),
+            tamano_lote=chunk_size or crud.PRECIOS_LOTE,
+        )
+    except Exception as exc:
+        # Reintentar es seguro: los lotes ya aplicados se omiten.
+        self.retry(countdown=30, max_retries=3, exc=exc)
+    finally:
+        db.close()
 
-        return {
-            "total_updates": len(price_updates),
-            "successful": len(successful_updates),
-            "failed": len(failed_updates),
-            "successful_updates": successful_updates,
-            "failed_updates": failed_updates,
-            "status": "completed",
-        }
+    return {
+        "total_updates": len(price_updates),
+        "successful": len(resultado["exitosas"]),
+        "failed": len(resultado["fallidas"]),
+        "skipped": len(resultado["omitidas"]),
+        "successful_updates": [
+            {
+                "sku": c["sku"],
+                "old_price": c["precio_anterior"],
+                "new_price": c["precio"],
+                "updated_at": c["fecha"].isoformat() + "Z",
+            }
+            for c in resultado["exitosas"]
+        ],
+        "failed_updates": [
+            {"sku": c["sku"], "error": c["error"]} for c in resultado["fallidas"]
+        ],
+        "status": "completed",
+    }
 
+
+@celery_app.task
+def liberar_reservas_expiradas() -> Dict[str, Any]:
+    """
+    Devuelve al stock las unidades de las reservas de carrito vencidas.
+    Se ejecuta periódicamente desde Celery beat.
+    """
+    db = SessionLocal()
+    try:
+        liberadas = crud.liberar_reservas_expiradas(db)
+        return {"unidades_liberadas": liberadas, "status": "completed"}
     except Exception as exc:
+        db.rollback()
         return {"error": str(exc), "status": "failed"}
+    finally:
+        db.close()
 
 
 @celery_app.task
-def generate_inventory_report(store_id: int, report_type: str) -> Dict[str, Any]:
+def generate_inventory_report(
+    store_id: int, report_type: str, dias: int = 30
+) -> Dict[str, Any]:
     """
     Genera reportes de inventario.
 
     Args:
         store_id: ID de la tienda
         report_type: Tipo de reporte (stock_low, sales_summary, inventory_value)
+        dias: Período en días para el resumen de ventas
 
     Returns:
         Diccionario con el reporte generado
     """
+    db = SessionLocal()
     try:
-        report_data = _generate_mock_report(store_id, report_type)
+        report_data = reports.generar_reporte(db, store_id, report_type, dias)
+        if report_data is None:
+            report_data = {"message": "Reporte no disponible"}
 
         return {
             "store_id": store_id,
             "report_type": report_type,
             "report_id": str(uuid.uuid4()),
-            "generated_at": "2024-01-15T10:30:00Z",
+            "generated_at": datetime.utcnow().isoformat() + "Z",
             "data": report_data,
             "status": "completed",
         }
 
     except Exception as exc:
         return {"error": str(exc), "status": "failed"}
-
-
-def _generate_mock_report(store_id: int, report_type: str) -> Dict[str, Any]:
-    """Genera datos simulados para reportes."""
-    if report_type == "stock_low":
-        return {
-            "low_stock_products": [
-                {
-                    "sku": "PET004",
-                    "name": "Shampoo Perros",
-                    "current_stock": 3,
-                    "min_stock": 10,
-                },
-                {
-                    "sku": "PET005",
-                    "name": "Arena Gatos",
-                    "current_stock": 1,
-                    "min_stock": 5,
-                },
-            ],
-            "total_low_stock": 2,
-        }
-    elif report_type == "sales_summary":
-        return {
-            "total_sales": 1250.75,
-            "products_sold": 45,
-            "top_products": [
-                {"sku": "PET001", "name": "Alimento Premium", "quantity_sold": 15},
-                {"sku": "PET002", "name": "Juguete Pelota", "quantity_sold": 8},
-            ],
-        }
-    elif report_type == "inventory_value":
-        return {
-            "total_inventory_value": 15750.50,
-            "total_products": 120,
-            "categories": {
-                "Alimentos": 8500.00,
-                "Juguetes": 3200.50,
-                "Accesorios": 4050.00,
-            },
-        }
-
-    return {"message": "Reporte no disponible"}
+    finally:
+        db.close()
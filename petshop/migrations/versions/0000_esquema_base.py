@@ -0,0 +1,72 @@
+"""Esquema original del servicio, el que creaba create_all al importar.
+
+Las bases creadas así se adoptan marcándolas en esta revisión (ver
+common/migrations.py) y `upgrade head` les agrega el resto.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "categorias",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_categorias_id"), "categorias", ["id"], unique=False)
+    op.create_index(op.f("ix_categorias_nombre"), "categorias", ["nombre"], unique=True)
+    op.create_table(
+        "proveedores",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("contacto", sa.String(), nullable=True),
+        sa.Column("telefono", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("nombre"),
+    )
+    op.create_index(op.f("ix_proveedores_id"), "proveedores", ["id"], unique=False)
+    op.create_table(
+        "productos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("descripcion", sa.String(), nullable=True),
+        sa.Column("precio", sa.Float(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=True),
+        sa.Column("categoria_id", sa.Integer(), nullable=True),
+        sa.Column("proveedor_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["categoria_id"],
+            ["categorias.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["proveedor_id"],
+            ["proveedores.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_productos_id"), "productos", ["id"], unique=False)
+    op.create_index(op.f("ix_productos_nombre"), "productos", ["nombre"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_productos_nombre"), table_name="productos")
+    op.drop_index(op.f("ix_productos_id"), table_name="productos")
+    op.drop_table("productos")
+    op.drop_index(op.f("ix_proveedores_id"), table_name="proveedores")
+    op.drop_table("proveedores")
+    op.drop_index(op.f("ix_categorias_nombre"), table_name="categorias")
+    op.drop_index(op.f("ix_categorias_id"), table_name="categorias")
+    op.drop_table("categorias")
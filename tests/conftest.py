@@ -3,12 +3,21 @@ Configuración base para tests de integración.
 """
 
 import os
+from contextlib import contextmanager
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from common.database import Base
+from auth.app import models as auth_models
+from common.database import make_get_db
+from peluqueria.app import models as peluqueria_models
+from petshop.app import models as petshop_models
+from veterinaria.app import models as veterinaria_models
+
+# Sin Redis en los tests: la caché de reportes queda desactivada
+os.environ.setdefault("CACHE_ENABLED", "false")
 
 # Configuración de base de datos de prueba
 TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///./test_integration.db"
@@ -20,6 +29,14 @@ test_engine = create_engine(
     poolclass=StaticPool,
 )
 
+# Los servicios comparten la base de prueba; cada uno tiene su propio MetaData.
+SERVICE_METADATA = [
+    auth_models.Base.metadata,
+    veterinaria_models.Base.metadata,
+    peluqueria_models.Base.metadata,
+    petshop_models.Base.metadata,
+]
+
 # Crear sesión de prueba
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
@@ -31,10 +48,12 @@ def setup_test_db():
     os.environ["DATABASE_URL"] = TEST_SQLALCHEMY_DATABASE_URL
 
     # Crear todas las tablas
-    Base.metadata.create_all(bind=test_engine)
+    for metadata in SERVICE_METADATA:
+        metadata.create_all(bind=test_engine)
     yield
     # Limpiar después de los tests
-    Base.metadata.drop_all(bind=test_engine)
+    for metadata in SERVICE_METADATA:
+        metadata.drop_all(bind=test_engine)
 
 
 @pytest.fixture
@@ -51,10 +70,43 @@ def test_db_session(setup_test_db):
     connection.close()
 
 
-def override_get_db():
-    """Override para la dependencia de base de datos en tests."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+# Override para la dependencia de base de datos en tests: la misma unidad de
+# trabajo de los servicios sobre el motor de prueba.
+override_get_db = make_get_db(TestingSessionLocal)
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL ejecutadas sobre el motor de prueba."""
+
+    def __init__(self):
+        self.sentencias = []
+
+    @property
+    def total(self):
+        return len(self.sentencias)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        self.sentencias.append(statement)
+
+    @contextmanager
+    def presupuesto(self, maximo: int):
+        """Falla si el bloque ejecuta más de `maximo` consultas."""
+        inicio = self.total
+        yield
+        ejecutadas = self.sentencias[inicio:]
+        assert len(ejecutadas) <= maximo, (
+            f"Se ejecutaron {len(ejecutadas)} consultas (presupuesto: {maximo}):\n"
+            + "\n".join(ejecutadas)
+        )
+
+
+@pytest.fixture
+def query_counter(setup_test_db):
+    """
+    Instrumenta el motor de prueba para contar consultas.
+    Uso: `with query_counter.presupuesto(2): client.get(...)`.
+    """
+    contador = ContadorConsultas()
+    event.listen(test_engine, "before_cursor_execute", contador._registrar)
+    yield contador
+    event.remove(test_engine, "before_cursor_execute", contador._registrar)
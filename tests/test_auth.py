@@ -1,11 +1,34 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from jose import jwt
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, delete, update
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from auth.app import auth_utils, crud, keys, models, schemas
+from auth.app.hashing import (
+    BCRYPT_ROUNDS,
+    PasswordHasher,
+    PasswordHashingBusy,
+    pwd_context,
+)
 from auth.app.main import app, get_db
-from common.database import Base
+from auth.app.models import Base
+from auth.app.principals import principal_cache
+from common import auth as common_auth
+from common.database import (
+    DB_MAX_CONCURRENT_REQUESTS,
+    count_round_trips,
+    create_db_engine,
+    make_get_db,
+)
+from common.revocation import RevocationList
 
 # Create a test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -20,24 +43,51 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 Base.metadata.create_all(bind=engine)
 
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+override_get_db = make_get_db(TestingSessionLocal)
+
 
+@pytest.fixture(autouse=True)
+def usar_base_de_prueba():
+    """
+    Instala el override sólo durante estos tests: otros módulos también
+    reemplazan `get_db` en la misma app al importarse.
+    """
+    anterior = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    if anterior is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = anterior
 
-app.dependency_overrides[get_db] = override_get_db
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def revocaciones(monkeypatch):
+    """
+    Lista de sesiones revocadas leída de la base de prueba: la del servicio
+    lee la base configurada y, sin la tabla, rechazaría todo token de login.
+    """
+
+    def revocadas():
+        with TestingSessionLocal() as db:
+            return crud.get_revoked_families(db, datetime(2000, 1, 1))
+
+    lista = RevocationList(revocadas, refresh_seconds=3600)
+    monkeypatch.setattr(common_auth, "_revocation_list", lista)
+    common_auth.token_cache.clear()
+    yield lista
+    common_auth.token_cache.clear()
+
+
 @pytest.fixture
 def db_session():
     connection = engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    # Como en get_db: los objetos siguen cargados después de cada commit.
+    session = TestingSessionLocal(bind=connection, expire_on_commit=False)
     yield session
     session.close()
     transaction.rollback()
@@ -127,3 +177,337 @@ def test_root_endpoint():
     assert response.status_code == 200
     data = response.json()
     assert data["service"] == "Auth Service"
+
+
+class TestHashingDeContrasenas:
+    def test_pool_de_procesos(self):
+        hasher = PasswordHasher(workers=1, max_pending=2)
+        try:
+            hashed = hasher.hash("secreto")
+            assert hasher.verify_and_update("secreto", hashed) == (True, None)
+            assert hasher.verify_and_update("otro", hashed) == (False, None)
+        finally:
+            hasher.shutdown()
+
+    def test_cola_llena_rechaza(self):
+        hasher = PasswordHasher(workers=0, max_pending=1)
+        hasher._pendientes.acquire()
+        with pytest.raises(PasswordHashingBusy):
+            hasher.hash("secreto")
+        hasher._pendientes.release()
+        assert hasher.hash("secreto")
+
+    def test_login_saturado_devuelve_429(self, monkeypatch):
+        monkeypatch.setattr(crud, "hasher", PasswordHasher(workers=0, max_pending=0))
+        response = client.post(
+            "/token", data={"username": "login@example.com", "password": "x"}
+        )
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+    def test_bcrypt_sin_transaccion_abierta(self, db_session, monkeypatch):
+        db_session.add(
+            models.User(email="sintx@example.com", hashed_password="hash-guardado")
+        )
+        db_session.commit()
+
+        class HasherQueVerifica:
+            def verify_and_update(self, password, hashed):
+                # La conexión ya volvió al pool mientras corre bcrypt.
+                assert not db_session.in_transaction()
+                return hashed == "hash-guardado", None
+
+        monkeypatch.setattr(crud, "hasher", HasherQueVerifica())
+        user = crud.authenticate_user(db_session, "sintx@example.com", "clave")
+        assert user.email == "sintx@example.com"
+
+    def test_alta_sin_conexion_durante_el_hash(self, tmp_path, monkeypatch):
+        engine_pool = create_db_engine(f"sqlite:///{tmp_path}/alta.db")
+        Base.metadata.create_all(bind=engine_pool)
+        fabrica = sessionmaker(autocommit=False, autoflush=False, bind=engine_pool)
+        monkeypatch.setitem(app.dependency_overrides, get_db, make_get_db(fabrica))
+        en_uso = []
+
+        class HasherQueMide:
+            def hash(self, password):
+                en_uso.append(engine_pool.pool.checkedout())
+                return pwd_context.hash(password)
+
+        monkeypatch.setattr(crud, "hasher", HasherQueMide())
+        response = client.post(
+            "/users/", json={"email": "alta@example.com", "password": "clave"}
+        )
+
+        assert response.status_code == 200
+        assert en_uso == [0]
+        engine_pool.dispose()
+
+    def test_la_cola_deja_lugar_a_otras_peticiones(self):
+        assert crud.hasher._pendientes._value <= max(DB_MAX_CONCURRENT_REQUESTS // 2, 1)
+
+    def test_rehash_al_iniciar_sesion(self, db_session):
+        barato = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4)
+        user = models.User(
+            email="rehash@example.com", hashed_password=barato.hash("clave")
+        )
+        db_session.add(user)
+        db_session.commit()
+
+        assert crud.authenticate_user(db_session, "rehash@example.com", "clave")
+        db_session.commit()
+        db_session.refresh(user)
+        assert pwd_context.identify(user.hashed_password) == "bcrypt"
+        assert f"${BCRYPT_ROUNDS:02d}$" in user.hashed_password
+        assert not pwd_context.needs_update(user.hashed_password)
+
+
+def _clave_rsa() -> str:
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return clave.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+class TestFirmaRS256:
+    @pytest.fixture
+    def claves(self, tmp_path, monkeypatch):
+        (tmp_path / "2026-09-01.pem").write_text(_clave_rsa())
+        (tmp_path / "2026-10-01.pem").write_text(_clave_rsa())
+        claves = keys.SigningKeys.from_dir(str(tmp_path))
+        monkeypatch.setattr(keys, "signing_keys", claves)
+        monkeypatch.setattr(common_auth, "_key_source", claves)
+        common_auth.token_cache.clear()
+        yield claves
+        common_auth.token_cache.clear()
+
+    def test_genera_la_primera_clave_solo_si_no_hay(self, tmp_path):
+        creada = keys.ensure_signing_key(str(tmp_path / "keys"))
+        assert creada is not None and creada.suffix == ".pem"
+        assert keys.ensure_signing_key(str(tmp_path / "keys")) is None
+        generadas = keys.SigningKeys.from_dir(str(tmp_path / "keys"))
+        assert generadas.current_kid == creada.stem
+
+    def test_jwks_publica_todas_las_claves(self, claves):
+        response = client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert "max-age=" in response.headers["Cache-Control"]
+        publicadas = response.json()["keys"]
+        assert [k["kid"] for k in publicadas] == ["2026-09-01", "2026-10-01"]
+        assert all(k["kty"] == "RSA" and "d" not in k for k in publicadas)
+
+    def test_login_firma_con_la_clave_vigente(self, claves):
+        client.post(
+            "/users/",
+            json={"email": "rs256@example.com", "password": "clave", "roles": []},
+        )
+        token = client.post(
+            "/token", data={"username": "rs256@example.com", "password": "clave"}
+        ).json()["access_token"]
+        assert jwt.get_unverified_header(token) == {
+            "alg": "RS256",
+            "kid": "2026-10-01",
+            "typ": "JWT",
+        }
+        response = client.get(
+            "/verify-token", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.json()["email"] == "rs256@example.com"
+
+        # Otro servicio lo verifica sólo con el JWKS publicado.
+        publicadas = client.get("/.well-known/jwks.json").json()["keys"]
+        jwks = {k["kid"]: k for k in publicadas}
+        common_auth.use_key_source(SimpleNamespace(get_key=jwks.get))
+        common_auth.token_cache.clear()
+        assert common_auth.verify_token(token).email == "rs256@example.com"
+
+    def test_sin_claves_firma_con_hs256(self):
+        assert keys.signing_keys is None
+        assert client.get("/.well-known/jwks.json").json() == {"keys": []}
+        token = auth_utils.create_access_token({"sub": "a@example.com"})
+        assert jwt.get_unverified_header(token)["alg"] == "HS256"
+
+
+class TestRefreshTokens:
+    def _login(self, email):
+        client.post("/users/", json={"email": email, "password": "clave", "roles": []})
+        response = client.post("/token", data={"username": email, "password": "clave"})
+        assert response.status_code == 200
+        return response.json()
+
+    def _verificar(self, tokens):
+        return client.get(
+            "/verify-token",
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        )
+
+    def test_rotacion_sin_contrasena(self, monkeypatch):
+        tokens = self._login("refresh@example.com")
+        # El canje no pasa por bcrypt: funciona con el pool saturado.
+        monkeypatch.setattr(crud, "hasher", PasswordHasher(workers=0, max_pending=0))
+        response = client.post(
+            "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 200
+        nuevos = response.json()
+        assert nuevos["refresh_token"] != tokens["refresh_token"]
+        assert self._verificar(nuevos).json()["email"] == "refresh@example.com"
+        sid = jwt.get_unverified_claims(tokens["access_token"])["sid"]
+        assert jwt.get_unverified_claims(nuevos["access_token"])["sid"] == sid
+
+    def test_reutilizacion_revoca_la_sesion(self, db_session):
+        tokens = self._login("reuso@example.com")
+        nuevos = client.post(
+            "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+        ).json()
+
+        response = client.post(
+            "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Refresh token reuse detected"
+        # Toda la familia queda revocada: el token robado y el legítimo.
+        response = client.post(
+            "/token/refresh", json={"refresh_token": nuevos["refresh_token"]}
+        )
+        assert response.status_code == 401
+        assert self._verificar(nuevos).status_code == 401
+        sid = jwt.get_unverified_claims(nuevos["access_token"])["sid"]
+        assert sid in client.get("/sessions/revoked").json()["revoked"]
+
+    def test_logout(self, revocaciones):
+        tokens = self._login("logout@example.com")
+        assert self._verificar(tokens).status_code == 200
+        response = client.post(
+            "/logout", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 204
+        assert self._verificar(tokens).status_code == 401
+        response = client.post(
+            "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+
+        # Otro proceso ve la revocación al renovar la lista desde la base.
+        sid = jwt.get_unverified_claims(tokens["access_token"])["sid"]
+        otro = RevocationList(revocaciones._fetch)
+        assert otro.is_revoked(sid)
+
+    def test_refresh_token_vencido_o_desconocido(self, db_session):
+        tokens = self._login("vencido@example.com")
+        sesion = crud.get_session_by_token(db_session, tokens["refresh_token"])
+        sesion.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        for refresh_token in (tokens["refresh_token"], "desconocido"):
+            response = client.post(
+                "/token/refresh", json={"refresh_token": refresh_token}
+            )
+            assert response.status_code == 401
+            assert response.json()["detail"] == "Invalid refresh token"
+
+
+class TestConsultasDeUsuario:
+    @pytest.fixture(autouse=True)
+    def caches_vacias(self):
+        principal_cache.clear()
+        common_auth.token_cache.clear()
+        yield
+        principal_cache.clear()
+
+    @pytest.fixture
+    def roles(self, db_session):
+        nombres = ["consulta-a", "consulta-b", "consulta-c"]
+        for nombre in nombres:
+            if crud.get_role_by_name(db_session, nombre) is None:
+                db_session.add(models.Role(name=nombre))
+        db_session.commit()
+        return nombres
+
+    def test_alta_resuelve_los_roles_en_una_consulta(self, db_session, roles):
+        consultas = []
+        for i, nombres in enumerate((roles[:1], roles + ["inexistente"])):
+            usuario = schemas.UserCreate(
+                email=f"alta{i}@example.com", password="clave", roles=nombres
+            )
+            with count_round_trips() as contador:
+                db_user = crud.create_user(db_session, usuario)
+            consultas.append(contador.queries)
+            assert sorted(r.name for r in db_user.roles) == sorted(nombres[:3])
+        # SELECT de roles, INSERT del usuario e INSERT de user_roles
+        assert consultas == [3, 3]
+
+    def test_login_carga_usuario_y_roles_en_una_consulta(self, db_session, roles):
+        db_session.add(
+            models.User(
+                email="login1@example.com",
+                hashed_password=pwd_context.hash("clave"),
+                roles=crud.get_roles_by_names(db_session, roles),
+            )
+        )
+        db_session.commit()
+        with count_round_trips() as contador:
+            user = crud.authenticate_user(db_session, "login1@example.com", "clave")
+            assert len(user.roles) == 3
+        assert contador.queries == 1
+
+    def _me(self, token):
+        return client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    def test_users_me_desde_la_cache(self, roles):
+        client.post(
+            "/users/",
+            json={"email": "me@example.com", "password": "clave", "roles": roles[:1]},
+        )
+        token = auth_utils.create_access_token({"sub": "me@example.com"})
+        primera = self._me(token)
+        assert primera.status_code == 200
+        assert primera.headers["X-DB-Round-Trips"] == "2"  # SELECT y commit
+        segunda = self._me(token)
+        assert segunda.json() == primera.json()
+        assert segunda.headers["X-DB-Round-Trips"] == "0"
+
+    def test_cambios_invalidan_la_cache(self, db_session, roles):
+        client.post(
+            "/users/",
+            json={"email": "cambio@example.com", "password": "clave", "roles": []},
+        )
+        token = auth_utils.create_access_token({"sub": "cambio@example.com"})
+        assert self._me(token).json()["roles"] == []
+
+        # Cambio del usuario: se descarta su entrada al confirmar.
+        user = crud.get_user_by_email(db_session, "cambio@example.com")
+        user.roles.append(crud.get_role_by_name(db_session, roles[0]))
+        db_session.commit()
+        assert [r["name"] for r in self._me(token).json()["roles"]] == roles[:1]
+
+        # Cambio de un rol: se vacía la caché.
+        rol = crud.get_role_by_name(db_session, roles[0])
+        rol.description = "nueva descripción"
+        db_session.commit()
+        assert self._me(token).json()["roles"][0]["description"] == (
+            "nueva descripción"
+        )
+
+    @pytest.mark.parametrize(
+        "sentencia",
+        [
+            update(models.Role).values(description="masiva"),
+            update(models.User).values(is_active=True),
+            delete(models.user_roles).where(models.user_roles.c.user_id == -1),
+        ],
+        ids=["roles", "usuarios", "user_roles"],
+    )
+    def test_escrituras_masivas_vacian_la_cache(self, db_session, roles, sentencia):
+        client.post(
+            "/users/",
+            json={"email": "masiva@example.com", "password": "clave", "roles": []},
+        )
+        token = auth_utils.create_access_token({"sub": "masiva@example.com"})
+        self._me(token)
+        assert principal_cache.get("masiva@example.com") is not None
+
+        db_session.execute(sentencia)
+        assert principal_cache.get("masiva@example.com") is not None
+        db_session.commit()
+        assert principal_cache.get("masiva@example.com") is None
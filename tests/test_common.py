@@ -0,0 +1,751 @@
+"""
+Tests de los módulos compartidos en `common/`.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.testclient import TestClient
+from jose import jwk, jwt
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.app import auth_utils
+from common import auth, database, gunicorn_conf, jwks, metrics, revocation
+from common.pagination import decode_cursor, encode_cursor
+from petshop.app import async_routes as petshop_async_routes
+from petshop.app import models as petshop_models
+from petshop.app.main import app as petshop_app
+
+
+class TestCursor:
+    def test_ida_y_vuelta(self):
+        assert decode_cursor(encode_cursor(12345)) == 12345
+        assert decode_cursor(None) is None
+
+    @pytest.mark.parametrize("cursor", ["%%%", "eyJpZCI6ICJ4In0", "bnVsbA"])
+    def test_cursor_invalido(self, cursor):
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor)
+        assert error.value.status_code == 400
+
+
+class TestPoolDeConexiones:
+    def test_configuracion_del_pool(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, "DB_POOL_SIZE", 3)
+        monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 1)
+        engine = database.create_db_engine(f"sqlite:///{tmp_path}/pool.db")
+
+        assert isinstance(engine.pool, database.InstrumentedQueuePool)
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 1
+        engine.dispose()
+
+    def test_espera_y_timeout_del_pool(self, tmp_path):
+        engine = database.create_db_engine(
+            f"sqlite:///{tmp_path}/pool.db",
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.2,
+        )
+        ocupada = engine.connect()
+        liberar = threading.Timer(0.05, ocupada.close)
+        liberar.start()
+        # Espera a que el hilo devuelva la única conexión.
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+
+        ocupada = engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        ocupada.close()
+
+        stats = engine.pool.stats
+        assert stats.checkouts == 4
+        assert stats.timeouts == 1
+        assert stats.wait_seconds_max >= 0.04
+        lineas = metrics.pool_metrics(engine)
+        assert "db_pool_checkout_timeouts_total 1" in lineas
+        assert "db_pool_checked_out 0" in lineas
+        engine.dispose()
+
+    def test_la_cola_fifo_descuenta_del_timeout(self, tmp_path):
+        engine = database.create_db_engine(
+            f"sqlite:///{tmp_path}/pool.db",
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.4,
+        )
+
+        class GateLento:
+            """Deja pasar tras consumir casi todo el plazo."""
+
+            def acquire(self, timeout):
+                time.sleep(timeout * 0.75)
+                return True
+
+            def release(self):
+                pass
+
+        ocupada = engine.connect()
+        engine.pool._gate = GateLento()
+        inicio = time.perf_counter()
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        # Sin descontar, esperaría 0.3 s en la cola y otros 0.4 s en el pool.
+        assert time.perf_counter() - inicio < 0.55
+        assert engine.pool._timeout == 0.4
+        ocupada.close()
+        engine.dispose()
+
+    def test_endpoint_metrics(self):
+        response = TestClient(petshop_app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE db_pool_checked_out gauge" in response.text
+
+
+class TestMotorAsincrono:
+    def test_url_asincrona(self):
+        url, server_settings = database.async_database_url(
+            "postgresql://u:p@db/petshop?options=-csearch_path%3Dpetshop"
+        )
+        assert url.drivername == "postgresql+asyncpg"
+        assert "options" not in url.query
+        assert server_settings == {"search_path": "petshop"}
+
+        url, server_settings = database.async_database_url("sqlite:///./x.db")
+        assert url.drivername == "sqlite+aiosqlite"
+        assert server_settings == {}
+
+    def test_endpoints_asincronos(self, tmp_path):
+        url = f"sqlite:///{tmp_path}/async.db"
+        petshop_models.Base.metadata.create_all(bind=create_engine(url))
+        async_engine = database.create_async_db_engine(url)
+
+        async def override_get_async_db():
+            async with AsyncSession(async_engine, expire_on_commit=False) as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(petshop_async_routes.router)
+        app.dependency_overrides[database.get_async_db] = override_get_async_db
+
+        with TestClient(app) as client:
+            categoria = client.post("/categorias/", json={"nombre": "Alimentos"})
+            assert categoria.status_code == 200
+            for i in range(3):
+                response = client.post(
+                    "/productos/",
+                    json={
+                        "nombre": f"Alimento {i}",
+                        "precio": 10.0,
+                        "categoria_id": categoria.json()["id"],
+                    },
+                )
+                assert response.status_code == 200
+
+            response = client.get("/productos/", params={"limit": 2})
+            assert response.status_code == 200
+            assert len(response.json()) == 2
+            assert response.json()[0]["categoria"]["nombre"] == "Alimentos"
+
+            response = client.get(
+                "/productos/",
+                params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+            )
+            assert [p["nombre"] for p in response.json()] == ["Alimento 2"]
+            assert client.get("/productos/999").status_code == 404
+
+
+class TestReplicasDeLectura:
+    @pytest.fixture
+    def bases(self, tmp_path):
+        """Primario y dos réplicas SQLite, cada una con un producto distinto."""
+        engines = {}
+        for nombre in ("primario", "replica1", "replica2"):
+            engine = create_engine(f"sqlite:///{tmp_path}/{nombre}.db")
+            petshop_models.Base.metadata.create_all(bind=engine)
+            with engine.begin() as conexion:
+                conexion.execute(
+                    petshop_models.Producto.__table__.insert(),
+                    {"nombre": nombre, "precio": 1.0},
+                )
+            engines[nombre] = engine
+        yield engines
+        for engine in engines.values():
+            engine.dispose()
+
+    @staticmethod
+    def _leer(db):
+        return db.scalar(select(petshop_models.Producto.nombre))
+
+    def test_lecturas_a_replicas_en_turno_rotativo(self, bases):
+        replica_set = database.ReplicaSet([bases["replica1"], bases["replica2"]])
+        leidos = []
+        for _ in range(4):
+            with database.RoutingSession(
+                bind=bases["primario"], read_only=True, replica_set=replica_set
+            ) as db:
+                leidos.append(self._leer(db))
+                # La sesión sigue en la misma réplica
+                assert self._leer(db) == leidos[-1]
+        assert leidos == ["replica1", "replica2", "replica1", "replica2"]
+
+        with database.RoutingSession(
+            bind=bases["primario"], replica_set=replica_set
+        ) as db:
+            assert self._leer(db) == "primario"
+
+    def test_escritura_pasa_al_primario(self, bases):
+        replica_set = database.ReplicaSet([bases["replica1"]])
+        with database.RoutingSession(
+            bind=bases["primario"], read_only=True, replica_set=replica_set
+        ) as db:
+            db.add(petshop_models.Producto(nombre="nuevo", precio=2.0))
+            db.flush()
+            assert db.query(petshop_models.Producto).count() == 2
+            db.commit()
+
+        with bases["primario"].connect() as conexion:
+            assert (
+                conexion.exec_driver_sql("SELECT count(*) FROM productos").scalar() == 2
+            )
+
+    def test_replica_caida_queda_fuera_de_rotacion(self, bases, tmp_path):
+        caida = create_engine(f"sqlite:///{tmp_path}/no/existe.db")
+        replica_set = database.ReplicaSet([caida, bases["replica1"]])
+        for _ in range(3):
+            assert replica_set.choose() is bases["replica1"]
+
+        replica_set = database.ReplicaSet([caida])
+        with database.RoutingSession(
+            bind=bases["primario"], read_only=True, replica_set=replica_set
+        ) as db:
+            assert self._leer(db) == "primario"
+
+    def test_ventana_read_your_writes(self, bases, monkeypatch):
+        monkeypatch.setattr(
+            database, "replicas", database.ReplicaSet([bases["replica1"]])
+        )
+        monkeypatch.setattr(
+            database,
+            "SessionLocal",
+            database.sessionmaker(
+                class_=database.RoutingSession, bind=bases["primario"]
+            ),
+        )
+
+        def get_db(request: Request, response: Response):
+            with database.session_for_request(request, response) as db:
+                yield db
+
+        app = FastAPI()
+
+        @app.api_route("/origen", methods=["GET", "POST"])
+        def origen(db=Depends(get_db)):
+            return self._leer(db)
+
+        client = TestClient(app)
+        assert client.get("/origen").json() == "replica1"
+        assert client.post("/origen").json() == "primario"
+        assert database.READ_YOUR_WRITES_COOKIE in client.cookies
+        assert client.get("/origen").json() == "primario"
+
+        client.cookies.clear()
+        assert client.get("/origen").json() == "replica1"
+
+
+class TestUnidadDeTrabajo:
+    @pytest.fixture
+    def app_productos(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path}/uow.db")
+        petshop_models.Base.metadata.create_all(bind=engine)
+        session_factory = database.sessionmaker(bind=engine)
+
+        app = FastAPI()
+        app.add_middleware(metrics.RequestMetricsMiddleware)
+        get_db = database.make_get_db(session_factory)
+
+        @app.post("/productos/{nombre}")
+        def crear(
+            nombre: str, falla: bool = False, db=Depends(get_db, scope="function")
+        ):
+            db.add(petshop_models.Producto(nombre=nombre, precio=1.0))
+            db.flush()
+            if falla:
+                raise HTTPException(status_code=400, detail="Falla")
+            return {"ok": True}
+
+        yield TestClient(app), session_factory
+        engine.dispose()
+
+    def test_confirma_una_vez_al_final(self, app_productos):
+        client, session_factory = app_productos
+
+        response = client.post("/productos/uno")
+        assert response.status_code == 200
+        # INSERT y COMMIT
+        assert response.headers[metrics.ROUND_TRIPS_HEADER] == "2"
+
+        assert client.post("/productos/dos", params={"falla": True}).status_code == 400
+        with session_factory() as db:
+            nombres = db.scalars(select(petshop_models.Producto.nombre)).all()
+        assert nombres == ["uno"]
+
+    def test_contador_de_idas_y_vueltas(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path}/contador.db")
+        with database.count_round_trips() as contador:
+            with engine.begin() as conexion:
+                conexion.execute(text("SELECT 1"))
+                conexion.execute(text("SELECT 2"))
+        assert contador.total == 3
+
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+        assert contador.total == 3
+        engine.dispose()
+
+
+class TestMetricasPorRuta:
+    def test_histograma_acumulativo(self):
+        histograma = metrics.Histogram((1, 5))
+        for valor in (0, 1, 3, 9):
+            histograma.observe(valor)
+        assert histograma.lines("x", 'a="b"') == [
+            'x_bucket{a="b",le="1"} 2',
+            'x_bucket{a="b",le="5"} 3',
+            'x_bucket{a="b",le="+Inf"} 4',
+            'x_sum{a="b"} 13.000000',
+            'x_count{a="b"} 4',
+        ]
+
+    def test_latencia_consultas_y_consultas_lentas(self, tmp_path, monkeypatch, caplog):
+        engine = create_engine(f"sqlite:///{tmp_path}/metricas.db")
+        petshop_models.Base.metadata.create_all(bind=engine)
+        get_db = database.make_get_db(database.sessionmaker(bind=engine))
+
+        app = FastAPI()
+        app.include_router(metrics.router)
+        app.add_middleware(metrics.RequestMetricsMiddleware)
+
+        @app.get("/metricas-prueba/{producto_id}")
+        def leer(producto_id: int, db=Depends(get_db, scope="function")):
+            return db.get(petshop_models.Producto, producto_id) is not None
+
+        monkeypatch.setattr(database, "DB_SLOW_QUERY_MS", 0)
+        client = TestClient(app)
+        with caplog.at_level(logging.WARNING, logger="common.database.slow_queries"):
+            for producto_id in range(3):
+                assert client.get(f"/metricas-prueba/{producto_id}").status_code == 200
+        assert client.get("/no-existe").status_code == 404
+        texto = client.get("/metrics").text
+        engine.dispose()
+
+        # Una serie por plantilla de ruta, no por id
+        etiquetas = 'method="GET",route="/metricas-prueba/{producto_id}"'
+        assert f"http_request_duration_seconds_count{{{etiquetas}}} 3" in texto
+        assert (
+            f'http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} 3' in texto
+        )
+        # Un SELECT por petición
+        assert f'http_request_db_queries_bucket{{{etiquetas},le="0"}} 0' in texto
+        assert f'http_request_db_queries_bucket{{{etiquetas},le="1"}} 3' in texto
+        assert f"http_request_db_slow_queries_total{{{etiquetas}}} 3" in texto
+        assert f'route="{metrics.UNMATCHED_ROUTE}"' in texto
+        assert "GET /metricas-prueba/1" in caplog.text
+        assert "FROM productos" in caplog.text
+
+
+class TestServidorDeProduccion:
+    def test_pool_por_worker_respeta_el_presupuesto(self):
+        assert gunicorn_conf.pool_por_worker(20, 4) == (2, 3)
+        assert gunicorn_conf.pool_por_worker(40, 1) == (20, 20)
+        assert gunicorn_conf.pool_por_worker(3, 3) == (1, 0)
+        with pytest.raises(ValueError):
+            gunicorn_conf.pool_por_worker(3, 8)
+        for presupuesto, workers in ((20, 3), (100, 9), (7, 2)):
+            pool_size, max_overflow = gunicorn_conf.pool_por_worker(
+                presupuesto, workers
+            )
+            assert (pool_size + max_overflow) * workers <= presupuesto
+
+    def test_configuracion_desde_el_entorno(self, monkeypatch):
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        monkeypatch.setenv("DB_CONNECTION_BUDGET", "20")
+        monkeypatch.setenv("GUNICORN_MAX_REQUESTS", "500")
+        monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+        try:
+            configuracion = importlib.reload(gunicorn_conf)
+            assert configuracion.workers == 4
+            assert configuracion.max_requests == 500
+            assert configuracion.max_requests_jitter == 50
+            assert configuracion.preload_app is False
+            assert os.environ["DB_POOL_SIZE"] == "2"
+            # Un valor explícito tiene precedencia sobre el presupuesto.
+            assert os.environ["DB_MAX_OVERFLOW"] == "1"
+        finally:
+            monkeypatch.undo()
+            importlib.reload(gunicorn_conf)
+
+    def test_menos_conexiones_que_workers(self, monkeypatch):
+        monkeypatch.setenv("WEB_CONCURRENCY", "8")
+        monkeypatch.setenv("DB_CONNECTION_BUDGET", "3")
+        monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+        monkeypatch.delenv("DB_MAX_OVERFLOW", raising=False)
+        try:
+            configuracion = importlib.reload(gunicorn_conf)
+            # Un worker por conexión: el total no supera el presupuesto.
+            assert configuracion.workers == 3
+            servidor = type("Arbiter", (), {"cfg": configuracion})
+            configuracion.post_fork(servidor, None)
+            assert os.environ["WEB_CONCURRENCY"] == "3"
+            assert os.environ["DB_POOL_SIZE"] == "1"
+            assert os.environ["DB_MAX_OVERFLOW"] == "0"
+        finally:
+            monkeypatch.undo()
+            importlib.reload(gunicorn_conf)
+
+
+def _token(email="ana@example.com", roles=("veterinario",), minutos=30):
+    return jwt.encode(
+        {"sub": email, "roles": list(roles), "exp": time.time() + minutos * 60},
+        auth.SECRET_KEY,
+        algorithm=auth.ALGORITHM,
+    )
+
+
+class TestVerificacionLocalDeTokens:
+    @pytest.fixture(autouse=True)
+    def cache_vacia(self):
+        auth.token_cache.clear()
+        yield
+        auth.token_cache.clear()
+
+    def test_un_solo_decode_por_token(self, monkeypatch):
+        decodificados = []
+        decode = auth.jwt.decode
+        monkeypatch.setattr(
+            auth.jwt,
+            "decode",
+            lambda *args, **kwargs: decodificados.append(1) or decode(*args, **kwargs),
+        )
+        token = _token()
+        for _ in range(3):
+            principal = auth.verify_token(token)
+        assert principal.email == "ana@example.com"
+        assert principal.roles == ("veterinario",)
+        assert len(decodificados) == 1
+
+    def test_token_del_servicio_de_autenticacion(self):
+        token = auth_utils.create_access_token(
+            {"sub": "ana@example.com", "roles": ["admin"]}
+        )
+        assert auth.verify_token(token).roles == ("admin",)
+        assert auth_utils.verify_token(token) == "ana@example.com"
+        assert auth_utils.get_user_roles_from_token(token) == ["admin"]
+
+    @pytest.mark.parametrize(
+        "token",
+        [
+            "no-es-un-jwt",
+            jwt.encode({"sub": "ana@example.com"}, "otra-clave", algorithm="HS256"),
+            jwt.encode({"roles": []}, auth.SECRET_KEY, algorithm=auth.ALGORITHM),
+        ],
+    )
+    def test_tokens_invalidos(self, token):
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(token)
+        assert len(auth.token_cache) == 0
+
+    def test_la_cache_respeta_la_expiracion(self, monkeypatch):
+        token = _token(minutos=1)
+        auth.verify_token(token)
+        ahora = time.time()
+        monkeypatch.setattr(auth.time, "time", lambda: ahora + 120)
+        assert auth.token_cache.get(token) is None
+        assert len(auth.token_cache) == 0
+
+    def test_token_vencido(self):
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(_token(minutos=-1))
+
+    def test_lru_acotada(self):
+        cache = auth.TokenCache(maxsize=2)
+        vence = time.time() + 60
+        for token in ("a", "b"):
+            cache.put(token, auth.Principal(token, (), vence))
+        cache.get("a")
+        cache.put("c", auth.Principal("c", (), vence))
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+
+    def test_dependencias(self, monkeypatch):
+        monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+        app = FastAPI(dependencies=auth.service_dependencies())
+
+        @app.get("/")
+        def raiz():
+            return {}
+
+        @app.get("/privado")
+        def privado(request: Request):
+            return {"email": request.state.principal.email}
+
+        @app.get("/admin", dependencies=[Depends(auth.require_roles("admin"))])
+        def admin():
+            return {}
+
+        client = TestClient(app)
+        cabecera = {"Authorization": f"Bearer {_token()}"}
+        assert client.get("/").status_code == 200
+        assert client.get("/privado").status_code == 401
+        respuesta = client.get(
+            "/privado", headers={"Authorization": "Bearer no-es-un-jwt"}
+        )
+        assert respuesta.status_code == 401
+        assert client.get("/privado", headers=cabecera).json() == {
+            "email": "ana@example.com"
+        }
+        assert client.get("/admin", headers=cabecera).status_code == 403
+        cabecera = {"Authorization": f"Bearer {_token(roles=['admin'])}"}
+        assert client.get("/admin", headers=cabecera).status_code == 200
+
+    def test_sin_auth_required_los_servicios_no_cambian(self):
+        assert auth.service_dependencies() == []
+        assert TestClient(petshop_app).get("/").status_code == 200
+
+
+def _clave_rsa() -> str:
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return clave.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def _jwk_publico(pem: str, kid: str) -> dict:
+    return dict(jwk.construct(pem, "RS256").public_key().to_dict(), kid=kid)
+
+
+class JWKSFalso(jwks.JWKSCache):
+    """
+    JWKS servido desde memoria; cuenta las descargas.
+    """
+
+    def __init__(self, claves, ttl=300):
+        super().__init__("http://auth/.well-known/jwks.json")
+        self.publicadas = claves
+        self.ttl = ttl
+        self.descargas = 0
+
+    def _fetch(self):
+        self.descargas += 1
+        return {k["kid"]: k for k in self.publicadas}, self.ttl
+
+
+class TestFirmaAsimetrica:
+    @pytest.fixture(autouse=True)
+    def sin_fuente_de_claves(self, monkeypatch):
+        monkeypatch.setattr(auth, "_key_source", None)
+        monkeypatch.setattr(jwks, "JWKS_URL", None)
+        monkeypatch.setattr(jwks, "JWKS_MIN_REFRESH_SECONDS", 0)
+        auth.token_cache.clear()
+        yield
+        auth.token_cache.clear()
+
+    def test_verifica_con_la_clave_del_kid(self):
+        pem = _clave_rsa()
+        auth.use_key_source(JWKSFalso([_jwk_publico(pem, "k1")]))
+        token = jwt.encode(
+            {"sub": "ana@example.com", "exp": time.time() + 60},
+            pem,
+            algorithm="RS256",
+            headers={"kid": "k1"},
+        )
+        assert auth.verify_token(token).email == "ana@example.com"
+
+        otro = jwt.encode(
+            {"sub": "ana@example.com"}, _clave_rsa(), "RS256", headers={"kid": "k1"}
+        )
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(otro)
+
+    def test_sin_fuente_de_claves_rechaza_rs256(self):
+        token = jwt.encode({"sub": "a"}, _clave_rsa(), "RS256", headers={"kid": "k"})
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(token)
+
+    def test_hs256_deshabilitado(self, monkeypatch):
+        monkeypatch.setattr(auth, "JWT_ACCEPT_HS256", False)
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(_token())
+
+    def test_con_jwks_hs256_se_rechaza_por_defecto(self, monkeypatch):
+        monkeypatch.setattr(auth, "JWT_ACCEPT_HS256", None)
+        assert auth.verify_token(_token()).email == "ana@example.com"
+
+        auth.token_cache.clear()
+        auth.use_key_source(JWKSFalso([]))
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(_token())
+
+        # Migración: se aceptan explícitamente.
+        monkeypatch.setattr(auth, "JWT_ACCEPT_HS256", True)
+        assert auth.verify_token(_token()).email == "ana@example.com"
+
+    def test_kid_nuevo_renueva_el_jwks(self):
+        viejo, nuevo = _clave_rsa(), _clave_rsa()
+        cache = JWKSFalso([_jwk_publico(viejo, "2026-01")])
+        assert cache.get_key("2026-01") is not None
+        assert cache.descargas == 1
+
+        # Rotación: el auth publica la clave nueva.
+        cache.publicadas.append(_jwk_publico(nuevo, "2026-02"))
+        assert cache.get_key("2026-02")["kid"] == "2026-02"
+        assert cache.descargas == 2
+        assert cache.get_key("2026-01") is not None
+        assert cache.descargas == 2
+
+    def test_kid_desconocido_respeta_el_intervalo_minimo(self, monkeypatch):
+        monkeypatch.setattr(jwks, "JWKS_MIN_REFRESH_SECONDS", 60)
+        cache = JWKSFalso([])
+        for _ in range(5):
+            assert cache.get_key("inexistente") is None
+        assert cache.descargas == 1
+
+    def test_jwks_vencido_se_renueva_en_segundo_plano(self):
+        pem = _clave_rsa()
+        cache = JWKSFalso([_jwk_publico(pem, "k1")], ttl=0)
+        cache.get_key("k1")
+        # Vencido: devuelve la clave guardada sin esperar la descarga.
+        assert cache.get_key("k1") is not None
+        for _ in range(100):
+            if cache.descargas == 2:
+                break
+            time.sleep(0.01)
+        assert cache.descargas == 2
+
+    def test_error_de_descarga_conserva_las_claves(self):
+        cache = JWKSFalso([_jwk_publico(_clave_rsa(), "k1")], ttl=0)
+        cache.get_key("k1")
+
+        def falla():
+            raise OSError("auth caído")
+
+        cache._fetch = falla
+        cache.get_key("otro")
+        assert cache.get_key("k1") is not None
+
+
+class TestListaDeRevocaciones:
+    def test_revocadas_en_el_proceso_y_en_la_fuente(self):
+        publicadas = ["s1"]
+        lista = revocation.RevocationList(lambda: list(publicadas), refresh_seconds=0)
+        assert lista.is_revoked("s1")
+        assert not lista.is_revoked("s2")
+
+        # Revocada localmente antes de que la fuente la publique.
+        lista.add("s2")
+        lista._refresh()
+        assert lista.is_revoked("s2")
+
+    def test_error_de_la_fuente_conserva_la_lista(self):
+        def fuente():
+            if lista._loaded.is_set():
+                raise OSError("auth caído")
+            return ["s1"]
+
+        lista = revocation.RevocationList(fuente, refresh_seconds=0)
+        assert lista.is_revoked("s1")
+        lista._refresh()
+        assert lista.is_revoked("s1")
+
+    def test_sin_lista_se_rechazan_los_tokens_con_sesion(self):
+        def fuente():
+            raise OSError("auth caído")
+
+        lista = revocation.RevocationList(fuente, refresh_seconds=3600)
+        assert lista.is_revoked("s1")
+
+    def test_lista_vencida_se_rechaza(self, caplog):
+        caido = []
+
+        def fuente():
+            if caido:
+                raise OSError("auth caído")
+            return []
+
+        lista = revocation.RevocationList(
+            fuente, refresh_seconds=3600, max_stale_seconds=60
+        )
+        assert not lista.is_revoked("s1")
+
+        caido.append(True)
+        lista._fetched_at -= 61
+        with caplog.at_level(logging.ERROR, logger="common.revocation"):
+            lista._refresh()
+        assert "no disponible" in caplog.text
+        assert lista.is_revoked("s1")
+
+    def test_lista_vencida_por_inactividad_espera_la_renovacion(self):
+        publicadas = []
+
+        def fuente():
+            time.sleep(0.2)
+            return list(publicadas)
+
+        lista = revocation.RevocationList(
+            fuente, refresh_seconds=5, max_stale_seconds=60
+        )
+        assert not lista.is_revoked("s1")
+
+        # Sin peticiones durante más de max_stale_seconds.
+        lista._fetched_at -= 120
+        lista._expires_at -= 120
+        publicadas.append("s2")
+        assert not lista.is_revoked("s1")
+        assert lista.is_revoked("s2")
+
+    def test_retencion_segun_la_vigencia_de_los_tokens(self):
+        lista = revocation.RevocationList(lambda: [])
+        assert lista.retention_seconds == revocation.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        assert auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES == (
+            revocation.ACCESS_TOKEN_EXPIRE_MINUTES
+        )
+
+    def test_sin_revocations_url_avisa_una_vez(self, monkeypatch, caplog):
+        monkeypatch.setattr(revocation, "REVOCATIONS_URL", None)
+        monkeypatch.setattr(auth, "_revocation_list", None)
+        monkeypatch.setattr(auth, "_revocation_list_from_env", False)
+        with caplog.at_level(logging.ERROR, logger="common.revocation"):
+            assert auth.get_revocation_list() is None
+            assert auth.get_revocation_list() is None
+        assert caplog.text.count("REVOCATIONS_URL sin definir") == 1
+
+    def test_token_de_sesion_revocada(self, monkeypatch):
+        lista = revocation.RevocationList(lambda: ["revocada"])
+        monkeypatch.setattr(auth, "_revocation_list", lista)
+        auth.token_cache.clear()
+        token = jwt.encode(
+            {"sub": "ana@example.com", "sid": "vigente", "exp": time.time() + 60},
+            auth.SECRET_KEY,
+            algorithm=auth.ALGORITHM,
+        )
+        assert auth.verify_token(token).session_id == "vigente"
+        # Ya en la caché de tokens, igual se rechaza al revocarse.
+        lista.add("vigente")
+        with pytest.raises(auth.InvalidToken):
+            auth.verify_token(token)
+        auth.token_cache.clear()
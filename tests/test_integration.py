@@ -4,11 +4,13 @@ Tests de integración para verificar la comunicación entre servicios.
 
 from fastapi.testclient import TestClient
 
-from auth.app.main import app as auth_app, get_db as auth_get_db
-from veterinaria.app.main import app as vet_app, get_db as vet_get_db
-from petshop.app.main import app as petshop_app, get_db as petshop_get_db
+from auth.app.main import app as auth_app
+from auth.app.main import get_db as auth_get_db
+from petshop.app.main import app as petshop_app
+from petshop.app.main import get_db as petshop_get_db
 from tests.conftest import override_get_db
-
+from veterinaria.app.main import app as vet_app
+from veterinaria.app.main import get_db as vet_get_db
 
 # Override de dependencias para tests
 auth_app.dependency_overrides[auth_get_db] = override_get_db
@@ -129,6 +131,20 @@ class TestCrossServiceWorkflow:
         assert pet["nombre"] == "Max"
         assert pet["propietario_id"] == user_id
 
+    def test_alta_de_mascota_en_un_solo_commit(self, setup_test_db):
+        """Mascota e historial en un solo flush y un único commit."""
+        pet_data = {
+            "nombre": "Toby",
+            "especie": "Canino",
+            "raza": "Beagle",
+            "edad": 4,
+            "propietario_id": 1,
+        }
+        vet_response = vet_client.post("/mascotas/", json=pet_data)
+
+        assert vet_response.status_code == 200
+        assert vet_response.headers["X-DB-Round-Trips"] == "3"
+
     def test_medical_report_generation_workflow(self, setup_test_db):
         """Test flujo de generación de reporte médico."""
         # Crear mascota primero
@@ -0,0 +1,99 @@
+"""
+Tests de las migraciones Alembic: cada servicio llega a `head` sobre una base
+vacía, el esquema resultante coincide con los modelos y `downgrade` lo deshace.
+"""
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.util import AutogenerateDiffsDetected
+from sqlalchemy import create_engine, inspect, text
+
+from auth.app import models as auth_models
+from peluqueria.app import models as peluqueria_models
+from petshop.app import models as petshop_models
+from veterinaria.app import models as veterinaria_models
+
+SERVICIOS = ["auth", "veterinaria", "peluqueria", "petshop"]
+
+
+def _config(servicio: str) -> Config:
+    config = Config("alembic.ini", ini_section=servicio)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@pytest.fixture
+def base_vacia(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/migraciones.db"
+    for servicio in SERVICIOS:
+        monkeypatch.setenv(f"{servicio.upper()}_DATABASE_URL", url)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("servicio", SERVICIOS)
+def test_upgrade_coincide_con_los_modelos(base_vacia, servicio):
+    config = _config(servicio)
+    command.upgrade(config, "head")
+    # Falla si autogenerate encuentra diferencias entre la base y los modelos.
+    try:
+        command.check(config)
+    except AutogenerateDiffsDetected as error:
+        pytest.fail(str(error))
+
+    command.downgrade(config, "base")
+    assert inspect(base_vacia).get_table_names() == [f"alembic_version_{servicio}"]
+
+
+# Revisión equivalente al esquema que creaba create_all antes de Alembic
+ESQUEMA_ORIGINAL = {"auth": "0001", "veterinaria": "0001", "peluqueria": "0001"}
+ESQUEMA_ORIGINAL["petshop"] = "0000"
+
+
+@pytest.mark.parametrize("servicio", SERVICIOS)
+def test_adopta_bases_creadas_con_create_all(base_vacia, servicio):
+    config = _config(servicio)
+    # Base de una instalación anterior: las tablas, sin tabla de versiones.
+    command.upgrade(config, ESQUEMA_ORIGINAL[servicio])
+    with base_vacia.begin() as conexion:
+        conexion.execute(text(f"DROP TABLE alembic_version_{servicio}"))
+        if servicio == "petshop":
+            conexion.execute(
+                text("INSERT INTO productos (nombre, precio) VALUES ('Collar', 5)")
+            )
+
+    command.upgrade(config, "head")
+    try:
+        command.check(config)
+    except AutogenerateDiffsDetected as error:
+        pytest.fail(str(error))
+    if servicio == "petshop":
+        with base_vacia.connect() as conexion:
+            fila = conexion.execute(text("SELECT nombre, min_stock FROM productos"))
+            assert fila.one() == ("Collar", 5)
+
+
+def test_servicios_comparten_la_base(base_vacia):
+    for servicio in SERVICIOS:
+        command.upgrade(_config(servicio), "head")
+    tablas = set(inspect(base_vacia).get_table_names())
+    assert {f"alembic_version_{s}" for s in SERVICIOS} <= tablas
+    assert {"users", "mascotas", "turnos", "productos"} <= tablas
+
+
+def test_metadata_propio_por_servicio():
+    bases = [
+        auth_models.Base,
+        veterinaria_models.Base,
+        peluqueria_models.Base,
+        petshop_models.Base,
+    ]
+    tablas = [set(base.metadata.tables) for base in bases]
+    assert sum(len(t) for t in tablas) == len(set().union(*tablas))
+    assert {"users", "roles", "user_roles", "sessions"} == tablas[0]
+    # Cada registro configura sólo los mapeos de su servicio.
+    for base in bases:
+        modulos = {m.class_.__module__ for m in base.registry.mappers}
+        assert len(modulos) == 1
@@ -0,0 +1,705 @@
+"""
+Tests del servicio de Pet Shop: punto de venta e inventario.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from petshop.app import crud, models, reports, schemas, search
+from petshop.app.inventory import procesar_inventario
+from petshop.app.main import app, get_db
+from tests.conftest import TestingSessionLocal, override_get_db
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+def _crear_producto(nombre: str, stock: int, precio: float = 10.0) -> int:
+    response = client.post(
+        "/productos/", json={"nombre": nombre, "precio": precio, "stock": stock}
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+class TestPuntoDeVenta:
+    """Tests del endpoint de ventas (TPV)."""
+
+    def test_venta_descuenta_stock_de_todos_los_items(self, setup_test_db):
+        id_a = _crear_producto("Venta OK A", stock=5)
+        id_b = _crear_producto("Venta OK B", stock=3)
+
+        response = client.post(
+            "/pos/venta/",
+            json={
+                "items": [
+                    {"producto_id": id_a, "cantidad": 2},
+                    {"producto_id": id_b, "cantidad": 3},
+                    {"producto_id": id_a, "cantidad": 1},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        assert client.get(f"/productos/{id_a}").json()["stock"] == 2
+        assert client.get(f"/productos/{id_b}").json()["stock"] == 0
+
+    def test_venta_con_faltantes_no_descuenta_nada(self, setup_test_db):
+        id_ok = _crear_producto("Venta Parcial OK", stock=10)
+        id_corto_1 = _crear_producto("Venta Parcial Corto 1", stock=1)
+        id_corto_2 = _crear_producto("Venta Parcial Corto 2", stock=0)
+
+        response = client.post(
+            "/pos/venta/",
+            json={
+                "items": [
+                    {"producto_id": id_ok, "cantidad": 4},
+                    {"producto_id": id_corto_1, "cantidad": 2},
+                    {"producto_id": id_corto_2, "cantidad": 1},
+                    {"producto_id": 999999, "cantidad": 1},
+                ]
+            },
+        )
+
+        assert response.status_code == 400
+        faltantes = {i["producto_id"] for i in response.json()["detail"]["items"]}
+        assert faltantes == {id_corto_1, id_corto_2, 999999}
+        assert client.get(f"/productos/{id_ok}").json()["stock"] == 10
+        assert client.get(f"/productos/{id_corto_1}").json()["stock"] == 1
+
+    def test_venta_rechaza_cantidades_no_positivas(self, setup_test_db):
+        id_producto = _crear_producto("Venta Cantidad Cero", stock=3)
+
+        response = client.post(
+            "/pos/venta/",
+            json={"items": [{"producto_id": id_producto, "cantidad": 0}]},
+        )
+
+        assert response.status_code == 400
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 3
+
+
+class TestReservas:
+    """Tests de reservas de stock para carritos."""
+
+    def test_reserva_retiene_stock_y_la_venta_la_confirma(self, setup_test_db):
+        id_producto = _crear_producto("Reserva Confirmada", stock=5)
+
+        response = client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-confirmado",
+                "items": [{"producto_id": id_producto, "cantidad": 3}],
+            },
+        )
+        assert response.status_code == 200
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 2
+
+        response = client.post(
+            "/pos/venta/",
+            json={
+                "carrito_id": "carrito-confirmado",
+                "items": [{"producto_id": id_producto, "cantidad": 2}],
+            },
+        )
+        assert response.status_code == 200
+        # La unidad reservada y no vendida vuelve al stock.
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 3
+
+    def test_reserva_sin_stock_devuelve_conflicto(self, setup_test_db):
+        id_producto = _crear_producto("Reserva Sin Stock", stock=1)
+
+        response = client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-sin-stock",
+                "items": [{"producto_id": id_producto, "cantidad": 2}],
+            },
+        )
+
+        assert response.status_code == 409
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 1
+
+    def test_reserva_de_producto_inexistente(self, setup_test_db):
+        response = client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-inexistente",
+                "items": [{"producto_id": 999999, "cantidad": 1}],
+            },
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"]["producto_ids"] == [999999]
+
+    @pytest.mark.parametrize("ttl", [0, -60])
+    def test_reserva_con_ttl_no_positivo(self, setup_test_db, ttl):
+        id_producto = _crear_producto("Reserva TTL", stock=1)
+        response = client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-ttl",
+                "items": [{"producto_id": id_producto, "cantidad": 1}],
+                "ttl_segundos": ttl,
+            },
+        )
+
+        assert response.status_code == 422
+
+    def test_venta_de_producto_reservado_y_eliminado(self, setup_test_db):
+        id_producto = _crear_producto("Reserva Eliminada", stock=1)
+        client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-eliminado",
+                "items": [{"producto_id": id_producto, "cantidad": 1}],
+            },
+        )
+        with TestingSessionLocal() as db:
+            db.execute(delete(models.Producto).where(models.Producto.id == id_producto))
+            db.commit()
+
+        response = client.post(
+            "/pos/venta/",
+            json={
+                "carrito_id": "carrito-eliminado",
+                "items": [{"producto_id": id_producto, "cantidad": 1}],
+            },
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"]["items"][0]["motivo"] == (
+            "producto no encontrado"
+        )
+
+    def test_reserva_vencida_libera_stock(self, setup_test_db):
+        id_producto = _crear_producto("Reserva Vencida", stock=1)
+        with TestingSessionLocal() as db:
+            # La API sólo acepta TTL positivos: se crea ya vencida.
+            crud.reservar_stock(
+                db,
+                "carrito-abandonado",
+                [schemas.VentaItem(producto_id=id_producto, cantidad=1)],
+                ttl_segundos=-1,
+            )
+            db.commit()
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 0
+
+        # Otro carrito reserva la unidad: la reserva vencida se libera primero.
+        response = client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-nuevo",
+                "items": [{"producto_id": id_producto, "cantidad": 1}],
+            },
+        )
+
+        assert response.status_code == 200
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 0
+
+    def test_liberar_reserva_devuelve_stock(self, setup_test_db):
+        id_producto = _crear_producto("Reserva Liberada", stock=4)
+        client.post(
+            "/pos/reservas/",
+            json={
+                "carrito_id": "carrito-cancelado",
+                "items": [{"producto_id": id_producto, "cantidad": 4}],
+            },
+        )
+
+        response = client.delete("/pos/reservas/carrito-cancelado")
+
+        assert response.status_code == 200
+        assert response.json()["unidades_liberadas"] == 4
+        assert client.get(f"/productos/{id_producto}").json()["stock"] == 4
+
+
+class TestLibroDeVentas:
+    """Tests del libro de ventas y sus resúmenes diarios."""
+
+    def test_venta_se_asienta_y_actualiza_resumenes(self, setup_test_db):
+        categoria = client.post("/categorias/", json={"nombre": "Libro Juguetes"})
+        id_categoria = categoria.json()["id"]
+        response = client.post(
+            "/productos/",
+            json={
+                "nombre": "Libro Pelota",
+                "precio": 8.5,
+                "stock": 10,
+                "categoria_id": id_categoria,
+            },
+        )
+        id_producto = response.json()["id"]
+        antes = client.get("/reportes/ventas/?dias=1&top=100").json()
+
+        for _ in range(2):
+            response = client.post(
+                "/pos/venta/",
+                json={
+                    "cliente_id": 7,
+                    "items": [{"producto_id": id_producto, "cantidad": 2}],
+                },
+            )
+            assert response.status_code == 200
+            assert response.json()["total"] == 17.0
+            assert response.json()["venta_id"]
+
+        despues = client.get("/reportes/ventas/?dias=1&top=100").json()
+        assert despues["sales_count"] == antes["sales_count"] + 2
+        assert despues["products_sold"] == antes["products_sold"] + 4
+        assert despues["total_sales"] == round(antes["total_sales"] + 34.0, 2)
+        assert despues["categories"]["Libro Juguetes"] == 34.0
+        top = {p["producto_id"]: p for p in despues["top_products"]}
+        assert top[id_producto]["quantity_sold"] == 4
+
+
+class TestIngestaInventario:
+    """Tests de la ingesta por lotes de archivos de inventario."""
+
+    def test_csv_se_procesa_en_lotes(self, test_db_session, tmp_path):
+        archivo = tmp_path / "inventario.csv"
+        lineas = ["sku,name,stock,price,category"]
+        lineas += [
+            f"ING{i:03d},Ingesta CSV {i},{i},{i + 0.5},Ingesta" for i in range(25)
+        ]
+        lineas.append("INGBAD,Ingesta CSV rota,3,no-es-precio,Ingesta")
+        archivo.write_text("\n".join(lineas), encoding="utf-8")
+        avances = []
+
+        resumen = procesar_inventario(
+            test_db_session,
+            str(archivo),
+            "csv",
+            batch_size=10,
+            on_progress=avances.append,
+        )
+
+        assert resumen["total"] == 26
+        assert resumen["creados"] == 25
+        assert resumen["fallidos"] == 1
+        assert resumen["errores"] == [{"fila": 27, "error": "precio inválido"}]
+        assert [a["creados"] for a in avances] == [10, 20, 25]
+        assert avances[-1]["avance"] == 100.0
+        producto = (
+            test_db_session.query(models.Producto)
+            .filter(models.Producto.nombre == "Ingesta CSV 7")
+            .one()
+        )
+        assert producto.stock == 7
+        assert producto.categoria.nombre == "Ingesta"
+
+    def test_valores_no_finitos_son_errores_de_fila(self, test_db_session, tmp_path):
+        archivo = tmp_path / "no_finitos.csv"
+        archivo.write_text(
+            "sku,name,stock,price\n"
+            "NF1,No finito 1,inf,1\n"
+            "NF2,No finito 2,nan,1\n"
+            "NF3,No finito 3,1,inf\n"
+            "NF4,No finito 4,2,3\n",
+            encoding="utf-8",
+        )
+
+        resumen = procesar_inventario(test_db_session, str(archivo), "csv")
+
+        assert resumen["creados"] == 1
+        assert [e["error"] for e in resumen["errores"]] == [
+            "stock inválido",
+            "stock inválido",
+            "precio inválido",
+        ]
+
+    def test_excel_actualiza_productos_existentes(self, test_db_session, tmp_path):
+        from openpyxl import Workbook
+
+        test_db_session.add(models.Producto(nombre="Ingesta Excel", precio=1, stock=1))
+        test_db_session.commit()
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet()
+        hoja.append(["nombre", "precio", "stock"])
+        hoja.append(["Ingesta Excel", 12.5, 40])
+        hoja.append(["Ingesta Excel Nuevo", 3, 2])
+        archivo = tmp_path / "inventario.xlsx"
+        libro.save(archivo)
+
+        resumen = procesar_inventario(test_db_session, str(archivo), "excel")
+
+        assert resumen["actualizados"] == 1
+        assert resumen["creados"] == 1
+        producto = (
+            test_db_session.query(models.Producto)
+            .filter(models.Producto.nombre == "Ingesta Excel")
+            .one()
+        )
+        assert (producto.precio, producto.stock) == (12.5, 40)
+
+
+class TestCargaMasiva:
+    """Tests del upsert masivo de productos por SKU."""
+
+    def test_bulk_crea_actualiza_e_informa_por_fila(self, setup_test_db):
+        _crear_producto("Bulk Existente", stock=1)
+        client.post(
+            "/productos/bulk",
+            json=[{"sku": "BULK-1", "nombre": "Bulk Uno", "precio": 1.0, "stock": 1}],
+        )
+
+        response = client.post(
+            "/productos/bulk",
+            json=[
+                {"sku": "BULK-1", "nombre": "Bulk Uno v2", "precio": 2.0},
+                {"sku": "BULK-2", "nombre": "Bulk Dos", "precio": 3.0, "stock": 5},
+                {"sku": "BULK-2", "nombre": "Bulk Dos v2", "precio": 4.0, "stock": 6},
+            ],
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["total"], data["creados"], data["actualizados"]) == (3, 1, 1)
+        assert [r["resultado"] for r in data["resultados"]] == [
+            "actualizado",
+            "duplicado",
+            "creado",
+        ]
+        uno = client.get(f"/productos/{data['resultados'][0]['id']}").json()
+        # El stock no se envió, así que se conserva.
+        assert (uno["nombre"], uno["precio"], uno["stock"]) == ("Bulk Uno v2", 2.0, 1)
+        dos = client.get(f"/productos/{data['resultados'][2]['id']}").json()
+        assert (dos["nombre"], dos["stock"]) == ("Bulk Dos v2", 6)
+
+    def test_sku_duplicado_en_alta_individual(self, setup_test_db):
+        producto = {"sku": "BULK-UNICO", "nombre": "Bulk Único", "precio": 1.0}
+        assert client.post("/productos/", json=producto).status_code == 200
+
+        response = client.post("/productos/", json=producto)
+
+        assert response.status_code == 400
+        assert "SKU already exists" in response.json()["detail"]
+
+
+class TestActualizacionPrecios:
+    """Tests de la actualización masiva e idempotente de precios."""
+
+    def test_aplica_por_lotes_registra_historial_y_es_idempotente(
+        self, test_db_session
+    ):
+        test_db_session.add_all(
+            models.Producto(sku=f"PRECIO-{i}", nombre=f"Precio {i}", precio=10.0)
+            for i in range(5)
+        )
+        test_db_session.commit()
+        cambios = [{"sku": f"PRECIO-{i}", "new_price": 20.0 + i} for i in range(5)]
+        cambios.append({"sku": "PRECIO-INEXISTENTE", "new_price": 1.0})
+
+        primera = crud.aplicar_actualizaciones_precio(
+            test_db_session, cambios, clave_base="tarea-1", tamano_lote=2
+        )
+        # Un reintento de la misma tarea no vuelve a aplicar nada.
+        reintento = crud.aplicar_actualizaciones_precio(
+            test_db_session, cambios, clave_base="tarea-1", tamano_lote=2
+        )
+
+        assert len(primera["exitosas"]) == 5
+        assert [f["sku"] for f in primera["fallidas"]] == ["PRECIO-INEXISTENTE"]
+        assert primera["exitosas"][3]["precio_anterior"] == 10.0
+        assert len(reintento["exitosas"]) == 0
+        assert len(reintento["omitidas"]) == 5
+        producto = crud.get_producto_by_sku(test_db_session, "PRECIO-3")
+        test_db_session.refresh(producto)
+        assert producto.precio == 23.0
+        historial = (
+            test_db_session.query(models.PrecioHistorial)
+            .filter(models.PrecioHistorial.producto_id == producto.id)
+            .all()
+        )
+        assert [(h.precio_anterior, h.precio_nuevo) for h in historial] == [
+            (10.0, 23.0)
+        ]
+
+    def test_skus_repetidos_en_distintos_lotes(self, test_db_session):
+        test_db_session.add(models.Producto(sku="REP-1", nombre="Rep", precio=10.0))
+        test_db_session.commit()
+        cambios = [
+            {"sku": "REP-1", "new_price": 11.0},
+            {"sku": "OTRO", "new_price": 1.0},
+            {"sku": "REP-1", "new_price": 12.0},
+        ]
+
+        resultado = crud.aplicar_actualizaciones_precio(
+            test_db_session, cambios, clave_base="tarea-rep", tamano_lote=2
+        )
+
+        assert [c["precio"] for c in resultado["exitosas"]] == [11.0]
+        assert sorted(f["error"] for f in resultado["fallidas"]) == [
+            "SKU no encontrado",
+            "SKU repetido en la actualización",
+        ]
+
+    def test_conflicto_concurrente_omite_solo_las_claves_confirmadas(
+        self, test_db_session, monkeypatch
+    ):
+        test_db_session.add_all(
+            models.Producto(sku=f"CONC-{i}", nombre=f"Conc {i}", precio=10.0)
+            for i in range(2)
+        )
+        test_db_session.commit()
+        original = crud._aplicar_lote_precios
+        llamadas = []
+
+        def con_competidor(db, lote):
+            llamadas.append(lote)
+            if len(llamadas) == 1:
+                # Otra ejecución confirma la primera clave antes que ésta.
+                producto = crud.get_producto_by_sku(db, "CONC-0")
+                db.add(
+                    models.PrecioHistorial(
+                        producto_id=producto.id,
+                        precio_anterior=10.0,
+                        precio_nuevo=30.0,
+                        clave_idempotencia=lote[0]["clave"],
+                        fecha=datetime.utcnow(),
+                    )
+                )
+                db.commit()
+                raise IntegrityError("INSERT", {}, Exception("clave duplicada"))
+            return original(db, lote)
+
+        monkeypatch.setattr(crud, "_aplicar_lote_precios", con_competidor)
+        cambios = [
+            {"sku": "CONC-0", "new_price": 20.0},
+            {"sku": "CONC-1", "new_price": 21.0},
+            {"sku": "CONC-X", "new_price": 1.0},
+        ]
+
+        resultado = crud.aplicar_actualizaciones_precio(
+            test_db_session, cambios, clave_base="tarea-c", tamano_lote=3
+        )
+
+        assert [c["sku"] for c in resultado["omitidas"]] == ["CONC-0"]
+        assert [c["sku"] for c in resultado["exitosas"]] == ["CONC-1"]
+        assert [f["sku"] for f in resultado["fallidas"]] == ["CONC-X"]
+
+
+class TestReportes:
+    """Reportes de inventario calculados en la base de datos."""
+
+    def test_stock_bajo_ordenado_por_criticidad(self, setup_test_db):
+        critico = _crear_producto("Reporte Crítico", stock=0)
+        bajo = _crear_producto("Reporte Bajo", stock=4)
+        _crear_producto("Reporte Normal", stock=50)
+
+        response = client.get(
+            "/reportes/inventario/", params={"report_type": "stock_low"}
+        )
+
+        assert response.status_code == 200
+        datos = response.json()["data"]
+        nombres = [p["name"] for p in datos["low_stock_products"]]
+        assert "Reporte Normal" not in nombres
+        assert nombres.index("Reporte Crítico") < nombres.index("Reporte Bajo")
+        assert datos["total_low_stock"] >= 2
+        assert critico != bajo
+
+    def test_valor_inventario_por_categoria(self, test_db_session):
+        categoria = models.Categoria(nombre="Reporte Acuarios")
+        test_db_session.add(categoria)
+        test_db_session.flush()
+        test_db_session.add_all(
+            [
+                models.Producto(
+                    nombre="Pecera", precio=100.0, stock=3, categoria_id=categoria.id
+                ),
+                models.Producto(
+                    nombre="Filtro", precio=25.5, stock=2, categoria_id=categoria.id
+                ),
+            ]
+        )
+        test_db_session.commit()
+
+        datos = reports.generar_reporte(test_db_session, 1, "inventory_value")
+
+        assert datos["categories"]["Reporte Acuarios"] == 351.0
+        assert datos["total_inventory_value"] >= 351.0
+
+    def test_tipo_desconocido(self, setup_test_db):
+        response = client.get("/reportes/inventario/", params={"report_type": "otro"})
+        assert response.status_code == 404
+
+    def test_escritura_incrementa_version_de_datos(self, test_db_session, monkeypatch):
+        versiones = []
+        monkeypatch.setattr(
+            "common.cache.bump_data_version", lambda ns: versiones.append(ns)
+        )
+
+        test_db_session.add(models.Producto(nombre="Versionado", precio=1.0))
+        test_db_session.commit()
+        # Una escritura masiva que se revierte no invalida la caché.
+        test_db_session.execute(
+            update(models.Producto)
+            .values(stock=models.Producto.stock + 1)
+            .execution_options(synchronize_session=False)
+        )
+        test_db_session.rollback()
+        test_db_session.execute(
+            update(models.Producto)
+            .where(models.Producto.nombre == "Versionado")
+            .values(stock=2)
+            .execution_options(synchronize_session=False)
+        )
+        test_db_session.commit()
+
+        assert versiones == ["petshop", "petshop"]
+
+
+class TestCargaDeRelaciones:
+    """Los listados de productos no disparan una consulta por producto."""
+
+    @pytest.fixture(scope="class")
+    def catalogo(self, setup_test_db):
+        categorias = [
+            client.post("/categorias/", json={"nombre": f"Relaciones {i}"}).json()["id"]
+            for i in range(3)
+        ]
+        proveedores = [
+            client.post("/proveedores/", json={"nombre": f"Relaciones {i}"}).json()[
+                "id"
+            ]
+            for i in range(3)
+        ]
+        for i in range(30):
+            client.post(
+                "/productos/",
+                json={
+                    "nombre": f"Relaciones {i}",
+                    "precio": 5.0,
+                    "categoria_id": categorias[i % 3],
+                    "proveedor_id": proveedores[i % 3],
+                },
+            )
+        return categorias[0], proveedores[0]
+
+    @pytest.mark.parametrize("estrategia", ["joined", "selectin"])
+    def test_presupuesto_de_consultas(
+        self, catalogo, query_counter, monkeypatch, estrategia
+    ):
+        monkeypatch.setattr(crud, "PRODUCTO_CARGA_RELACIONES", estrategia)
+        # "selectin" agrega una consulta IN por relación.
+        presupuesto = 1 if estrategia == "joined" else 3
+        categoria_id, proveedor_id = catalogo
+
+        with query_counter.presupuesto(presupuesto):
+            listado = client.get("/productos/", params={"limit": 100})
+        with query_counter.presupuesto(presupuesto):
+            por_categoria = client.get(f"/categorias/{categoria_id}/productos/")
+        with query_counter.presupuesto(presupuesto):
+            por_proveedor = client.get(f"/proveedores/{proveedor_id}/productos/")
+        with query_counter.presupuesto(presupuesto):
+            detalle = client.get(f"/productos/{listado.json()[-1]['id']}")
+
+        assert len(listado.json()) >= 30
+        assert len(por_categoria.json()) == 10
+        assert all(p["proveedor"]["id"] == proveedor_id for p in por_proveedor.json())
+        assert detalle.json()["categoria"] is not None
+
+
+class TestPaginacion:
+    """Paginación por cursor de los listados."""
+
+    def test_recorrido_por_cursor(self, setup_test_db):
+        for i in range(7):
+            _crear_producto(f"Paginado {i}", stock=1)
+        completos = client.get("/productos/", params={"limit": 10000}).json()
+
+        vistos = []
+        params = {"limit": 3}
+        while True:
+            response = client.get("/productos/", params=params)
+            assert response.status_code == 200
+            vistos.extend(p["id"] for p in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            params = {"limit": 3, "cursor": cursor}
+            # Una inserción a mitad del recorrido no desplaza las páginas.
+            if len(vistos) == 3:
+                nuevo = _crear_producto("Paginado durante el recorrido", stock=1)
+
+        assert vistos == [p["id"] for p in completos] + [nuevo]
+        assert len(vistos) == len(set(vistos))
+
+    def test_offset_sigue_disponible(self, setup_test_db):
+        pagina = client.get("/productos/", params={"skip": 1, "limit": 2})
+        assert pagina.status_code == 200
+        assert len(pagina.json()) == 2
+        assert "X-Next-Cursor" in pagina.headers
+
+    def test_cursor_invalido(self, setup_test_db):
+        response = client.get("/categorias/", params={"cursor": "no-es-un-cursor"})
+        assert response.status_code == 400
+
+
+class TestBusqueda:
+    """Búsqueda de productos para el autocompletado."""
+
+    def test_prefijos_plurales_y_acentos(self, setup_test_db):
+        alimento = _crear_producto("Alimento para Perros Adultos", stock=1)
+        collar = _crear_producto("Collar Antipulgas Perro", stock=1)
+        _crear_producto("Arena Sanitaria Gatos", stock=1)
+
+        def buscar(q):
+            response = client.get("/productos/search", params={"q": q})
+            assert response.status_code == 200
+            return [p["id"] for p in response.json()]
+
+        assert buscar("alim perr") == [alimento]
+        assert buscar("PERRO") == [alimento, collar]
+        assert buscar("antipulga perros") == [collar]
+        assert buscar("alimentó") == [alimento]
+        assert buscar("perro gato") == []
+
+    def test_el_indice_sigue_los_cambios_de_nombre(self, setup_test_db):
+        producto_id = _crear_producto("Rascador Búsqueda", stock=1)
+        assert client.get("/productos/search", params={"q": "rascador"}).json()
+
+        with TestingSessionLocal() as db:
+            db.get(models.Producto, producto_id).nombre = "Torre Búsqueda"
+            db.commit()
+            # Un movimiento de stock no reconstruye el índice.
+            version = search._version_catalogo
+            crud.registrar_venta(
+                db, [schemas.VentaItem(producto_id=producto_id, cantidad=1)]
+            )
+            db.commit()
+            assert search._version_catalogo == version
+
+        assert client.get("/productos/search", params={"q": "rascador"}).json() == []
+        encontrados = client.get("/productos/search", params={"q": "torre busq"})
+        assert [p["id"] for p in encontrados.json()] == [producto_id]
+
+    def test_busqueda_durante_una_reconstruccion(self, setup_test_db, monkeypatch):
+        alimento = _crear_producto("Alimento Perro Reconstruido", stock=1)
+        indice = search.IndiceProductos()
+        conjunto = search._Contenido.conjunto
+        reconstruido = []
+
+        def reconstruir_en_medio(contenido, palabras_termino):
+            # Otra petición reconstruye el índice sin esas palabras mientras
+            # ésta sigue filtrando.
+            if not reconstruido:
+                reconstruido.append(True)
+                with TestingSessionLocal() as db:
+                    db.execute(delete(models.Producto))
+                    db.commit()
+                    assert indice.buscar(db, "alimento", 10) == []
+            return conjunto(contenido, palabras_termino)
+
+        monkeypatch.setattr(search._Contenido, "conjunto", reconstruir_en_medio)
+        with TestingSessionLocal() as db:
+            assert indice.buscar(db, "alimento reconstr", 10) == [alimento]
+
+    def test_consulta_demasiado_corta(self, setup_test_db):
+        assert client.get("/productos/search", params={"q": "a"}).status_code == 422
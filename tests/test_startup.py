@@ -0,0 +1,105 @@
+"""
+Tests del arranque en frío: presupuestos de tiempo de importación y memoria
+por servicio, y encolado de tareas sin cargar el código del worker.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_importtime import PRESUPUESTOS, SERVICIOS, perfil_importacion
+from common import task_queue
+from petshop.app import main as petshop_main
+from veterinaria.app.main import app as veterinaria_app
+
+
+@pytest.mark.parametrize("servicio", SERVICIOS)
+def test_presupuesto_de_arranque(servicio):
+    perfil = perfil_importacion(servicio)
+    presupuesto = PRESUPUESTOS[servicio]
+
+    assert perfil.del_worker == []
+    assert perfil.segundos <= presupuesto.segundos, perfil
+    assert perfil.rss_mb <= presupuesto.rss_mb, perfil
+
+
+class ColaFalsa:
+    """Registra las tareas enviadas en lugar de publicarlas en Redis."""
+
+    def __init__(self):
+        self.enviadas = []
+
+    def send_task(self, name, args=(), kwargs=None):
+        self.enviadas.append((name, args))
+        return type("Resultado", (), {"id": f"tarea-{len(self.enviadas)}"})()
+
+
+@pytest.fixture
+def cola(monkeypatch):
+    cola = ColaFalsa()
+    monkeypatch.setattr(task_queue, "_client", cola)
+    return cola
+
+
+def test_tareas_encoladas_por_nombre(cola, tmp_path, monkeypatch):
+    monkeypatch.setattr(petshop_main, "INVENTARIO_UPLOAD_DIR", str(tmp_path))
+    response = TestClient(petshop_main.app).post(
+        "/upload-inventario/",
+        files={"file": ("stock.csv", b"nombre,precio\nCollar,5\n", "text/csv")},
+    )
+    assert response.json()["task_id"] == "tarea-1"
+    response = TestClient(veterinaria_app).post("/mascotas/7/reportes/")
+    assert response.json()["task_id"] == "tarea-2"
+
+    nombre, args = cola.enviadas[0]
+    assert nombre == "petshop.app.tasks.process_inventory_file"
+    assert args[1] == "csv"
+    assert cola.enviadas[1] == (
+        "veterinaria.app.tasks.generate_medical_report",
+        (7, [1, 2, 3]),
+    )
+
+
+def test_nombres_registrados_en_el_worker():
+    from common.celery_app import celery_app
+    from petshop.app import tasks as petshop_tasks  # noqa: F401
+    from veterinaria.app import tasks as veterinaria_tasks  # noqa: F401
+
+    for nombre in (
+        "petshop.app.tasks.process_inventory_file",
+        "petshop.app.tasks.generate_inventory_report",
+        "veterinaria.app.tasks.process_medical_document",
+        "veterinaria.app.tasks.generate_medical_report",
+    ):
+        assert nombre in celery_app.tasks
+
+
+def test_extension_del_inventario(cola, tmp_path, monkeypatch):
+    monkeypatch.setattr(petshop_main, "INVENTARIO_UPLOAD_DIR", str(tmp_path))
+    client = TestClient(petshop_main.app)
+
+    response = client.post(
+        "/upload-inventario/", files={"file": ("STOCK.XLSX", b"PK", "application/zip")}
+    )
+    assert response.json()["file_type"] == "excel"
+
+    response = client.post(
+        "/upload-inventario/", files={"file": ("stock.xls", b"\xd0\xcf", "x")}
+    )
+    assert response.status_code == 400
+    assert len(cola.enviadas) == 1
+
+
+def test_archivo_borrado_si_no_se_encola(tmp_path, monkeypatch):
+    class ColaCaida:
+        def send_task(self, name, args=(), kwargs=None):
+            raise ConnectionError("redis caído")
+
+    monkeypatch.setattr(task_queue, "_client", ColaCaida())
+    monkeypatch.setattr(petshop_main, "INVENTARIO_UPLOAD_DIR", str(tmp_path))
+    response = TestClient(petshop_main.app).post(
+        "/upload-inventario/",
+        files={"file": ("stock.csv", b"nombre,precio\nCollar,5\n", "text/csv")},
+    )
+
+    assert response.json()["status"] == "Error al procesar archivo"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,83 @@
+"""
+Test de estrés: muchas cajas vendiendo y reservando el mismo producto a la vez.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from common.database import retry_on_conflict
+from petshop.app import crud, models, schemas
+
+WORKERS = 50
+OPERACIONES_POR_WORKER = 6
+STOCK_INICIAL = 120
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'stock.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    models.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def test_ventas_concurrentes_nunca_dejan_stock_negativo(session_factory):
+    with session_factory() as db:
+        producto = models.Producto(
+            nombre="Producto Disputado", precio=10.0, stock=STOCK_INICIAL
+        )
+        db.add(producto)
+        db.commit()
+        producto_id = producto.id
+
+    exitos = []
+    rechazos = []
+    errores = []
+    stock_minimo = [STOCK_INICIAL]
+    barrera = threading.Barrier(WORKERS)
+
+    def caja(numero):
+        items = [schemas.VentaItem(producto_id=producto_id, cantidad=1)]
+        barrera.wait()
+        for operacion in range(OPERACIONES_POR_WORKER):
+            db = session_factory()
+            try:
+                if operacion % 2:
+                    retry_on_conflict(crud.registrar_venta, db, items, retries=50)
+                else:
+                    retry_on_conflict(
+                        crud.reservar_stock,
+                        db,
+                        f"caja-{numero}-{operacion}",
+                        items,
+                        retries=50,
+                    )
+                exitos.append(numero)
+            except crud.StockInsuficienteError:
+                rechazos.append(numero)
+            except Exception as e:  # pragma: no cover - se reporta abajo
+                errores.append(e)
+            finally:
+                stock = crud.get_producto(db, producto_id).stock
+                stock_minimo[0] = min(stock_minimo[0], stock)
+                db.close()
+
+    hilos = [threading.Thread(target=caja, args=(n,)) for n in range(WORKERS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    total = WORKERS * OPERACIONES_POR_WORKER
+    assert not errores
+    assert len(exitos) == STOCK_INICIAL
+    assert len(rechazos) == total - STOCK_INICIAL
+    assert stock_minimo[0] >= 0
+    with session_factory() as db:
+        assert crud.get_producto(db, producto_id).stock == 0
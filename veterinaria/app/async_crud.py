@@ -0,0 +1,68 @@
+"""
+Variantes asíncronas (AsyncSession) de las lecturas de mascotas y
+consultas, usadas por `async_routes` cuando el servicio corre con
+DB_ASYNC=true.
+
+En asyncio no hay carga perezosa: el historial clínico que serializa
+`schemas.Mascota` se carga explícitamente con sus consultas y documentos.
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from common.pagination import paginate
+
+from . import models
+
+
+def _select_mascotas():
+    historial = selectinload(models.Mascota.historial_clinico)
+    return select(models.Mascota).options(
+        historial.selectinload(models.HistorialClinico.consultas),
+        historial.selectinload(models.HistorialClinico.documentos),
+    )
+
+
+async def get_mascota(db: AsyncSession, mascota_id: int):
+    """
+    Obtiene una mascota por su ID, incluyendo su historial clínico.
+    """
+    return await db.scalar(_select_mascotas().where(models.Mascota.id == mascota_id))
+
+
+async def get_mascotas(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
+    """
+    Obtiene una lista de todas las mascotas.
+    """
+    consulta = paginate(_select_mascotas(), models.Mascota.id, after_id, skip, limit)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_mascota_by_propietario(db: AsyncSession, propietario_id: int):
+    """
+    Obtiene todas las mascotas de un propietario específico.
+    """
+    consulta = _select_mascotas().where(models.Mascota.propietario_id == propietario_id)
+    return (await db.scalars(consulta)).all()
+
+
+async def get_consultas_by_mascota(db: AsyncSession, mascota_id: int):
+    """
+    Obtiene las consultas de una mascota, o None si no tiene historial.
+    """
+    historial_id = await db.scalar(
+        select(models.HistorialClinico.id).where(
+            models.HistorialClinico.mascota_id == mascota_id
+        )
+    )
+    if historial_id is None:
+        return None
+    consulta = select(models.Consulta).where(
+        models.Consulta.historial_id == historial_id
+    )
+    return (await db.scalars(consulta)).all()
@@ -0,0 +1,78 @@
+"""
+Endpoints de lectura de mascotas sobre AsyncSession. Con DB_ASYNC=true se
+registran antes que los síncronos de `main` con la misma ruta y los
+reemplazan; las altas y la carga de documentos siguen siendo síncronas.
+
+Los parámetros de ruta usan el conversor `:int` para no capturar rutas fijas
+de `main`. No se publican en el esquema OpenAPI porque el contrato es el
+mismo que el de los endpoints síncronos.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.database import get_async_db
+from common.pagination import decode_cursor, set_next_cursor
+
+from . import async_crud, schemas
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/mascotas/", response_model=List[schemas.Mascota])
+async def read_mascotas(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtiene una lista de todas las mascotas.
+    """
+    mascotas = await async_crud.get_mascotas(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, mascotas, limit)
+    return mascotas
+
+
+@router.get("/mascotas/{mascota_id:int}", response_model=schemas.Mascota)
+async def read_mascota(mascota_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Obtiene los detalles de una mascota específica, incluyendo su historial clínico.
+    """
+    db_mascota = await async_crud.get_mascota(db, mascota_id=mascota_id)
+    if db_mascota is None:
+        raise HTTPException(status_code=404, detail="Mascota not found")
+    return db_mascota
+
+
+@router.get(
+    "/mascotas/{mascota_id:int}/consultas/", response_model=List[schemas.Consulta]
+)
+async def read_consultas(mascota_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Obtiene todas las consultas de una mascota específica.
+    """
+    consultas = await async_crud.get_consultas_by_mascota(db, mascota_id=mascota_id)
+    if consultas is None:
+        raise HTTPException(status_code=404, detail="Historial clínico not found")
+    return consultas
+
+
+@router.get(
+    "/propietarios/{propietario_id:int}/mascotas/",
+    response_model=List[schemas.Mascota],
+)
+async def read_mascotas_by_propietario(
+    propietario_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene todas las mascotas de un propietario específico.
+    """
+    return await async_crud.get_mascota_by_propietario(
+        db, propietario_id=propietario_id
+    )
@@ -1,5 +1,9 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 
+from common.pagination import paginate
+
 from . import models, schemas
 
 
@@ -10,31 +14,27 @@ def get_mascota(db: Session, mascota_id: int):
     return db.query(models.Mascota).filter(models.Mascota.id == mascota_id).first()
 
 
-def get_mascotas(db: Session, skip: int = 0, limit: int = 100):
+def get_mascotas(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """
     Obtiene una lista de todas las mascotas.
     """
-    return db.query(models.Mascota).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(models.Mascota), models.Mascota.id, after_id, skip, limit
+    ).all()
 
 
 def create_mascota(db: Session, mascota: schemas.MascotaCreate):
     """
     Crea una nueva mascota y, automáticamente, su historial clínico asociado.
     """
-    db_mascota = models.Mascota(**mascota.dict())
+    # El historial viaja con la mascota: un solo flush inserta ambos. Sus
+    # colecciones nacen vacías, así la respuesta no vuelve a consultarlas.
+    historial = models.HistorialClinico(consultas=[], documentos=[])
+    db_mascota = models.Mascota(**mascota.dict(), historial_clinico=historial)
     db.add(db_mascota)
-    db.commit()
-    db.refresh(db_mascota)
-
-    # Crear el historial clínico asociado a la mascota
-    db_historial = models.HistorialClinico(mascota_id=db_mascota.id)
-    db.add(db_historial)
-    db.commit()
-    db.refresh(db_historial)
-
-    # Refrescar el objeto mascota para que incluya el historial recién creado
-    db.refresh(db_mascota)
-
+    db.flush()
     return db_mascota
 
 
@@ -48,8 +48,7 @@ def create_consulta(db: Session, consulta: schemas.ConsultaCreate, historial_id:
     """
     db_consulta = models.Consulta(**consulta.dict(), historial_id=historial_id)
     db.add(db_consulta)
-    db.commit()
-    db.refresh(db_consulta)
+    db.flush()
     return db_consulta
 
 
@@ -73,8 +72,7 @@ def create_documento(
     """
     db_documento = models.Documento(**documento.dict(), historial_id=historial_id)
     db.add(db_documento)
-    db.commit()
-    db.refresh(db_documento)
+    db.flush()
     return db_documento
 
 
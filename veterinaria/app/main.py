@@ -1,14 +1,13 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Response
 from sqlalchemy.orm import Session
 
-from common.database import SessionLocal, engine
+from common import auth, metrics, task_queue
+from common.database import DB_ASYNC, get_db
+from common.pagination import decode_cursor, set_next_cursor
 
-from . import crud, models, schemas
-
-# Crear tablas de la base de datos
-models.Base.metadata.create_all(bind=engine)
+from . import crud, schemas
 
 app = FastAPI(
     title="Servicio de Veterinaria",
@@ -17,20 +16,22 @@ app = FastAPI(
         "consultas y documentos de mascotas."
     ),
     version="0.1.0",
+    dependencies=auth.service_dependencies(),
 )
+app.include_router(metrics.router)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
+if DB_ASYNC:
+    from . import async_routes
 
-# Dependencia de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Registradas primero, tienen precedencia sobre sus versiones síncronas.
+    app.include_router(async_routes.router)
 
 
 @app.post("/mascotas/", response_model=schemas.Mascota)
-def create_mascota(mascota: schemas.MascotaCreate, db: Session = Depends(get_db)):
+def create_mascota(
+    mascota: schemas.MascotaCreate, db: Session = Depends(get_db, scope="function")
+):
     """
     Crea una nueva mascota en el sistema.
     """
@@ -38,16 +39,25 @@ def create_mascota(mascota: schemas.MascotaCreate, db: Session = Depends(get_db)
 
 
 @app.get("/mascotas/", response_model=List[schemas.Mascota])
-def read_mascotas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_mascotas(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db, scope="function"),
+):
     """
     Obtiene una lista de todas las mascotas.
     """
-    mascotas = crud.get_mascotas(db, skip=skip, limit=limit)
+    mascotas = crud.get_mascotas(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, mascotas, limit)
     return mascotas
 
 
 @app.get("/mascotas/{mascota_id}", response_model=schemas.Mascota)
-def read_mascota(mascota_id: int, db: Session = Depends(get_db)):
+def read_mascota(mascota_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Obtiene los detalles de una mascota específica, incluyendo su historial clínico.
     """
@@ -59,7 +69,9 @@ def read_mascota(mascota_id: int, db: Session = Depends(get_db)):
 
 @app.post("/mascotas/{mascota_id}/consultas/", response_model=schemas.Consulta)
 def create_consulta(
-    mascota_id: int, consulta: schemas.ConsultaCreate, db: Session = Depends(get_db)
+    mascota_id: int,
+    consulta: schemas.ConsultaCreate,
+    db: Session = Depends(get_db, scope="function"),
 ):
     """
     Crea una nueva consulta para una mascota específica.
@@ -71,7 +83,7 @@ def create_consulta(
 
 
 @app.get("/mascotas/{mascota_id}/consultas/", response_model=List[schemas.Consulta])
-def read_consultas(mascota_id: int, db: Session = Depends(get_db)):
+def read_consultas(mascota_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Obtiene todas las consultas de una mascota específica.
     """
@@ -83,7 +95,9 @@ def read_consultas(mascota_id: int, db: Session = Depends(get_db)):
 
 @app.post("/mascotas/{mascota_id}/documentos/", response_model=schemas.Documento)
 def create_documento(
-    mascota_id: int, documento: schemas.DocumentoCreate, db: Session = Depends(get_db)
+    mascota_id: int,
+    documento: schemas.DocumentoCreate,
+    db: Session = Depends(get_db, scope="function"),
 ):
     """
     Crea un nuevo documento para una mascota específica.
@@ -97,7 +111,9 @@ def create_documento(
 @app.get(
     "/propietarios/{propietario_id}/mascotas/", response_model=List[schemas.Mascota]
 )
-def read_mascotas_by_propietario(propietario_id: int, db: Session = Depends(get_db)):
+def read_mascotas_by_propietario(
+    propietario_id: int, db: Session = Depends(get_db, scope="function")
+):
     """
     Obtiene todas las mascotas de un propietario específico.
     """
@@ -112,15 +128,14 @@ async def upload_documento():
     con OCR para digitalizar historiales en papel.
     """
     try:
-        # Importar la tarea de Celery
-        from .tasks import process_medical_document
-
         # Simular información del archivo subido
         file_path = "/tmp/uploaded_document.pdf"
         document_type = "radiografia"
 
         # Encolar la tarea de procesamiento OCR
-        task = process_medical_document.delay(file_path, document_type)
+        task = task_queue.send_task(
+            "veterinaria.app.tasks.process_medical_document", file_path, document_type
+        )
 
         return {
             "message": "Documento recibido y encolado para procesamiento OCR",
@@ -141,10 +156,8 @@ async def get_ocr_task_status(task_id: str):
     Obtiene el estado de una tarea de procesamiento OCR.
     """
     try:
-        from common.celery_app import celery_app
-
         # Obtener el resultado de la tarea
-        result = celery_app.AsyncResult(task_id)
+        result = task_queue.task_result(task_id)
 
         if result.ready():
             if result.successful():
@@ -171,13 +184,15 @@ async def generate_medical_report_endpoint(mascota_id: int):
     Genera un reporte médico consolidado para una mascota.
     """
     try:
-        from .tasks import generate_medical_report
-
         # Simular IDs de consultas
         consultation_ids = [1, 2, 3]
 
         # Encolar la tarea de generación de reporte
-        task = generate_medical_report.delay(mascota_id, consultation_ids)
+        task = task_queue.send_task(
+            "veterinaria.app.tasks.generate_medical_report",
+            mascota_id,
+            consultation_ids,
+        )
 
         return {
             "message": "Generación de reporte médico iniciada",
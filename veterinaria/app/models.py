@@ -1,7 +1,9 @@
 from sqlalchemy import Column, Date, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import declarative_base, relationship
 
-from common.database import Base
+# Base propia del servicio: su MetaData contiene sólo las tablas del esquema
+# `veterinary`, que el search_path de DATABASE_URL selecciona.
+Base = declarative_base()
 
 
 class Mascota(Base):
@@ -0,0 +1,10 @@
+from alembic import context
+
+from common.migrations import database_url, run_migrations
+
+database_url("veterinaria")
+
+from veterinaria.app import models  # noqa: E402
+
+# Revisión equivalente al esquema que creaba create_all
+run_migrations(context, "veterinaria", models.Base.metadata, baseline_revision="0001")